@@ -0,0 +1,311 @@
+# analysis_process.py
+# Optional out-of-process audio capture + analysis. The child owns the sounddevice stream and the
+# AudioAnalyzer; the main process only reads the published state, so analysis never competes with
+# the broadcast / DMX loops for the GIL.
+import inspect
+import os
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+from audio_analyzer import AudioAnalyzer, SampleRing, SCALAR_COLUMNS, VECTOR_COLUMNS
+
+SIDE_COLUMNS = ("bass", "mid", "high", "vol", "flux", "impact", "bass_onset", "high_onset")
+SIDE_SHARED = ("beat", "bar", "beat_phase", "beat_count", "bpm") # Sides reuse the mix's rhythm
+
+SIDE_DTYPE = np.dtype([(k, SCALAR_COLUMNS[k][0]) for k in SIDE_COLUMNS] +
+                      [(k, np.float64, (6,)) for k in VECTOR_COLUMNS])
+STATE_DTYPE = np.dtype([(k, dtype) for k, (dtype, _) in SCALAR_COLUMNS.items()] +
+                       [("beat_count", np.int64), ("suggested_animation", np.bool_)] +
+                       [(k, np.float64, (6,)) for k in VECTOR_COLUMNS] +
+                       [("stereo", np.bool_), ("left", SIDE_DTYPE), ("right", SIDE_DTYPE),
+                        ("status", "S16"), ("peak", np.float64), ("message", "S64"),
+                        ("seq", np.int64)]) # Last, so a record copy writes it last: see SharedAudioState
+VECTOR_FIELDS = frozenset(VECTOR_COLUMNS)
+EMPTY_VECTOR = [0.0] * 6
+# Written by the analysis process: independent aligned 8-byte fields (seq publishes a record slot)
+STATUS_DTYPE = np.dtype([("seq", np.int64), ("callback_time", np.float64), ("stream_generation", np.int64),
+                         ("sample_rate", np.float64), ("overruns", np.int64), ("underruns", np.int64),
+                         ("dropped", np.int64), ("pending", np.int64), ("held", np.int64), ("error", "S128")])
+# Written by the main process: stream requests (published by bumping generation), live settings and
+# the record the reader currently holds
+CONTROL_DTYPE = np.dtype([("generation", np.int64), ("device", np.int64), ("channels", np.int64),
+                          ("sample_rate", np.float64), ("block_size", np.int64), ("gain", np.float64),
+                          ("flux_sensitivity", np.float64), ("rolling_window", np.int64), ("fft_size", np.int64),
+                          ("hop", np.int64), ("stop", np.bool_),
+                          ("reader_seq", np.int64)])
+HEALTH_DTYPE = np.dtype([("status", "S16"), ("peak", np.float64), ("message", "S64")])
+
+def _aligned(size): return (size + 63) & ~63
+STATUS_OFFSET = 0
+CONTROL_OFFSET = _aligned(STATUS_DTYPE.itemsize)
+STATE_OFFSET = CONTROL_OFFSET + _aligned(CONTROL_DTYPE.itemsize)
+SLOT_SIZE = _aligned(STATE_DTYPE.itemsize)
+SHARED_SIZE = STATE_OFFSET + 2 * SLOT_SIZE
+SHM_HAS_TRACK = 'track' in inspect.signature(shared_memory.SharedMemory).parameters # Python >= 3.13
+READ_RETRIES = 3 # A retry needs a publish between two loads a few us apart; more than one is already rare
+FENCE = threading.Lock()
+
+def _fence():
+    """
+    Memory barrier from Python: lock / unlock / lock / unlock. Unlock is a release and lock an acquire
+    whatever the primitive underneath, and a release followed by an acquire orders every earlier
+    access before every later one (ARMv8 STLR -> LDAR; locked instructions on x86).
+    """
+    FENCE.acquire(); FENCE.release()
+    FENCE.acquire(); FENCE.release()
+
+class SharedAudioState:
+    """
+    Fixed-layout audio state in a shared-memory block, double buffered. Record seq n lives in slot
+    n & 1 and status seq publishes it, so the writer only ever fills the slot nobody may be reading.
+    The reader claims a record by storing its seq in control reader_seq and re-checking that it is
+    still the published one; the writer skips a block (counted in status held) rather than refill a
+    slot whose older record is still claimed. A claimed record is therefore never written, and read()
+    hands out a read-only view of it, valid until the next read().
+
+    Python / NumPy emit no memory barriers, and ARM (the Pi) may make stores visible out of order, so
+    both sides fence (see _fence) between the record and the seq that publishes or claims it. Each
+    record also carries its seq as its last field, and read() refuses a record whose inner seq doesn't
+    match: nothing torn is ever returned.
+    """
+    __slots__ = ['shm', 'owner', 'status', 'control', 'slots', '_local', '_seen']
+    def __init__(self, name=None):
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=SHARED_SIZE)
+        elif SHM_HAS_TRACK:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Only the creator may unlink; older Pythons track attached blocks too
+            try: resource_tracker.unregister(self.shm._name, "shared_memory")
+            except: pass
+        buf = self.shm.buf
+        self.status = np.ndarray((), STATUS_DTYPE, buffer=buf, offset=STATUS_OFFSET)
+        self.control = np.ndarray((), CONTROL_DTYPE, buffer=buf, offset=CONTROL_OFFSET)
+        self.slots = tuple(np.ndarray((), STATE_DTYPE, buffer=buf, offset=STATE_OFFSET + i * SLOT_SIZE) for i in range(2))
+        self._local = np.zeros((), STATE_DTYPE)
+        self._seen = 0
+
+    @property
+    def name(self): return self.shm.name
+
+    def publish(self, state, health):
+        """Writer side: packs one AudioAnalyzer state (plus signal health) into the free slot and publishes it."""
+        seq = int(self.status['seq']) + 1
+        held = int(self.control['reader_seq'])
+        if held and held < seq - 1 and (held & 1) == (seq & 1):
+            self.status['held'] += 1 # Reader still holds the older record in that slot: keep the current one up
+            return False
+        left, right = state.get("left"), state.get("right")
+        self._local[()] = (tuple(state.get(k, default) for k, (_, default) in SCALAR_COLUMNS.items()) +
+                           (state.get("beat_count", 0), state.get("suggested_animation") is not None) +
+                           tuple(state.get(k, EMPTY_VECTOR) for k in VECTOR_COLUMNS) +
+                           (left is not None, self._side(left), self._side(right),
+                            health["status"].encode(), health["peak"], health["message"].encode()[:64], seq))
+        self.slots[seq & 1][()] = self._local
+        _fence() # Record visible before the seq that publishes it
+        self.status['seq'] = seq
+        return True
+
+    @staticmethod
+    def _side(side):
+        if side is None: side = {}
+        return tuple(side.get(k, SCALAR_COLUMNS[k][1]) for k in SIDE_COLUMNS) + tuple(side.get(k, EMPTY_VECTOR) for k in VECTOR_COLUMNS)
+
+    def read(self):
+        """
+        Reader side: a read-only STATE_DTYPE view of the newest record not seen before (valid until the
+        next read()), or None when nothing new was published.
+        """
+        status, control = self.status, self.control
+        for _ in range(READ_RETRIES):
+            seq = int(status['seq'])
+            if seq == self._seen: return None
+            control['reader_seq'] = seq # Claim first: the writer won't refill this slot while we hold it
+            _fence()
+            if int(status['seq']) != seq: continue # Published again meanwhile; claim the newer one
+            record = self.slots[seq & 1]
+            if int(record['seq']) != seq: continue
+            self._seen = seq
+            view = record.view()
+            view.flags.writeable = False
+            return view
+        return None
+
+    def close(self):
+        self.status = self.control = self.slots = None # Drop the views so the buffer can be released
+        self.shm.close()
+        if self.owner:
+            try: self.shm.unlink()
+            except: pass
+
+def record_items(record):
+    """
+    (key, value) pairs of a read() record for AudioState.update(): scalars and vectors as views (AudioState
+    copies them into its own arrays), side sub-states copied into dicts since they outlive the slot.
+    """
+    for k in SCALAR_COLUMNS: yield k, record[k]
+    yield "beat_count", record["beat_count"]
+    yield "suggested_animation", "random" if record["suggested_animation"] else None
+    for k in VECTOR_COLUMNS: yield k, record[k]
+    if record["stereo"]:
+        shared = {k: record[k].item() for k in SIDE_SHARED}
+        for key in ("left", "right"):
+            side = dict(zip(SIDE_DTYPE.names, record[key].item()))
+            for k in VECTOR_COLUMNS: side[k] = side[k].tolist()
+            side.update(shared)
+            yield key, side
+
+class AnalysisProcess:
+    """
+    Main-process handle for the analysis process: spawns it, forwards stream requests and analyzer
+    settings through the control block, and reads the published states.
+    """
+    def __init__(self):
+        self.shared = SharedAudioState() # Control block starts zeroed: rolling_window 0 = settings not synced yet
+        self.generation = 0
+        self.settings = None
+        self._health = np.array((b"WARM_UP", 0.0, b"Gathering signal data..."), HEALTH_DTYPE) # Copied per read: outlives the slot
+        script = os.path.abspath(__file__)
+        self.proc = subprocess.Popen([sys.executable, script, self.shared.name], cwd=os.path.dirname(script))
+        print(f"🧠 Analysis process started (pid {self.proc.pid})")
+
+    def alive(self): return self.proc.poll() is None
+
+    def open_stream(self, device, channels, sample_rate, block_size, timeout=5.0):
+        """(Re)opens the capture stream in the analysis process; returns its actual sample rate or raises RuntimeError."""
+        control, status = self.shared.control, self.shared.status
+        control['device'] = -1 if device is None else int(device)
+        control['channels'] = int(channels)
+        control['sample_rate'] = float(sample_rate)
+        control['block_size'] = int(block_size)
+        self.generation += 1
+        control['generation'] = self.generation # Publish
+        deadline = time.time() + timeout
+        while int(status['stream_generation']) != self.generation:
+            if not self.alive(): raise RuntimeError("Analysis process exited")
+            if time.time() > deadline: raise RuntimeError("Analysis process did not answer the stream request")
+            time.sleep(0.01)
+        error = status['error'].item().decode()
+        if error: raise RuntimeError(error)
+        return float(status['sample_rate'])
+
+    def sync_settings(self, analyzer):
+        """Mirrors the live analyzer settings (changed from the UI on the main process's analyzer)."""
+        stft = analyzer.stft
+        settings = (analyzer.gain, analyzer.flux_sensitivity_percentage, analyzer.rolling_window_size,
+                    stft.fft_size if stft else 0, stft.hop if stft else 0)
+        if settings == self.settings: return
+        control = self.shared.control
+        control['gain'], control['flux_sensitivity'], control['rolling_window'], control['fft_size'], control['hop'] = settings
+        self.settings = settings
+
+    def read(self):
+        """Newest unseen record (read-only view, see SharedAudioState.read / record_items), or None."""
+        record = self.shared.read()
+        if record is None: return None
+        for k in HEALTH_DTYPE.names: self._health[k] = record[k]
+        return record
+
+    @property
+    def health(self):
+        """Signal health of the last record read, in AudioAnalyzer.get_signal_health() form."""
+        health = self._health.item()
+        return {"status": health[0].decode(), "peak": health[1], "message": health[2].decode()}
+
+    def callback_time(self): return float(self.shared.status['callback_time'])
+
+    def stats(self):
+        status = self.shared.status
+        return {k: int(status[k]) for k in ("pending", "overruns", "underruns", "dropped", "held")}
+
+    def stop(self):
+        if self.shared.control is None: return # Already stopped
+        self.shared.control['stop'] = True
+        try: self.proc.wait(timeout=2.0)
+        except:
+            self.proc.kill()
+        self.shared.close()
+
+def run(name):
+    """Analysis process entry: capture into a SampleRing, analyze the freshest window, publish."""
+    import sounddevice as sd
+    shared = SharedAudioState(name)
+    status, control = shared.status, shared.control
+    analyzer = AudioAnalyzer()
+    ready = threading.Event()
+    current = {"ring": None, "stream": None, "max_backlog": 0}
+    generation, settings = 0, None
+    parent = os.getppid()
+
+    def audio_callback(indata, frames, time_info, cb_status):
+        status['callback_time'] = time.time()
+        if cb_status: print(cb_status)
+        ring = current["ring"]
+        if ring is not None:
+            ring.write(indata)
+            ready.set()
+
+    print("🧠 Analysis Process Running")
+    while not control['stop'] and os.getppid() == parent:
+        try:
+            if int(control['generation']) != generation:
+                generation = int(control['generation'])
+                if current["stream"]:
+                    try:
+                        current["stream"].stop()
+                        current["stream"].close()
+                    except: pass
+                    current["stream"] = None
+                device, channels = int(control['device']), int(control['channels'])
+                block_size = int(control['block_size'])
+                try:
+                    if analyzer.stereo != (channels == 2): analyzer.set_stereo(channels == 2) # Rebuilds keep no tempo lock
+                    current["ring"] = SampleRing(16 * block_size, channels)
+                    current["max_backlog"] = 2 * block_size
+                    stream = sd.InputStream(device=None if device < 0 else device, channels=channels, callback=audio_callback,
+                                            blocksize=block_size, samplerate=float(control['sample_rate']))
+                    stream.start()
+                    current["stream"] = stream
+                    if analyzer.sample_rate != float(stream.samplerate): analyzer.set_sample_rate(stream.samplerate)
+                    status['sample_rate'] = stream.samplerate
+                    status['error'] = b""
+                except Exception as e:
+                    print(f"❌ Analysis Stream Error: {e}")
+                    status['error'] = str(e).encode()[:128]
+                status['stream_generation'] = generation # Answer the request
+
+            wanted = (float(control['gain']), float(control['flux_sensitivity']), int(control['rolling_window']),
+                      int(control['fft_size']), int(control['hop']))
+            if wanted != settings and wanted[2]:
+                analyzer.set_gain(wanted[0])
+                analyzer.set_flux_sensitivity(wanted[1])
+                if wanted[2] != analyzer.rolling_window_size: analyzer.set_rolling_window(wanted[2])
+                stft = analyzer.stft
+                if wanted[3:] != ((stft.fft_size, stft.hop) if stft else (0, 0)): analyzer.set_stft(wanted[3] or None, wanted[4])
+                settings = wanted
+
+            ring = current["ring"]
+            ready.wait(timeout=0.1)
+            ready.clear()
+            if ring is None: continue
+            indata = ring.read(current["max_backlog"])
+            if indata is not None:
+                state = analyzer.process(indata)
+                if ring.intact(): shared.publish(state, analyzer.get_signal_health())
+            for k, v in ring.stats().items(): status[k] = v
+        except Exception as e:
+            print(f"⚠️ Analysis Process Error: {e}")
+            time.sleep(0.01)
+
+    if current["stream"]:
+        try: current["stream"].close()
+        except: pass
+    shared.close()
+
+if __name__ == "__main__":
+    run(sys.argv[1])
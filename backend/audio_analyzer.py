@@ -1,22 +1,476 @@
 import numpy as np
 import collections
+import inspect
 import time
+import wave
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Groupings of the 16 WLED bands: [start, end) pairs flattened into reduceat offsets
+BAND_GROUPS = [0, 4, 11]            # bass 0-3, mid 4-10, high 11-15
+BAND_GROUP_SIZES = np.array([4, 7, 5])
+BIN_GROUPS = [0, 3, 5, 7, 10, 14]   # Sub+Bass, Low-Mid, Mid, High-Mid, Presence, Air
+BIN_GROUP_SIZES = np.array([3, 2, 2, 3, 4, 2])
+
+# analyze_array() output columns: name -> (dtype, default when a block returns the empty state)
+SCALAR_COLUMNS = {
+    "bass": (np.float64, 0.0), "mid": (np.float64, 0.0), "high": (np.float64, 0.0),
+    "vol": (np.float64, 0.0), "flux": (np.float64, 0.0), "impact": (np.float64, 0.0),
+    "beat": (np.bool_, False), "bar": (np.bool_, False),
+    "bass_onset": (np.bool_, False), "high_onset": (np.bool_, False),
+    "beat_phase": (np.float64, 0.0), "bpm": (np.float64, 120.0),
+    "spectral_complexity": (np.float64, 0.5),
+}
+VECTOR_COLUMNS = ("bins", "attacks", "ratios")
+FFT_CHUNK_FRAMES = 1024 # Frames per batched FFT in analyze_array (bounds memory on long sets)
+
+# The gold-standard constants (smoothing, windows, lockouts) are tuned per 2048-sample frame;
+# shorter STFT hops get equivalent per-hop values (see _configure_frame_rate)
+REFERENCE_BLOCK = 2048
+DEFAULT_FFT_SIZE = 2048
+DEFAULT_HOP = 512
+RFFT_HAS_OUT = 'out' in inspect.signature(np.fft.rfft).parameters # NumPy >= 2.0
+
+# Tempo tracking (onset autocorrelation)
+TEMPO_MIN_BPM = 60.0
+TEMPO_MAX_BPM = 200.0
+TEMPO_PRIOR_BPM = 120.0   # Centre of the log-tempo prior that resolves half/double tempo
+TEMPO_HISTORY_SEC = 6.0   # Onset envelope length
+TEMPO_WARMUP_SEC = 2.5    # Envelope needed before the first estimate
+TEMPO_UPDATE_SEC = 0.25   # Re-estimate interval
+TEMPO_MIN_CONFIDENCE = 0.1 # Normalized autocorrelation peak below which the envelope has no pulse
+
+def frame_state(columns, i):
+    """Rebuilds the process()-style state dict for block i of an analyze_array() result."""
+    state = {k: columns[k][i].item() for k in SCALAR_COLUMNS}
+    state["beat_count"] = int(columns["beat_count"][i])
+    for k in VECTOR_COLUMNS: state[k] = columns[k][i].tolist()
+    state["suggested_animation"] = None
+    return state
+
+# AudioState layout. Floats lead in pack_binary_state order (flux .. beat_phase, then the 6 bins) so the
+# binary header packs straight from the array; flags/counters live in a small int array.
+STATE_FLOATS = ("flux", "bass", "mid", "high", "vol", "bpm", "beat_phase", "bins", "impact", "spectral_complexity", "attacks", "ratios")
+STATE_FLAGS = ("beat", "bass_onset", "high_onset", "bar", "suggested_animation", "beat_count")
+STATE_PACKED_FLOATS = 13 # flux .. bins
+STATE_PACKED_FLAGS = 3   # beat, bass_onset, high_onset
+
+def _state_layout():
+    """name -> (kind, start, stop). Kinds: 'f' float, 'v' 6-vector, 'b' flag, 'i' counter, 's' suggested animation."""
+    layout, pos = {}, 0
+    for name in STATE_FLOATS:
+        width = 6 if name in VECTOR_COLUMNS else 1
+        layout[name] = ('v' if width > 1 else 'f', pos, pos + width)
+        pos += width
+    for i, name in enumerate(STATE_FLAGS):
+        layout[name] = ('i' if name == "beat_count" else 's' if name == "suggested_animation" else 'b', i, i + 1)
+    return layout, pos
+STATE_LAYOUT, STATE_FLOAT_COUNT = _state_layout()
+
+class AudioState:
+    """
+    The live audio state as one preallocated record: numeric fields in a float32 array, flags and
+    counters in an int array, and everything else (vibe, mods, left/right, spotify, device_name...)
+    in a dict. Keeps the dict interface the engines read through. update() writes in place under a
+    version counter (odd while writing) so snapshot() can take a consistent copy without a lock.
+    """
+    __slots__ = ['values', 'flags', 'extra', 'version']
+    def __init__(self, **extra):
+        self.values = np.zeros(STATE_FLOAT_COUNT, dtype='<f4')
+        self.flags = np.zeros(len(STATE_FLAGS), dtype=np.int64)
+        self.extra = {}
+        self.version = 0
+        self.update({k: default for k, (_, default) in SCALAR_COLUMNS.items()}, **extra)
+
+    def __getitem__(self, key):
+        field = STATE_LAYOUT.get(key)
+        if field is None: return self.extra[key]
+        kind, i, j = field
+        if kind == 'f': return float(self.values[i])
+        if kind == 'v': return self.values[i:j].tolist()
+        if kind == 'b': return bool(self.flags[i])
+        if kind == 'i': return int(self.flags[i])
+        return "random" if self.flags[i] else None
+
+    def __setitem__(self, key, val):
+        field = STATE_LAYOUT.get(key)
+        if field is None:
+            self.extra[key] = val
+            return
+        kind, i, j = field
+        if kind == 'f' or kind == 'v': self.values[i:j] = val
+        elif kind == 's': self.flags[i] = val is not None
+        else: self.flags[i] = val
+
+    def get(self, key, default=None):
+        if key in STATE_LAYOUT: return self[key]
+        return self.extra.get(key, default)
+
+    def __contains__(self, key): return key in STATE_LAYOUT or key in self.extra
+    def __len__(self): return len(STATE_LAYOUT) + len(self.extra)
+    def __iter__(self):
+        yield from STATE_LAYOUT
+        yield from list(self.extra)
+    def keys(self): return list(self)
+    def items(self): return [(k, self[k]) for k in self]
+    def to_dict(self): return dict(self.items())
+
+    def pop(self, key, *default):
+        if key in STATE_LAYOUT: raise KeyError(f"{key} is a fixed AudioState field")
+        return self.extra.pop(key, *default)
+
+    def __delitem__(self, key): self.pop(key)
+
+    def update(self, state=(), **kwargs):
+        """Writes a process()-style dict (and/or keywords) in place."""
+        self.version += 1 # Odd: being written
+        try:
+            for key, val in (state.items() if hasattr(state, 'items') else state): self[key] = val
+            for key, val in kwargs.items(): self[key] = val
+        finally:
+            self.version += 1
+
+    def snapshot(self, out=None):
+        """Consistent copy of the whole state, into out (another AudioState, reused across calls) when given."""
+        if out is None: out = AudioState()
+        while True:
+            version = self.version
+            if version & 1:
+                time.sleep(0) # Writer is mid-update: let it finish
+                continue
+            np.copyto(out.values, self.values)
+            np.copyto(out.flags, self.flags)
+            out.extra = self.extra.copy()
+            if self.version == version: return out
+
+    def pack(self):
+        """flux..beat_phase + bins as 13 little-endian f32, then beat / bass_onset / high_onset as u8 (pack_binary_state layout)."""
+        return self.values[:STATE_PACKED_FLOATS].tobytes() + self.flags[:STATE_PACKED_FLAGS].astype(np.uint8).tobytes()
+
+class RollingWindow:
+    """
+    Sliding window of the last maxlen values with amortized O(1) min(), max() and sum().
+    Min/max use monotonic deques of (index, value); the running sum is re-synced from the
+    raw values once per window length so float drift can't accumulate.
+    """
+    __slots__ = ['maxlen', 'values', '_mins', '_maxs', '_count', '_sum']
+    def __init__(self, maxlen, values=()):
+        self.maxlen = maxlen
+        self.values = collections.deque(maxlen=maxlen)
+        self._mins = collections.deque() # Increasing values, oldest first
+        self._maxs = collections.deque() # Decreasing values, oldest first
+        self._count = 0
+        self._sum = 0.0
+        for v in values: self.append(v)
+
+    def append(self, val):
+        if len(self.values) == self.maxlen:
+            self._sum -= self.values[0]
+        self.values.append(val)
+        self._sum += val
+
+        i = self._count
+        self._count += 1
+        mins, maxs = self._mins, self._maxs
+        while mins and mins[-1][1] >= val: mins.pop()
+        mins.append((i, val))
+        while maxs and maxs[-1][1] <= val: maxs.pop()
+        maxs.append((i, val))
+        # Exactly one index leaves the window per append
+        if mins[0][0] <= i - self.maxlen: mins.popleft()
+        if maxs[0][0] <= i - self.maxlen: maxs.popleft()
+
+        if self._count % self.maxlen == 0:
+            self._sum = sum(self.values)
+
+    def min(self): return self._mins[0][1]
+    def max(self): return self._maxs[0][1]
+    def sum(self): return self._sum
+    def __len__(self): return len(self.values)
+    def __iter__(self): return iter(self.values)
+
+class SampleRing:
+    """
+    Preallocated float32 ring between the audio callback (single producer) and the analysis worker
+    (single consumer). Lock-free: the producer only advances `written`, the consumer only advances
+    `consumed`, and each index is published after its data. Samples are mirrored (buf[pos:pos + n] is
+    contiguous for any n <= capacity) so reads are views, not copies.
+    """
+    __slots__ = ['capacity', 'channels', 'buf', 'written', 'consumed', 'last_block', 'view_start',
+                 'overruns', 'underruns', 'dropped']
+    def __init__(self, capacity, channels=1):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self.buf = np.zeros((2 * self.capacity, channels), dtype=np.float32)
+        self.written = 0   # Total frames written (producer-owned)
+        self.consumed = 0  # Total frames handed to the consumer (consumer-owned)
+        self.last_block = 0
+        self.view_start = 0
+        self.overruns = 0  # Reads that skipped a backlog, or views the producer lapped
+        self.underruns = 0 # Reads that found nothing new
+        self.dropped = 0   # Frames skipped by overruns
+
+    def write(self, block):
+        """Producer side (audio callback). Copies one (frames, channels) block in; never blocks or allocates."""
+        n = len(block)
+        if n > self.capacity:
+            block, n = block[-self.capacity:], self.capacity
+        cap = self.capacity
+        start = self.written % cap
+        first = min(n, cap - start)
+        self.buf[start:start + first] = block[:first]
+        self.buf[start + cap:start + cap + first] = block[:first]
+        if first < n:
+            self.buf[:n - first] = block[first:]
+            self.buf[cap:cap + n - first] = block[first:]
+        self.last_block = n
+        self.written += n # Publish
+
+    def pending(self):
+        return self.written - self.consumed
+
+    def read(self, max_frames):
+        """
+        Consumer side. Returns a view of the newest unread frames, at most max_frames of them, or None
+        when nothing new arrived. An older backlog is skipped (counted in overruns/dropped) so latency
+        stays bounded.
+        """
+        written = self.written
+        n = written - self.consumed
+        if n <= 0:
+            self.underruns += 1
+            return None
+        if n > max_frames:
+            self.overruns += 1
+            self.dropped += n - max_frames
+            n = max_frames
+        start = written - n
+        self.view_start = start
+        self.consumed = written
+        pos = start % self.capacity
+        return self.buf[pos:pos + n]
+
+    def intact(self):
+        """False if the producer may have overwritten the last view while it was in use (counted as an overrun)."""
+        if self.written + self.last_block <= self.view_start + self.capacity: return True
+        self.overruns += 1
+        return False
+
+    def stats(self):
+        return {"pending": self.pending(), "overruns": self.overruns, "underruns": self.underruns, "dropped": self.dropped}
+
+class STFTStage:
+    """
+    Streaming STFT. Keeps the last fft_size samples per channel in a mirrored ring (ring[:, pos:pos + fft_size]
+    is always contiguous) and emits one Hann-windowed |rfft| frame every hop samples, however the input
+    is chunked. All channels go through one batched rfft; with several channels, mags holds the mix
+    (mean of the complex spectra, identical to transforming the averaged signal) and side_mags each
+    channel. Buffers are preallocated and only grow when one push yields more frames than before.
+    """
+    __slots__ = ['fft_size', 'hop', 'channels', 'window', 'ring', 'pos', 'to_hop', 'work',
+                 'frames', 'spectra', 'mix', 'mags', 'side_mags']
+    def __init__(self, fft_size=DEFAULT_FFT_SIZE, hop=DEFAULT_HOP, channels=1):
+        fft_size, hop = int(fft_size), int(hop)
+        if fft_size < 16 or not 0 < hop <= fft_size:
+            raise ValueError(f"Invalid STFT config: fft_size={fft_size}, hop={hop}")
+        self.fft_size = fft_size
+        self.hop = hop
+        self.channels = channels
+        # Periodic Hann scaled to unit mean so band energies stay comparable to an un-windowed block
+        self.window = (1.0 - np.cos(2 * np.pi * np.arange(fft_size) / fft_size)).astype(np.float32)
+        self.ring = np.zeros((channels, 2 * fft_size), dtype=np.float32)
+        self.pos = 0
+        self.to_hop = hop # Samples until the next frame is due
+        self.work = np.zeros((channels, 2 * fft_size + REFERENCE_BLOCK), dtype=np.float32)
+        self._alloc_frames(8)
+
+    def _alloc_frames(self, count):
+        bins = self.fft_size // 2 + 1
+        self.frames = np.zeros((count, self.channels, self.fft_size), dtype=np.float32)
+        self.spectra = np.zeros((count, self.channels, bins), dtype=np.complex64)
+        self.mags = np.zeros((count, bins), dtype=np.float32)
+        if self.channels > 1:
+            self.mix = np.zeros((count, bins), dtype=np.complex64)
+            self.side_mags = np.zeros((count, self.channels, bins), dtype=np.float32)
+        else:
+            self.mix = self.side_mags = None
+
+    def _write(self, x):
+        """x: channels x samples"""
+        n = self.fft_size
+        L = x.shape[1]
+        if L >= n:
+            self.ring[:, :n] = x[:, -n:]
+            self.ring[:, n:] = x[:, -n:]
+            self.pos = 0
+            return
+        p = self.pos
+        first = min(L, n - p)
+        self.ring[:, p:p + first] = x[:, :first]
+        self.ring[:, p + n:p + n + first] = x[:, :first]
+        rest = L - first
+        if rest:
+            self.ring[:, :rest] = x[:, first:]
+            self.ring[:, n:n + rest] = x[:, first:]
+        self.pos = (p + L) % n
+
+    def push(self, samples):
+        """
+        Appends samples (1-D, or samples x channels). Returns (count, ends): the number of frames
+        completed, whose magnitudes are in self.mags[:count] (and side_mags), and the offset into
+        samples at which each one completed.
+        """
+        n, hop, L = self.fft_size, self.hop, len(samples)
+        x = samples.reshape(L, -1).T # channels x samples (view)
+        if self.to_hop > L:
+            self._write(x)
+            self.to_hop -= L
+            return 0, ()
+
+        first = self.to_hop
+        count = (L - first) // hop + 1
+        ends = range(first, first + count * hop, hop)
+        if self.work.shape[1] < n + L:
+            self.work = np.zeros((self.channels, max(n + L, 2 * self.work.shape[1])), dtype=np.float32)
+        if len(self.frames) < count: self._alloc_frames(max(count, 2 * len(self.frames)))
+
+        # History followed by the new samples: the frame completing at offset e is work[:, e:e + n]
+        work = self.work[:, :n + L]
+        work[:, :n] = self.ring[:, self.pos:self.pos + n]
+        work[:, n:] = x
+        windows = sliding_window_view(work, n, axis=1)[:, first:ends[-1] + 1:hop].transpose(1, 0, 2)
+        frames = self.frames[:count]
+        np.subtract(windows, np.mean(windows, axis=2, keepdims=True), out=frames)
+        frames *= self.window
+        if RFFT_HAS_OUT: spectra = np.fft.rfft(frames, axis=2, out=self.spectra[:count])
+        else: spectra = np.fft.rfft(frames, axis=2)
+        if self.channels == 1:
+            np.abs(spectra[:, 0], out=self.mags[:count])
+        else:
+            np.abs(spectra, out=self.side_mags[:count])
+            mix = np.sum(spectra, axis=1, out=self.mix[:count])
+            mix *= 1.0 / self.channels
+            np.abs(mix, out=self.mags[:count])
+
+        self._write(x)
+        self.to_hop = hop - (L - ends[-1])
+        return count, ends
+
+class StereoSide:
+    """Per-channel state for the left/right sub-states (normalization windows are shared with the mix)."""
+    __slots__ = ['prev_bands', 'prev_raw_bins', 'prev_bins', 'smooth_vol']
+    def __init__(self, lag):
+        self.prev_bands = collections.deque([[0.0] * 3] * lag, maxlen=lag)
+        self.prev_raw_bins = collections.deque([[0.0] * 6] * lag, maxlen=lag)
+        self.prev_bins = [0.0] * 6
+        self.smooth_vol = 0.0
+
+class TempoTracker:
+    """
+    Tempo from the FFT autocorrelation of a multi-second onset-strength envelope, re-estimated every
+    TEMPO_UPDATE_SEC, plus a beat predictor that phase-locks to the envelope (comb over the last few
+    periods) and drives beat_phase. Per-frame cost is one ring write; the FFTs run a few times a second.
+    """
+    __slots__ = ['frame_rate', 'latency', 'size', 'env', 'pos', 'count', 'interval', 'nfft', 'lags', 'weights',
+                 'bpm', 'period', 'anchor', 'confidence', '_pending']
+    def __init__(self, frame_rate, latency=0.0):
+        self.frame_rate = float(frame_rate)
+        self.latency = latency # Seconds the onset envelope trails the audio (half the analysis window)
+        self.size = max(16, round(TEMPO_HISTORY_SEC * self.frame_rate))
+        self.env = np.zeros(2 * self.size, dtype=np.float64) # Mirrored ring: env[pos:pos + size] is oldest-first
+        self.interval = max(1, round(TEMPO_UPDATE_SEC * self.frame_rate))
+        self.nfft = 1 << (2 * self.size - 1).bit_length() # Zero-padded: linear, not circular, autocorrelation
+
+        # Candidate lags (frames per beat) and their log-Gaussian tempo prior (1 octave std dev)
+        lo = max(1, int(60.0 * self.frame_rate / TEMPO_MAX_BPM))
+        hi = min(self.size // 2 - 1, int(np.ceil(60.0 * self.frame_rate / TEMPO_MIN_BPM)))
+        self.lags = np.arange(lo, hi + 1)
+        self.weights = np.exp(-0.5 * np.log2(60.0 * self.frame_rate / self.lags / TEMPO_PRIOR_BPM) ** 2)
+        self.reset()
+
+    def reset(self):
+        self.env[:] = 0.0
+        self.pos = 0
+        self.count = 0
+        self.bpm = None # None until the first confident estimate
+        self.period = None # Seconds per beat
+        self.anchor = None # Time of a predicted beat
+        self.confidence = 0.0
+        self._pending = None # Tempo jump waiting for a second confirming estimate
+
+    def push(self, onset, now):
+        """Adds one frame of onset strength (stamped now) and re-estimates when due."""
+        self.env[self.pos] = onset
+        self.env[self.pos + self.size] = onset
+        self.pos = (self.pos + 1) % self.size
+        self.count += 1
+        if self.count >= TEMPO_WARMUP_SEC * self.frame_rate and self.count % self.interval == 0:
+            self._estimate(now)
+
+    def phase(self, now):
+        """Position within the current beat (0-1) according to the locked predictor."""
+        return ((now - self.anchor) / self.period) % 1.0
+
+    def _estimate(self, now):
+        env = self.env[self.pos:self.pos + self.size][-min(self.count, self.size):]
+        x = env - env.mean()
+        ac = np.fft.irfft(np.abs(np.fft.rfft(x, self.nfft)) ** 2, self.nfft)
+        if ac[0] <= 1e-12: return
+        ac = ac[:2 * self.lags[-1] + 2] / ac[0]
+
+        # Weighted peak, reinforced by its second harmonic (a true period also repeats at 2x the lag)
+        score = (ac[self.lags] + 0.5 * ac[2 * self.lags]) * self.weights
+        best = self.lags[0] + int(np.argmax(score))
+        self.confidence = float(ac[best])
+        if self.confidence < TEMPO_MIN_CONFIDENCE: return
+        # Parabolic interpolation between neighbouring lags for sub-frame period resolution
+        a, b, c = ac[best - 1], ac[best], ac[best + 1]
+        denom = a - 2 * b + c
+        lag = best + (0.5 * (a - c) / denom if denom < 0 else 0.0)
+        bpm = 60.0 * self.frame_rate / lag
+
+        if self.bpm is None:
+            self.bpm = bpm
+        elif abs(bpm - self.bpm) < 0.04 * self.bpm:
+            self.bpm = self.bpm * 0.7 + bpm * 0.3
+            self._pending = None
+        elif self._pending is not None and abs(bpm - self._pending) < 0.04 * bpm:
+            self.bpm = bpm # Confirmed tempo change
+            self._pending = None
+        else:
+            self._pending = bpm
+            return
+
+        # Phase: comb over the last few beats; offset (frames back from now) with the most onset energy
+        period = 60.0 / self.bpm
+        p = period * self.frame_rate
+        beats = max(1, min(8, int((len(env) - 1) / p)))
+        offsets = np.arange(int(p))
+        idx = len(env) - 1 - offsets[None, :] - np.round(np.arange(beats)[:, None] * p).astype(np.intp)
+        back = int(np.argmax(env[idx].sum(axis=0))) / self.frame_rate + self.latency
+
+        if self.anchor is None:
+            self.anchor = now - back
+        else:
+            # Keep the predicted phase continuous across tempo updates, then pull it towards the measurement
+            current = self.phase(now)
+            error = ((back / period - current + 0.5) % 1.0) - 0.5
+            self.anchor = now - (current + 0.3 * error) * period
+        self.period = period
 
 class AudioAnalyzer:
-    def __init__(self):
+    def __init__(self, sample_rate=44100, rolling_window_size=300):
         # WLED Frequency Ranges (Hz)
         self.wled_freqs = [
             86, 129, 216, 301, 430, 560, 818, 1120, 
             1421, 1895, 2412, 3015, 3704, 4479, 7106, 9259
         ]
+        self.sample_rate = sample_rate
+        self._band_layout_key = None # (block size, sample rate) the cached layout was built for
+        self._frame_scale = 1.0 # Analysis frame length relative to REFERENCE_BLOCK
         
-        # Audio History for Rolling Normalization
+        # Audio History for Rolling Normalization (see set_rolling_window)
         self.rolling_window_size = 300 # Approx 5-10 seconds @ 30-60 updates/sec
-        self.history_bass = collections.deque(maxlen=self.rolling_window_size)
-        self.history_mid  = collections.deque(maxlen=self.rolling_window_size)
-        self.history_high = collections.deque(maxlen=self.rolling_window_size)
-        self.history_flux = collections.deque(maxlen=self.rolling_window_size)
-        self.history_raw_max = collections.deque(maxlen=self.rolling_window_size)
+        self.set_rolling_window(rolling_window_size)
 
         # Beat Detection State
         self.last_beat_time = 0.0
@@ -39,9 +493,7 @@ class AudioAnalyzer:
         # Simple Timer for pattern switching
         self.frames_since_switch = 0
         self.auto_switch_threshold = 400 
-        self.prev_bands = [0.0, 0.0, 0.0]
         self.prev_bins = [0.0] * 6
-        self.prev_raw_bins = [0.0] * 6
         self.beat_count = 0
         self.flux_sensitivity_percentage = 0.5 # Track raw slider percentage (0-1)
         self.cumulative_max = 3.0 # LOW Initial Baseline (allows quick adaptation to quiet starts)
@@ -50,13 +502,18 @@ class AudioAnalyzer:
         # Low bins (0-2): 0.70, Mid bins (3-4): 0.85, High bin (5): 0.90
         self.smoothing_configs = [0.70, 0.70, 0.70, 0.85, 0.85, 0.90]
 
+        # Block mode by default; overlapped STFT only when configured (see set_stft), optional left/right analysis (see set_stereo)
+        self._last_state = self.get_empty_state()
+        self.stereo = False
+        self.set_stft(None)
+
     def get_signal_health(self):
         """Analyze raw peak history to detect environment-level issues (Spotify vol, ALSA)."""
-        if not self.history_raw_max or len(self.history_raw_max) < 20:
+        if not self.history_raw_max or len(self.history_raw_max) < self._health_warmup:
             return {"status": "WARM_UP", "peak": 0.0, "message": "Gathering signal data..."}
 
         # Find the peak in the rolling window (last ~5-10s)
-        peak = max(self.history_raw_max)
+        peak = self.history_raw_max.max()
 
         if peak < 4.0:
             # Signal is basically silence
@@ -70,6 +527,93 @@ class AudioAnalyzer:
         
         return {"status": "HEALTHY", "peak": float(round(peak, 3)), "message": "Audio signal levels are optimal."}
 
+    def set_rolling_window(self, size):
+        """Resizes the normalization / flux / peak windows (in reference blocks), keeping the most recent history."""
+        self.rolling_window_size = max(10, int(size))
+        frames = max(10, round(self.rolling_window_size / self._frame_scale))
+        for name in ('history_bass', 'history_mid', 'history_high', 'history_flux', 'history_raw_max'):
+            old = getattr(self, name, ())
+            setattr(self, name, RollingWindow(frames, list(old)[-frames:]))
+
+    def set_stft(self, fft_size=DEFAULT_FFT_SIZE, hop=DEFAULT_HOP):
+        """
+        Analyze fft_size-point Hann-windowed frames every hop samples, independent of the block size the
+        device delivers. set_stft(None) goes back to one un-windowed FFT per delivered block.
+        """
+        self.stft = STFTStage(fft_size, hop, 2 if self.stereo else 1) if fft_size else None
+        self._configure_frame_rate()
+
+    def set_stereo(self, enabled):
+        """
+        Also analyze the first two input channels separately and attach them as state['left'] /
+        state['right'] (mono input counts as dual mono). Both go through the mix's FFT call, so
+        the added cost is the per-side band math, not a second analyzer.
+        """
+        self.stereo = bool(enabled)
+        if self.stft: self.set_stft(self.stft.fft_size, self.stft.hop)
+        else: self._configure_frame_rate()
+
+    def _configure_frame_rate(self):
+        """Derives per-frame smoothing / window / lag values from the per-reference-block gold standards."""
+        s = self.stft.hop / REFERENCE_BLOCK if self.stft else 1.0
+        self._frame_scale = s
+        self._vol_keep = 0.7 ** s
+        self._spectral_keep = 0.92 ** s
+        self._out_vol_keep = 0.5 ** s
+        self._peak_decay = 0.999995 ** s
+        self._bin_keep = [c ** s for c in self.smoothing_configs]
+        self._switch_frames = round(self.auto_switch_threshold / s)
+        self._norm_warmup = max(1, round(10 / s))
+        self._health_warmup = max(1, round(20 / s))
+        self.set_rolling_window(self.rolling_window_size)
+        self._build_tempo()
+
+        # Flux / attacks compare against the frame one reference block back, so onset magnitudes
+        # (and the thresholds tuned on them) don't shrink with the hop. Oldest entry first.
+        lag = max(1, round(1 / s))
+        last_bands = self.prev_bands[-1] if hasattr(self, 'prev_bands') else [0.0] * 3
+        last_raw_bins = self.prev_raw_bins[-1] if hasattr(self, 'prev_raw_bins') else [0.0] * 6
+        self.prev_bands = collections.deque([last_bands] * lag, maxlen=lag)
+        self.prev_raw_bins = collections.deque([last_raw_bins] * lag, maxlen=lag)
+        self._sides = (StereoSide(lag), StereoSide(lag))
+
+    def set_sample_rate(self, sample_rate):
+        """Match the input stream's actual rate (band layout is rebuilt on the next block)."""
+        self.sample_rate = float(sample_rate)
+        self._build_tempo()
+
+    def _build_tempo(self):
+        frame = self.stft.hop if self.stft else REFERENCE_BLOCK
+        window = self.stft.fft_size if self.stft else REFERENCE_BLOCK
+        self.tempo = TempoTracker(self.sample_rate / frame, latency=window / (2.0 * self.sample_rate))
+
+    def _get_band_layout(self, n):
+        """
+        FFT bin ranges of the 16 WLED bands for an n-sample block, cached per (n, sample rate).
+        Returns (starts, counts, stop): band i covers fft[starts[i]:starts[i] + counts[i]], bands are
+        contiguous so one np.add.reduceat over fft[:stop] sums them all. Empty bands (beyond Nyquist
+        on tiny blocks) only ever occur at the top and are excluded from starts/counts.
+        """
+        key = (n, self.sample_rate)
+        if key != self._band_layout_key:
+            freqs = np.fft.rfftfreq(n, 1 / self.sample_rate)
+            starts, counts = [], []
+            current_fft_idx = 1
+            for cutoff in self.wled_freqs:
+                start = current_fft_idx
+                while current_fft_idx < len(freqs) and freqs[current_fft_idx] < cutoff:
+                    current_fft_idx += 1
+                if current_fft_idx == start: current_fft_idx += 1
+                count = min(current_fft_idx, len(freqs)) - start
+                if count > 0:
+                    starts.append(start)
+                    counts.append(count)
+            self._band_starts = np.array(starts, dtype=np.intp)
+            self._band_counts = np.array(counts, dtype=np.float64)
+            self._band_stop = starts[-1] + counts[-1] if starts else 0
+            self._band_layout_key = key
+        return self._band_starts, self._band_counts, self._band_stop
+
     def set_gain(self, val: float):
         """Set normalization gain (Sensitivity)"""
         self.gain = max(0.01, min(5.0, float(val)))
@@ -88,10 +632,11 @@ class AudioAnalyzer:
     def _normalize(self, val, history):
         """Perform rolling normalization (val - history_min) / (history_max - history_min)"""
         history.append(val)
-        if len(history) < 10: return 0.5 # Not enough data
-        
-        min_val = min(history)
-        max_val = max(history)
+        return self._scale(val, len(history), history.min(), history.max())
+
+    def _scale(self, val, count, min_val, max_val):
+        """Normalizes val against a window of count values spanning [min_val, max_val]."""
+        if count < self._norm_warmup: return 0.5 # Not enough data
         
         # SANE PEAK: Instead of normalizing against absolute max in history (which might be noise),
         # use a minimum baseline for the 'max' so tiny sounds aren't boosted to 100%.
@@ -106,48 +651,170 @@ class AudioAnalyzer:
         if indata.size == 0: return self.get_empty_state()
         if now is None: now = time.time()
         
+        # 1. Clean & FFT (now stamps the end of the block)
+        side_mags = None
+        if self.stereo:
+            # Left / right (dual mono for single-channel input); the mix is derived from their spectra
+            x = indata[:, :2] if indata.shape[1] >= 2 else np.repeat(indata[:, :1], 2, axis=1)
+            if self.stft is None:
+                x = (x - np.mean(x, axis=0)).T
+                spectra = np.fft.rfft(x, axis=1)
+                side_mags = np.abs(spectra)[np.newaxis]
+                fft_raw = np.abs(np.mean(spectra, axis=0))[np.newaxis]
+                n, times = len(indata), [now]
+            else:
+                count, ends = self.stft.push(x)
+                fft_raw, side_mags = self.stft.mags[:count], self.stft.side_mags[:count]
+                n, times = self.stft.fft_size, [now - (len(x) - e) / self.sample_rate for e in ends]
+        else:
+            mono = np.mean(indata, axis=1)
+            if self.stft is None:
+                mono = mono - np.mean(mono)
+                fft_raw = np.abs(np.fft.rfft(mono))[np.newaxis]
+                n, times = len(mono), [now]
+            else:
+                count, ends = self.stft.push(mono)
+                fft_raw = self.stft.mags[:count]
+                n, times = self.stft.fft_size, [now - (len(mono) - e) / self.sample_rate for e in ends]
+
+        # 2-3.5 Raw bands / bins
+        bands, raw_bins = self._band_energies(fft_raw, n)
+        sides = None
+        if side_mags is not None and len(side_mags):
+            frames = len(side_mags)
+            side_bands, side_bins = self._band_energies(side_mags.reshape(2 * frames, -1), n)
+            sides = list(zip(side_bands.reshape(frames, 2, 3).tolist(), side_bins.reshape(frames, 2, 6).tolist()))
+        return self._step_frames(bands.tolist(), raw_bins.tolist(), times, sides)
+
+    def _step_frames(self, bands, raw_bins, times, sides=None):
+        """
+        Runs _step over the frames that completed in one delivered block. Returns the last frame's state
+        with one-shot events (beat, bar, onsets) latched across all of them so none are dropped.
+        sides: per frame, ([left bands, right bands], [left bins, right bins]) in stereo mode.
+        """
+        if not times:
+            # No hop completed in this block: hold the last state
+            state = dict(self._last_state, beat=False, bar=False, bass_onset=False, high_onset=False)
+            if self.stereo:
+                for key in ('left', 'right'):
+                    state[key] = dict(state.get(key) or self._empty_side(), beat=False, bar=False, bass_onset=False, high_onset=False)
+            return state
+        beat = bar = bass_onset = high_onset = False
+        side_onsets = [[False, False], [False, False]]
+        for i, ((raw_bass, raw_mid, raw_high), bins, now) in enumerate(zip(bands, raw_bins, times)):
+            state = self._step(now, raw_bass, raw_mid, raw_high, bins, sides[i] if sides else None)
+            beat = beat or state["beat"]
+            bar = bar or state["bar"]
+            bass_onset = bass_onset or state["bass_onset"]
+            high_onset = high_onset or state["high_onset"]
+            if "left" in state:
+                for onsets, side in zip(side_onsets, (state["left"], state["right"])):
+                    onsets[0] = onsets[0] or side["bass_onset"]
+                    onsets[1] = onsets[1] or side["high_onset"]
+        if len(times) > 1:
+            state.update(beat=beat, bar=bar, bass_onset=bass_onset, high_onset=high_onset)
+        if self.stereo:
+            # Rhythm is a property of the mix: sides share its beat / tempo / phase
+            shared = {k: state.get(k, 0) for k in ("beat", "bar", "beat_phase", "beat_count", "bpm")}
+            shared["beat_count"] = self.beat_count
+            for key, onsets in zip(("left", "right"), side_onsets):
+                side = state.get(key) or self._empty_side()
+                side.update(shared, bass_onset=onsets[0], high_onset=onsets[1])
+                state[key] = side
+        self._last_state = state
+        return state
+
+    def _band_energies(self, fft_mag, n):
+        """
+        Raw energies from |rfft| rows (frames x bins) of n-sample blocks.
+        Returns (bands, bins): frames x 3 (bass, mid, high) and frames x 6 (see BIN_GROUPS).
+        """
+        # 2. Map to 16 WLED Bins (band edges cached per block size / sample rate)
+        starts, counts, stop = self._get_band_layout(n)
+        wled_bins = np.zeros((len(fft_mag), 16))
+        if len(starts):
+            wled_bins[:, :len(starts)] = np.add.reduceat(fft_mag[:, :stop], starts, axis=1) / counts
+
+        # 3. Calculate Raw Bands
+        bands = np.add.reduceat(wled_bins, BAND_GROUPS, axis=1) / BAND_GROUP_SIZES
+        
+        # 3.5 Calculate 6 Frequency Bins
+        # 0: Sub + Bass, 1: Low-Mid, 2: Mid, 3: High-Mid, 4: Presence, 5: Air / High
+        bins = np.add.reduceat(wled_bins, BIN_GROUPS, axis=1) / BIN_GROUP_SIZES
+        return bands, bins
+
+    def _attacks(self, raw_bins, ref_bins, global_peak):
+        """Rate of rise per bin against the frame one reference block back."""
+        peak, gain = global_peak + 1e-6, self.gain
+        return [min(1.0, float(max(0, r - ref)) / peak * gain) for r, ref in zip(raw_bins, ref_bins)]
+
+    def _smooth_bins(self, raw_bins, prev_bins, global_peak):
+        """Gated, peak-normalized and smoothed 6-bin output (prev_bins: last frame's output)."""
+        gain = self.gain
+        vals = [float(v) for v in raw_bins]
+        # Bass Optimization: gate sub-bass noise floor and downscale to prevent
+        # low-end energy from dominating the bin array and inflating impact scores.
+        vals[0] = max(0.0, vals[0] - 0.08) * 0.5
+        vals[1] = max(0.0, vals[1] - 0.03) * 0.7
+
+        # --- SNAPPY FREQUENCY-AWARE SMOOTHING ---
+        # Gold Standard Coefficients from self.smoothing_configs (per-frame equivalents)
+        return [min(1.0, max(0.0, prev * keep + min(1.0, (val / global_peak) * gain) * (1.0 - keep)))
+                for prev, keep, val in zip(prev_bins, self._bin_keep, vals)]
+
+    def _side_step(self, side, raw_bands, raw_bins, global_peak, windows):
+        """
+        Band state of one stereo channel for the current frame. Normalized against the mix's rolling
+        windows and peak (so a hard-panned source reads louder on its own side); flux, onsets, attacks
+        and bin smoothing mirror the mix's.
+        """
+        out_bass, out_mid, out_high = [min(1.0, self._scale(v, *w) * self.gain) for v, w in zip(raw_bands, windows)]
+
+        out_vol = min(1.0, (max(raw_bands) / global_peak) * self.gain)
+        side.smooth_vol = side.smooth_vol * self._out_vol_keep + out_vol * (1.0 - self._out_vol_keep)
+
+        ref_bands = side.prev_bands[0]
+        bass_delta = max(0, out_bass - ref_bands[0])
+        mid_delta = max(0, out_mid - ref_bands[1])
+        high_delta = max(0, out_high - ref_bands[2])
+        side.prev_bands.append([out_bass, out_mid, out_high])
+
+        attacks = self._attacks(raw_bins, side.prev_raw_bins[0], global_peak)
+        side.prev_raw_bins.append(raw_bins)
+        side.prev_bins = self._smooth_bins(raw_bins, side.prev_bins, global_peak)
+        total_energy = sum(raw_bins) + 1e-6
+
+        return {
+            "bass": out_bass,
+            "mid": out_mid,
+            "high": out_high,
+            "vol": side.smooth_vol,
+            "flux": (bass_delta * 1.0) + (mid_delta * 0.4) + (high_delta * 0.1),
+            "bass_onset": bass_delta > 0.15,
+            "high_onset": high_delta > 0.12,
+            "impact": max(attacks),
+            "attacks": attacks,
+            "ratios": [b / total_energy for b in raw_bins],
+            "bins": side.prev_bins,
+        }
+
+    def _empty_side(self):
+        state = self.get_empty_state()
+        for key in ("vibe", "transient", "suggested_animation"): del state[key]
+        return state
+
+    def _step(self, now, raw_bass, raw_mid, raw_high, raw_bins, sides=None):
+        """Stateful part of process(): peak tracking, normalization, flux and beat detection for one analysis frame."""
         # Initialize timestamps on first frame to support virtual time / reset
         if not hasattr(self, '_time_initialized') or now < self.last_sound_time - 10.0:
             self.last_sound_time = now
             self.prev_beat_timestamp = now - 1.0
             self._time_initialized = True
 
-        # 1. Clean & FFT
-        mono = np.mean(indata, axis=1)
-        mono = mono - np.mean(mono)
-        fft_raw = np.abs(np.fft.rfft(mono))
-        freqs = np.fft.rfftfreq(len(mono), 1/44100) 
-        
-        # 2. Map to 16 WLED Bins
-        wled_bins = [0.0] * 16
-        current_fft_idx = 1
-        for i, cutoff in enumerate(self.wled_freqs):
-            start = current_fft_idx
-            while current_fft_idx < len(freqs) and freqs[current_fft_idx] < cutoff:
-                current_fft_idx += 1
-            if current_fft_idx == start: current_fft_idx += 1 
-            chunk = fft_raw[start:current_fft_idx]
-            if chunk.size > 0: wled_bins[i] = np.mean(chunk)
-
-        # 3. Calculate Raw Bands
-        raw_bass = np.mean(wled_bins[0:4])
-        raw_mid  = np.mean(wled_bins[4:11])
-        raw_high = np.mean(wled_bins[11:16])
-        
-        # 3.5 Calculate 6 Frequency Bins
-        raw_bins = [
-            np.mean(wled_bins[0:3]),   # 0: Sub + Bass
-            np.mean(wled_bins[3:5]),   # 1: Low-Mid
-            np.mean(wled_bins[5:7]),   # 2: Mid
-            np.mean(wled_bins[7:10]),  # 3: High-Mid
-            np.mean(wled_bins[10:14]), # 4: Presence
-            np.mean(wled_bins[14:16])  # 5: Air / High
-        ]
-        
         # 4. Silence Reset & Peak Tracking
         current_raw_vol = (raw_bass + raw_mid + raw_high) / 3.0
         if not hasattr(self, 'smooth_raw_vol'): self.smooth_raw_vol = 0.0
-        self.smooth_raw_vol = self.smooth_raw_vol * 0.7 + current_raw_vol * 0.3
+        self.smooth_raw_vol = self.smooth_raw_vol * self._vol_keep + current_raw_vol * (1.0 - self._vol_keep)
         raw_vol = self.smooth_raw_vol
         
         # 3.8 SPECTRAL complexity (Shimmer)
@@ -156,7 +823,7 @@ class AudioAnalyzer:
         # Low complexity = Bass Groove (Mid Vibe)
         spectral_raw = (raw_mid + raw_high) / (raw_bass + raw_mid + raw_high + 1e-6)
         if not hasattr(self, 'smooth_spectral'): self.smooth_spectral = 0.5
-        self.smooth_spectral = self.smooth_spectral * 0.92 + spectral_raw * 0.08
+        self.smooth_spectral = self.smooth_spectral * self._spectral_keep + spectral_raw * (1.0 - self._spectral_keep)
         spectral_complexity = float(self.smooth_spectral)
         
         current_raw_max = max(raw_bass, raw_mid, raw_high)
@@ -164,10 +831,10 @@ class AudioAnalyzer:
         # STABLE PEAK TRACKING (Intro-Aware):
         # We maintain a cumulative max that NEVER drops fast.
         # Sane Minimum 100.0 assumes a club-level signal is coming.
-        self.cumulative_max = max(25.0, self.cumulative_max * 0.999995, current_raw_max) 
+        self.cumulative_max = max(25.0, self.cumulative_max * self._peak_decay, current_raw_max) 
         
         # Reference peak is the maximum of recent history or the cumulative ceiling
-        global_peak = max(self.cumulative_max, max(self.history_raw_max) if self.history_raw_max else self.cumulative_max)
+        global_peak = max(self.cumulative_max, self.history_raw_max.max() if self.history_raw_max else self.cumulative_max)
         self.history_raw_max.append(current_raw_max)
 
         if raw_vol > 0.00001:  # Lowered from 0.0002 for sensitvity
@@ -175,9 +842,11 @@ class AudioAnalyzer:
         elif now - self.last_sound_time > 5.0:
             self.bpm = 120.0
             self.bpm_list = []
+            self.tempo.reset()
             return self.get_empty_state()
         
         if raw_vol < 0.00001:  # Lowered from 0.0002 for sensitivity
+            self.tempo.push(0.0, now)
             return self.get_empty_state()
 
         # --- Timbre (Spectral Ratios) ---
@@ -185,8 +854,8 @@ class AudioAnalyzer:
         ratios = [float(b / total_energy) for b in raw_bins]
         
         # --- Impact (Rate of Rise / Attacks) ---
-        attacks = [min(1.0, float(max(0, raw_bins[i] - self.prev_raw_bins[i])) / (global_peak + 1e-6) * self.gain) for i in range(6)]
-        self.prev_raw_bins = list(raw_bins)
+        attacks = self._attacks(raw_bins, self.prev_raw_bins[0], global_peak)
+        self.prev_raw_bins.append(list(raw_bins))
 
         # 5. ROLLING NORMALIZATION
         out_bass = self._normalize(raw_bass, self.history_bass)
@@ -196,7 +865,7 @@ class AudioAnalyzer:
         out_vol = min(1.0, (current_raw_max / global_peak) * self.gain)
         # Smooth out_vol slightly to prevent UI flickering on borderline signals
         if not hasattr(self, '_smooth_out_vol'): self._smooth_out_vol = out_vol
-        self._smooth_out_vol = self._smooth_out_vol * 0.5 + out_vol * 0.5
+        self._smooth_out_vol = self._smooth_out_vol * self._out_vol_keep + out_vol * (1.0 - self._out_vol_keep)
         out_vol = self._smooth_out_vol
 
         out_bass = min(1.0, out_bass * self.gain)
@@ -205,9 +874,10 @@ class AudioAnalyzer:
         
         # 6. FLUX CALCULATION (Weighted for Beat Detection)
         # We prioritize Bass for BPM estimation to avoid double-triggering on snares or high-hats.
-        bass_delta = max(0, out_bass - self.prev_bands[0])
-        mid_delta  = max(0, out_mid - self.prev_bands[1])
-        high_delta = max(0, out_high - self.prev_bands[2])
+        ref_bands = self.prev_bands[0]
+        bass_delta = max(0, out_bass - ref_bands[0])
+        mid_delta  = max(0, out_mid - ref_bands[1])
+        high_delta = max(0, out_high - ref_bands[2])
         
         # Broadband flux for visualizers (all frequencies)
         flux_broadband = bass_delta + mid_delta + high_delta
@@ -220,22 +890,9 @@ class AudioAnalyzer:
         bass_onset = bass_delta > 0.15
         high_onset = high_delta > 0.12
 
-        self.prev_bands = [out_bass, out_mid, out_high]
+        self.prev_bands.append([out_bass, out_mid, out_high])
         
-        out_bins = [0.0] * 6
-        for bi in range(6):
-            val = float(raw_bins[bi])
-            # Bass Optimization: gate sub-bass noise floor and downscale to prevent
-            # low-end energy from dominating the bin array and inflating impact scores.
-            if bi == 0: val = max(0.0, val - 0.08) * 0.5
-            if bi == 1: val = max(0.0, val - 0.03) * 0.7
-            normalized = min(1.0, (val / global_peak) * self.gain)
-            
-            # --- SNAPPY FREQUENCY-AWARE SMOOTHING ---
-            # Using Gold Standard Coefficients from self.smoothing_configs
-            s_factor = self.smoothing_configs[bi]
-            
-            out_bins[bi] = min(1.0, max(0.0, self.prev_bins[bi] * s_factor + normalized * (1.0 - s_factor)))
+        out_bins = self._smooth_bins(raw_bins, self.prev_bins, global_peak)
         self.prev_bins = out_bins
         
         self.history_flux.append(flux)
@@ -243,7 +900,7 @@ class AudioAnalyzer:
         # 7. ADAPTIVE BEAT DETECTION
         is_beat = False
         if len(self.history_flux) > 0:
-            avg_flux = sum(self.history_flux) / len(self.history_flux)
+            avg_flux = self.history_flux.sum() / len(self.history_flux)
             # Use the bass-dominant flux for is_beat trigger
             if flux > avg_flux * self.flux_threshold_mult and flux > self.flux_threshold_abs:
                 # Lockout: Prevent double-beats within 350ms (Max ~170BPM support)
@@ -264,19 +921,25 @@ class AudioAnalyzer:
         # (CRITICAL: History must match current flux for the multiplier to be valid)
         self.history_flux.append(flux)
 
-        # 7.2 BEAT PHASE TRACKING
-        if self.bpm > 0:
+        # 7.1 TEMPO: onset autocorrelation once it has locked (inter-beat average until then)
+        self.tempo.push(flux, now)
+        if self.tempo.bpm: self.bpm = self.tempo.bpm
+
+        # 7.2 BEAT PHASE TRACKING (phase-locked predictor, else time since the last detected beat)
+        if self.tempo.bpm:
+            beat_phase = self.tempo.phase(now)
+        elif self.bpm > 0:
             beat_phase = ((now - self.prev_beat_timestamp) * self.bpm / 60.0) % 1.0
         else:
             beat_phase = 0.0
         
         suggested_shape = None
         self.frames_since_switch += 1
-        if is_beat and self.frames_since_switch > self.auto_switch_threshold:
+        if is_beat and self.frames_since_switch > self._switch_frames:
             suggested_shape = "random"
             self.frames_since_switch = 0
 
-        return {
+        state = {
             "bass": float(out_bass),
             "mid": float(out_mid),
             "high": float(out_high),
@@ -296,6 +959,95 @@ class AudioAnalyzer:
             "bins": [float(b) for b in out_bins],
             "spectral_complexity": spectral_complexity
         }
+        if sides is not None:
+            (left_bands, right_bands), (left_bins, right_bins) = sides
+            windows = [(len(h), h.min(), h.max()) for h in (self.history_bass, self.history_mid, self.history_high)]
+            state["left"] = self._side_step(self._sides[0], left_bands, left_bins, global_peak, windows)
+            state["right"] = self._side_step(self._sides[1], right_bands, right_bins, global_peak, windows)
+        return state
+
+    def analyze_array(self, signal, sample_rate=None, block_size=2048, start_time=0.0):
+        """
+        Offline equivalent of feeding signal (samples or samples x channels) through process() in
+        consecutive block_size blocks, each stamped with the time of its last sample.
+        The FFTs and band sums run in bulk over all frames; only the stateful part (_step) loops.
+        Returns columnar arrays, one row per block: "t", every SCALAR_COLUMNS entry, "beat_count" and
+        "beat_time" (time of the latest beat, at frame resolution), plus the VECTOR_COLUMNS (blocks x 6).
+        Analyzer state carries over like process() does. Columns describe the mix (in stereo mode the
+        first two channels still drive it, but left/right sub-states are not returned).
+        """
+        if sample_rate is not None and sample_rate != self.sample_rate: self.set_sample_rate(sample_rate)
+        signal = np.asarray(signal)
+        mono = signal if signal.ndim == 1 else np.mean(signal, axis=1)
+        n_blocks = -(-len(mono) // block_size)
+        block_ends = np.minimum(np.arange(1, n_blocks + 1) * block_size, len(mono))
+
+        # Spectra of every frame, with the sample offset each one completes at
+        bands, bins, frame_ends = [], [], []
+        if self.stft is None:
+            # One frame per block: full blocks (reshape is a strided view), then the trailing partial block
+            n_full = len(mono) // block_size
+            for c in range(0, n_full, FFT_CHUNK_FRAMES):
+                blocks = mono[c * block_size:min(n_full, c + FFT_CHUNK_FRAMES) * block_size].reshape(-1, block_size)
+                blocks = blocks - np.mean(blocks, axis=1, keepdims=True)
+                b, r = self._band_energies(np.abs(np.fft.rfft(blocks, axis=1)), block_size)
+                bands.append(b)
+                bins.append(r)
+            tail = mono[n_full * block_size:]
+            if len(tail):
+                b, r = self._band_energies(np.abs(np.fft.rfft(tail - np.mean(tail)))[np.newaxis], len(tail))
+                bands.append(b)
+                bins.append(r)
+            frame_ends.append(block_ends)
+        else:
+            chunk = FFT_CHUNK_FRAMES * self.stft.hop
+            feed = signal[:, :2] if self.stereo and signal.ndim == 2 and signal.shape[1] >= 2 else mono
+            for c in range(0, len(mono), chunk):
+                count, ends = self.stft.push(feed[c:c + chunk])
+                if not count: continue
+                b, r = self._band_energies(self.stft.mags[:count], self.stft.fft_size)
+                bands.append(b)
+                bins.append(r)
+                frame_ends.append(c + np.asarray(ends))
+        bands = np.concatenate(bands).tolist() if bands else []
+        bins = np.concatenate(bins).tolist() if bins else []
+        frame_ends = np.concatenate(frame_ends) if frame_ends else np.zeros(0, dtype=np.intp)
+        frame_times = (start_time + frame_ends / self.sample_rate).tolist()
+        # Frames [splits[i - 1], splits[i]) are the ones process() would have run for block i
+        splits = np.searchsorted(frame_ends, block_ends, side='right').tolist()
+
+        times = start_time + block_ends / self.sample_rate
+        cols = {"t": times}
+        scalars = [(k, np.empty(n_blocks, dtype=dt), default) for k, (dt, default) in SCALAR_COLUMNS.items()]
+        vectors = [(k, np.empty((n_blocks, 6))) for k in VECTOR_COLUMNS]
+        beat_count = np.empty(n_blocks, dtype=np.int64)
+        beat_time = np.empty(n_blocks)
+        step_frames = self._step_frames
+        start = 0
+        for i, stop in enumerate(splits):
+            st = step_frames(bands[start:stop], bins[start:stop], frame_times[start:stop])
+            start = stop
+            for k, col, default in scalars: col[i] = st.get(k, default)
+            for k, col in vectors: col[i] = st[k]
+            beat_count[i] = self.beat_count
+            beat_time[i] = self.prev_beat_timestamp
+
+        for k, col, _ in scalars: cols[k] = col
+        for k, col in vectors: cols[k] = col
+        cols["beat_count"] = beat_count
+        cols["beat_time"] = beat_time
+        return cols
+
+    def analyze_file(self, path, block_size=2048):
+        """analyze_array() over a whole PCM WAV file (adopts its sample rate)."""
+        with wave.open(path, 'rb') as wf:
+            width, channels, rate = wf.getsampwidth(), wf.getnchannels(), wf.getframerate()
+            data = wf.readframes(wf.getnframes())
+        if width == 1: samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 127.0
+        elif width == 2: samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32767.0
+        elif width == 4: samples = np.frombuffer(data, dtype=np.int32).astype(np.float32) / 2147483647.0
+        else: raise ValueError(f"Unsupported WAV sample width: {width} bytes")
+        return self.analyze_array(samples.reshape(-1, channels), sample_rate=rate, block_size=block_size)
 
     def get_empty_state(self):
          return { 
@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+import select
+import struct
+import threading
+import ctypes
+import ctypes.util
+
+# inotify(7) event bits we care about: finished writes, renames in/out and deletes
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF | IN_CREATE
+EVENT_HEADER = struct.Struct('iIII') # wd, mask, cookie, len
+
+class ConfigWatcher:
+    """
+    Calls callback(changed_paths) from a daemon thread whenever one of the watched files changes.
+
+    dirs: every *.json inside is watched (added, edited or deleted files are all reported).
+    files: individual files, watched through their parent directory.
+    Uses inotify on Linux and falls back to mtime polling every `interval` seconds elsewhere
+    (or when a watched directory is removed). Missing directories are picked up when created. Paths are reported exactly as they were
+    passed in (os.path.join(dir, name) for directory members), bursts are debounced. A watched
+    directory itself is reported when its contents may have changed in unknown ways (event queue
+    overflow, switch to polling), meaning "rescan everything in it".
+    """
+    def __init__(self, dirs, files, callback, interval=2.0, debounce=0.1):
+        self.dirs = [os.path.normpath(d) for d in dirs]
+        self.files = [os.path.normpath(f) for f in files]
+        self.callback = callback
+        self.interval = interval
+        self.debounce = debounce
+        self.mode = None # 'inotify' or 'polling' once started
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            # Re-armed whenever a missing watched directory appears
+            while self._run_inotify() == 'restart': pass
+        except Exception as e:
+            print(f"⚠️ inotify watcher failed ({e}), falling back to polling")
+        if self.mode == 'inotify':
+            # Events may have been missed while switching over
+            self._dispatch(set(self.dirs) | set(self.files))
+        self._run_polling()
+
+    def _dispatch(self, paths):
+        if not paths: return
+        try:
+            self.callback(paths)
+        except Exception as e:
+            print(f"⚠️ Config reload error: {e}")
+
+    # --- inotify ---
+
+    def _run_inotify(self):
+        """
+        Returns 'restart' when a missing directory was created (watches must be re-armed), False when
+        inotify is unavailable or a watch was lost (caller switches to polling).
+        """
+        if not sys.platform.startswith('linux'): return False
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(libc, 'inotify_init1'): return False
+
+        # Directory -> names we report from it (None = every *.json)
+        targets = {}
+        pending = set() # Watched directories that don't exist yet (their parent is watched instead)
+        for d in self.dirs:
+            if os.path.isdir(d): targets[d] = None
+            else: pending.add(d)
+        for f in self.files + list(pending):
+            parent = os.path.dirname(f) or '.'
+            if parent in targets and targets[parent] is None: continue
+            targets.setdefault(parent, set()).add(os.path.basename(f))
+        if not all(os.path.isdir(d) for d in targets): return False
+
+        fd = libc.inotify_init1(IN_CLOEXEC)
+        if fd < 0: return False
+        try:
+            wds = {}
+            for d in targets:
+                wd = libc.inotify_add_watch(fd, os.fsencode(d), WATCH_MASK)
+                if wd < 0: return False
+                wds[wd] = d
+            self.mode = 'inotify'
+
+            while True:
+                changed = set()
+                select.select([fd], [], [])
+                # Collect the whole burst (editors and json.dump can fire several events per save)
+                while True:
+                    if not self._read_events(fd, wds, targets, changed): return False
+                    ready, _, _ = select.select([fd], [], [], self.debounce)
+                    if not ready: break
+                self._dispatch(changed)
+                if changed & pending: return 'restart'
+        finally:
+            os.close(fd)
+
+    def _read_events(self, fd, wds, targets, changed):
+        """Parses one read() worth of events into changed. Returns False if a watch was lost."""
+        buf = os.read(fd, 64 * 1024)
+        pos = 0
+        while pos < len(buf):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(buf, pos)
+            name = buf[pos + EVENT_HEADER.size:pos + EVENT_HEADER.size + name_len].rstrip(b'\0').decode(errors='replace')
+            pos += EVENT_HEADER.size + name_len
+
+            if mask & IN_Q_OVERFLOW:
+                # Kernel dropped events: report everything so the consumer does a full reload
+                changed.update(self.dirs)
+                changed.update(self.files)
+                continue
+            if mask & (IN_DELETE_SELF | IN_IGNORED):
+                print(f"⚠️ Watched directory '{wds.get(wd)}' disappeared, switching to polling")
+                return False
+            d = wds.get(wd)
+            if d is None or not name: continue
+            if mask & IN_CREATE:
+                # Only directory creation matters (a new file is reported once it is fully written)
+                path = os.path.normpath(os.path.join(d, name))
+                if path in self.dirs: changed.add(path)
+                continue
+            names = targets[d]
+            if names is None:
+                if name.endswith('.json'): changed.add(os.path.join(d, name))
+            elif name in names:
+                changed.add(os.path.normpath(os.path.join(d, name)))
+        return True
+
+    # --- Polling fallback ---
+
+    def _all_paths(self):
+        paths = set(self.files)
+        for d in self.dirs:
+            if os.path.isdir(d):
+                paths.update(os.path.join(d, f) for f in os.listdir(d) if f.endswith('.json'))
+        return paths
+
+    def _snapshot(self):
+        snap = {}
+        for p in self._all_paths():
+            try:
+                snap[p] = os.path.getmtime(p)
+            except OSError: pass
+        return snap
+
+    def _run_polling(self):
+        self.mode = 'polling'
+        last = self._snapshot()
+        while True:
+            time.sleep(self.interval)
+            snap = self._snapshot()
+            changed = {p for p in last.keys() | snap.keys() if last.get(p) != snap.get(p)}
+            last = snap
+            self._dispatch(changed)
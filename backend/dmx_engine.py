@@ -4,13 +4,57 @@ import random
 import os
 import json
 import collections
+import copy
 from typing import Dict
-import threading
+from config_watcher import ConfigWatcher
+
+class ResolvedRule:
+    """A mapping rule with its easy_id descriptor, modifiers and calibration merged into plain numbers."""
+    __slots__ = ['behavior', 'source', 'speed', 'react', 'hold_type', 'c_min', 'c_center', 'c_max', 'static_val']
+    def __init__(self, rule, ch_def=None, behavior_defaults=None):
+        behavior = rule.get('behavior', 'static').lower()
+        source = rule.get('source', 'volume').lower()
+        mods = rule.get('modifiers') or {}
+        speed = mods.get('speed', 0.5)
+        react = mods.get('react', 0.5)
+        hold_type = mods.get('hold_type', 'none')
+
+        # Global behavior descriptor (backend/descriptors.json) overrides the rule's own values
+        easy_id = rule.get('easy_id')
+        default = behavior_defaults.get(easy_id) if (easy_id and behavior_defaults) else None
+        if default is not None:
+            behavior = default.get('behavior', behavior)
+            source = default.get('source', source)
+            speed = default.get('speed', speed)
+            react = default.get('react', react)
+            hold_type = default.get('hold_type', hold_type)
+
+        self.behavior = behavior
+        self.source = source
+        self.speed = float(speed)
+        self.react = float(react)
+        self.hold_type = str(hold_type).lower()
+
+        # Calibration
+        cal = rule.get('cal') or {}
+        fixture_cal = ch_def.get('calibration') or {} if ch_def else {}
+        self.c_min = int(cal.get('min', fixture_cal.get('min', 0)))
+        self.c_max = int(cal.get('max', fixture_cal.get('max', 255)))
+        self.c_center = int(cal.get('center', fixture_cal.get('center', (self.c_min + self.c_max) // 2)))
+
+        r_center = rule.get('rel_center')
+        if r_center is None and default is not None:
+            r_center = default.get('rel_center')
+        if r_center is not None:
+            self.c_center = self.c_min + (float(r_center) * (self.c_max - self.c_min))
+
+        self.static_val = max(0, min(255, int(rule.get('value', self.c_max)))) if behavior == 'static' else 0
 
 class ChannelConfig:
     """Pre-resolved channel mapping rules for hot-loop performance."""
-    __slots__ = ['mod_name', 'rules', 'states', 'default_val', 'is_controller', 'smoothing', 'threshold']
-    def __init__(self, rules, states, default_val, smoothing=0.0, threshold=0.0, mod_name='static'):
+    __slots__ = ['mod_name', 'rules', 'states', 'default_val', 'is_controller', 'smoothing', 'threshold',
+                 'vibe_index', 'fallback_indices', 'first_enabled_idx', 'ch_def', 'resolved', 'easy_ids']
+    def __init__(self, rules, states, default_val, smoothing=0.0, threshold=0.0, mod_name='static', ch_def=None):
         self.rules = rules # List of dicts: layer, mod, vibe, cal: [min, center, max], lfo, state_map, etc.
         self.states = states
         self.default_val = default_val
@@ -18,55 +62,96 @@ class ChannelConfig:
         self.smoothing = smoothing
         self.threshold = threshold
         self.mod_name = mod_name
+        self.ch_def = ch_def
+        self.resolved = None # List of ResolvedRule aligned with rules, see resolve_rules()
+        self.easy_ids = frozenset(r.get('easy_id') for r in rules if r.get('easy_id'))
+        self._build_vibe_index()
+
+    def resolve_rules(self, behavior_defaults):
+        """Pre-merges descriptors and calibration for every rule (rebuilt on descriptor hot reload)."""
+        resolved = []
+        for r in self.rules:
+            try:
+                resolved.append(ResolvedRule(r, self.ch_def, behavior_defaults))
+            except (ValueError, TypeError) as e:
+                print(f"⚠️ Invalid mapping rule '{r.get('description', r.get('vibe'))}' ignored: {e}")
+                resolved.append(None)
+        self.resolved = resolved
+
+    def _build_vibe_index(self):
+        """Precomputes vibe tag -> rule indices so get_active_rule is a couple of dict hits."""
+        index = {}
+        for i, r in enumerate(self.rules):
+            index.setdefault(r.get('vibe'), []).append(i)
+        # Tags include plain vibes ('mid'), sync variants ('mid 2', 'any 1') and transients ('build', 'drop')
+        self.vibe_index = {tag: tuple(idxs) for tag, idxs in index.items()}
+        self.fallback_indices = tuple(i for i, r in enumerate(self.rules) if r.get('vibe') in ['any', 'any/fallback'])
+        self.first_enabled_idx = next((i for i, r in enumerate(self.rules) if r.get('vibe') != 'never'), None)
+
+    def copy(self):
+        """Same rules and resolution, own (empty) rotation states: a new snapshot's plan never touches the live one's."""
+        clone = ChannelConfig.__new__(ChannelConfig)
+        for name in ChannelConfig.__slots__: setattr(clone, name, getattr(self, name))
+        clone.states = {}
+        return clone
+
+    def init_state(self, instance_key):
+        """Creates the per-instance rotation state up front (called when the execution plan is built)."""
+        if instance_key not in self.states:
+            self.states[instance_key] = {'last_vibe': None, 'indices': {}}
+        return self.states[instance_key]
 
     def get_active_rule(self, current_vibe, current_transient=None, instance_key=None, global_sync_indices=None):
         """Returns the specific vibe rule if it exists, cycling through multiple matches when the vibe re-activates."""
+        idx = self.get_active_index(current_vibe, current_transient, instance_key, global_sync_indices)
+        return self.rules[idx] if idx is not None else None
+
+    def get_active_index(self, current_vibe, current_transient=None, instance_key=None, global_sync_indices=None):
+        """Same selection as get_active_rule, but returns the rule index (into rules/resolved)."""
         if not self.rules: return None
         
-        # 1. Initialize/Retrieve persistence for this instance
-        if instance_key not in self.states:
-            self.states[instance_key] = {'last_vibe': None, 'indices': {}}
-        state = self.states[instance_key]
+        # 1. Retrieve persistence for this instance (pre-created by init_state for planned channels)
+        state = self.states.get(instance_key)
+        if state is None:
+            state = self.init_state(instance_key)
 
         # 2. Determine the requested vibe category
         search_vibe = current_vibe
         is_transient = False
-        if current_transient in ['building', 'dropping']:
-            search_vibe = 'build' if current_transient == 'building' else 'drop'
+        if current_transient == 'building':
+            search_vibe = 'build'
+            is_transient = True
+        elif current_transient == 'dropping':
+            search_vibe = 'drop'
             is_transient = True
 
         # 4. Sync Group Logic (Priority Search)
         # If a rule for "vibe X" is tagged with the current active sync variant, it takes precedence.
-        matching_indices = []
+        vibe_index = self.vibe_index
+        matching_indices = None
         if global_sync_indices and not is_transient:
             variant = global_sync_indices.get(search_vibe, 0) + 1
-            tagged_vibe = f"{search_vibe} {variant}"
-            matching_indices = [i for i, r in enumerate(self.rules) if r.get('vibe') == tagged_vibe]
+            matching_indices = vibe_index.get(f"{search_vibe} {variant}")
             
         if not matching_indices:
             # Fallback to standard vibe matching
-            matching_indices = [i for i, r in enumerate(self.rules) if r.get('vibe') == search_vibe]
+            matching_indices = vibe_index.get(search_vibe)
         
         # Handle fallback to 'any' for non-transient vibes
         if not matching_indices and not is_transient:
-            is_fallback = True
             search_vibe = 'any_fallback' # Unique key for state tracking
             
             # Check for synchronized fallback (e.g. "any 1")
             if global_sync_indices:
                 variant = global_sync_indices.get('any', 0) + 1
-                tagged_any = f"any {variant}"
-                matching_indices = [i for i, r in enumerate(self.rules) if r.get('vibe') == tagged_any]
+                matching_indices = vibe_index.get(f"any {variant}")
 
             if not matching_indices:
-                matching_indices = [i for i, r in enumerate(self.rules) if r.get('vibe') in ['any', 'any/fallback']]
+                matching_indices = self.fallback_indices
 
         # 4. Absolute Fallback: If still nothing, use the first non-disabled rule
         if not matching_indices:
-            for r in self.rules:
-                if r.get('vibe') != 'never':
-                    return r
-            return None # Revert to default channel value
+            return self.first_enabled_idx # None reverts to default channel value
 
         # 5. Random Logic: If vibe category changed, pick a random rule from the matching set
         if state['last_vibe'] != search_vibe:
@@ -87,8 +172,244 @@ class ChannelConfig:
             idx = 0
             state['indices'][search_vibe] = 0
             
-        final_idx = matching_indices[idx]
-        return self.rules[final_idx]
+        return matching_indices[idx]
+
+class ChannelPlan:
+    """One compiled channel write: absolute address, cache and routing resolved at load time."""
+    __slots__ = ['univ', 'addr', 'cache', 'side', 'ch_def', 'state_key', 'ch_idx', 'zone_idx', 'inst_id', 'role', 'ov_key', 'profile_id']
+    def __init__(self, addr, cache, side, ch_def, state_key, ch_idx, zone_idx, inst_id, role, univ=0, profile_id=None):
+        self.univ = univ # Index into DMXEngine.universes
+        self.addr = addr
+        self.cache = cache
+        self.side = side # 'left', 'right' or 'center' (selects logic matrix + audio sub-state)
+        self.ch_def = ch_def
+        self.state_key = state_key # f"{profile_id}_{ch_idx}_{zone_idx}"
+        self.ch_idx = ch_idx
+        self.zone_idx = zone_idx
+        self.inst_id = inst_id
+        self.role = role
+        self.ov_key = (inst_id, role) # Lookup key into the instance override index
+        self.profile_id = profile_id
+
+    def carries_state_from(self, old):
+        """True if old (from a previous plan) is the same channel with the same rules, so its LFO/hold state still applies."""
+        if (old.inst_id, old.profile_id, old.ch_idx) != (self.inst_id, self.profile_id, self.ch_idx): return False
+        if old.cache is self.cache: return True
+        return old.cache.rules == self.cache.rules and old.ch_def == self.ch_def
+
+class ConfigSnapshot:
+    """
+    Everything loaded from fixtures/ (and derived from it) for one config generation.
+    Reloads build a new snapshot off-thread and publish it with a single reference swap;
+    a published snapshot is never mutated.
+    """
+    __slots__ = ['fixtures', 'profiles', 'stage_instances', 'presets', 'compiled_presets', 'feature_keys',
+                 'fast_cache', 'exec_plan', 'patched_max', 'fixture_files', 'profile_files']
+    def __init__(self):
+        self.fixtures = {}
+        self.profiles = {}
+        self.stage_instances = []
+        self.presets = []
+        self.compiled_presets = []
+        self.feature_keys = () # FeatureEngine statistics the 'function' triggers reference
+        self.fast_cache = {} # profile id -> {ch_idx: ChannelConfig}
+        self.exec_plan = [] # Flat list of ChannelPlan
+        self.patched_max = [0] # Per universe: highest address any stage instance occupies
+        self.fixture_files = {} # configs/*.json path -> fixture id it defined (for partial reloads)
+        self.profile_files = {} # profiles/*.json path -> profile id it defined
+
+    def copy(self):
+        """Shallow copy for a partial reload (containers are copied, their unchanged contents shared)."""
+        snap = ConfigSnapshot()
+        snap.fixtures = dict(self.fixtures)
+        snap.profiles = dict(self.profiles)
+        snap.stage_instances = self.stage_instances
+        snap.presets = self.presets
+        snap.compiled_presets = self.compiled_presets
+        snap.feature_keys = self.feature_keys
+        snap.fast_cache = dict(self.fast_cache)
+        snap.exec_plan = self.exec_plan
+        snap.patched_max = self.patched_max
+        snap.fixture_files = dict(self.fixture_files)
+        snap.profile_files = dict(self.profile_files)
+        return snap
+
+# Upper bound for stage instance 'universe' ids (each universe is a 513-byte buffer)
+MAX_UNIVERSES = 64
+
+# Preset 'bin' trigger targets -> index into audio['bins']
+BIN_TARGETS = {
+    'SUB': 0, 'BASS': 1, 'KICK': 2, 'LOW_MID': 3, 'MID': 4, 'HIGH_MID': 5, 
+    'PRESENCE': 4, 'BRILLIANCE': 5,
+    'BIN 0': 0, 'BIN 1': 1, 'BIN 2': 2, 'BIN 3': 3, 'BIN 4': 4, 'BIN 5': 5,
+    'bin 0': 0, 'bin 1': 1, 'bin 2': 2, 'bin 3': 3, 'bin 4': 4, 'bin 5': 5
+}
+
+class PresetTrigger:
+    """A preset trigger dict compiled once on load: fixed kind, pre-parsed thresholds and targets."""
+    __slots__ = ['kind', 'match', 'alt_match', 'lt', 'gt', 'index', 'keyword', 'range']
+    def __init__(self, trig):
+        """Raises ValueError for triggers that can never be evaluated (empty category, bad numbers)."""
+        self.kind = trig.get('category') or trig.get('type')
+        if not self.kind:
+            raise ValueError("empty trigger category")
+        self.match = self.alt_match = self.keyword = None
+        self.index = 0
+        self.range = 0.0
+
+        # Numeric range (None = unbounded on that side)
+        lt = trig.get('less_than')
+        gt = trig.get('greater_than')
+        self.lt = float(lt) if lt is not None else None
+        self.gt = float(gt) if gt is not None else None
+
+        if self.kind == 'vibe':
+            self.match = trig.get('vibe', trig.get('value'))
+        elif self.kind == 'state':
+            self.match = trig.get('state')
+            self.alt_match = trig.get('value')
+        elif self.kind == 'volume':
+            if 'less_than' not in trig and 'greater_than' not in trig:
+                # Legacy keyword support
+                self.kind = 'volume_keyword'
+                self.keyword = trig.get('value', 'mid')
+                self.range = float(trig.get('range', 5)) / 100.0
+        elif self.kind == 'bin':
+            target = trig.get('target', 'BASS')
+            self.index = BIN_TARGETS[target] if target in BIN_TARGETS else int(trig.get('bin', 1))
+        elif self.kind == 'channel':
+            self.index = int(trig.get('target', 0))
+        elif self.kind == 'function':
+            # LogicMatrix state keys are canonical lower-case, so a direct lookup replaces the scan
+            self.match = str(trig.get('target', '')).lower()
+
+    def in_range(self, val):
+        if self.lt is not None and val > self.lt: return False
+        if self.gt is not None and val < self.gt: return False
+        return True
+
+    def test(self, vibe, transient, audio, universe, logic_state):
+        kind = self.kind
+        if kind == 'vibe':
+            return self.match == vibe
+        elif kind == 'state':
+            return self.match == transient or self.alt_match == transient
+        elif kind == 'volume':
+            return self.in_range(audio.get('vol', 0.0) * 100.0)
+        elif kind == 'volume_keyword':
+            v = audio.get('vol', 0.0)
+            r = self.range
+            if self.keyword == 'silence': return v <= r
+            elif self.keyword == 'loud': return v >= (1.0 - r)
+            elif self.keyword == 'mid': return abs(v - 0.5) <= (r / 2.0)
+            return False
+        elif kind == 'bin':
+            bins = audio.get('bins', [0.0]*6)
+            if self.index < len(bins):
+                return self.in_range(bins[self.index] * 100.0)
+            return False
+        elif kind == 'channel':
+            if 0 < self.index < len(universe):
+                return self.in_range(universe[self.index])
+            return False
+        elif kind == 'function':
+            v = logic_state.get(self.match)
+            if isinstance(v, (int, float)):
+                return self.in_range(v * 100.0)
+            return False
+        return False # 'manual' and unknown categories never auto-activate
+
+class CompiledPreset:
+    """Preset dict plus its compiled triggers (None = can never auto-activate)."""
+    __slots__ = ['data', 'p_id', 'enabled', 'triggers']
+    def __init__(self, p_data):
+        self.data = p_data
+        self.p_id = p_data.get('id', p_data.get('name'))
+        self.enabled = p_data.get('active', True)
+
+        triggers = p_data.get('triggers', [])
+        if p_data.get('trigger'): triggers = [p_data.get('trigger')] # Legacy support
+        try:
+            self.triggers = tuple(PresetTrigger(t) for t in triggers) or None
+        except (ValueError, TypeError, KeyError) as e:
+            # Warn the user about the broken preset they planned to fix manually
+            print(f"⚠️  Preset '{p_data.get('name', 'Unknown')}' contains an empty/invalid trigger ({e}) and will not activate. Please fix in UI.")
+            self.triggers = None
+
+    def is_triggered(self, vibe, transient, audio, universe, logic_state):
+        # NEW STANDARD: All triggers in the list must be met (AND logic)
+        if not self.triggers: return False
+        for trig in self.triggers:
+            if not trig.test(vibe, transient, audio, universe, logic_state):
+                return False
+        return True
+
+class PresetOverride:
+    """The winning preset override for one (instance, role) or global role in the current frame."""
+    __slots__ = ['seq', 'mode', 'ov_ch', 'value', 'key_prefix']
+    def __init__(self, seq, mode, ov_ch, value, key_prefix):
+        self.seq = seq # (preset, override) order; the highest seq wins, matching last-writer-wins
+        self.mode = mode # 'value', 'behavior' or 'legacy' (global override with a bare 'value')
+        self.ov_ch = ov_ch
+        self.value = value
+        self.key_prefix = key_prefix # State key minus the per-instance suffix
+
+class SweepExpr:
+    """A preset value string ("30, 50-100, 30 + 16") parsed once into a segment table."""
+    __slots__ = ['offset', 'parts', 'total_cycle']
+    PART_DURATION = 64.0 # Each sequence part occupies a consistent "64 bit" phase window
+
+    def __init__(self, val):
+        # 1. Parse Offset (at the very end of the string)
+        self.offset = 0.0
+        main_val = val
+        if '+' in val:
+            parts = val.rsplit('+', 1)
+            main_val = parts[0].strip()
+            try:
+                self.offset = float(parts[1].strip())
+            except:
+                pass
+
+        # 2. Parse Sequence (split by comma) into (constant, points, sub_duration) segments
+        self.parts = tuple(self._parse_part(p.strip()) for p in main_val.split(','))
+        self.total_cycle = len(self.parts) * self.PART_DURATION
+
+    def _parse_part(self, part_str):
+        if '-' in part_str:
+            try:
+                # Handle multi-dash chains like "32-96-32"
+                points = tuple(float(p.strip()) for p in part_str.split('-') if p.strip())
+            except:
+                return (0.0, None, 0.0)
+            if len(points) < 2: return (int(points[0]) if points else 0, None, 0.0)
+            # Divide the part's duration into sub-segments for the chain
+            return (None, points, self.PART_DURATION / (len(points) - 1))
+        try:
+            return (float(part_str), None, 0.0)
+        except:
+            return (0.0, None, 0.0)
+
+    def evaluate(self, phase):
+        """Value at the given accumulated phase: a part lookup plus a lerp."""
+        # Apply offset and wrap
+        eff_phase = (phase + self.offset) % self.total_cycle
+        num_parts = len(self.parts)
+        part_idx = min(int(eff_phase // self.PART_DURATION), num_parts - 1)
+        const, points, sub_duration = self.parts[part_idx]
+        if points is None: return const
+
+        local_phase = eff_phase % self.PART_DURATION # 0.0 to 64.0
+        num_segments = len(points) - 1
+        sub_idx = min(int(local_phase // sub_duration), num_segments - 1)
+        sub_local_phase = local_phase % sub_duration
+
+        v_start = points[sub_idx]
+        v_end = points[sub_idx + 1]
+        # Interpolate within the sub-segment
+        t = sub_local_phase / sub_duration if sub_duration > 0 else 0.0
+        t = max(0.0, min(1.0, t))
+        return v_start + t * (v_end - v_start)
 
 class LogicMatrix:
     def __init__(self):
@@ -107,7 +428,7 @@ class LogicMatrix:
         v1 = self._hash1d(i + 1)
         return v0 + (v1 - v0) * u
 
-    def update(self, dt, audio, transient, speed_mult=1.0, master_intensity=1.0, active_lfos=None, active_pattern="Figure-8"):
+    def update(self, dt, audio, transient, speed_mult=1.0, master_intensity=1.0, active_lfos=None, active_pattern="Figure-8", feature_keys=(), features=None):
         self.speed_mult = speed_mult
         self.master_intensity = master_intensity
         
@@ -147,11 +468,23 @@ class LogicMatrix:
                 # Increase sensitivity since individual bins are not locally normalized like broad bands
                 self.state[f'bin {i}'] = min(1.0, float(val) * 2.0)
 
+        # Multi-timescale statistics from the vibe engine's FeatureEngine state ("volume 8s", "spectral flux 32s p90", ...),
+        # looked up by position and only for the names the 'function' triggers use; features = (values, name -> position)
+        if features is not None and feature_keys:
+            values, index = features
+            for name in feature_keys:
+                i = index.get(name)
+                if i is not None: self.state[name] = float(values[i])
+
 class DMXEngine:
     def __init__(self):
-        self.universe = bytearray(513)
-        self.universe[0] = 0x00
+        self.universes = [bytearray(513)] # Start code + 512 slots per universe
+        self.universe = self.universes[0] # Universe 0 (serial output, UI frames, preset channel triggers)
+        self._sent = [bytes(513)] # Per universe: bytes as of the last mark_sent(), for dirty tracking
+        self._sent_time = {} # Per universe: time of the last send (keepalive)
+        self.outputs = {} # Universe id -> sender(u, buf) -> bool; see set_output()
         self.overrides = {}
+        self.max_address = 0 # See _update_max_address()
         self._dt = 0.016
         
         self.logic = LogicMatrix()
@@ -175,13 +508,14 @@ class DMXEngine:
         self._last_transient = 'steady'
         self._preset_holds = {}
         self._preset_sweep_phases = {}
+        self._sweep_exprs = {} # Preset value string -> SweepExpr (parse-once cache)
         self._silence_start = None
         self.blackout = False
         self._was_silent = False
         
         self.behavior_defaults = {}
         self._descriptors_path = os.path.join('backend', 'descriptors.json')
-        self._descriptors_mtime = 0
+        self._descriptor_version = 0 # Bumped whenever resolved rules change
         
         self.sync_indices = {
             'chill': 0, 'mid': 0, 'high': 0, 'any': 0, 'build': 0, 'drop': 0
@@ -192,11 +526,12 @@ class DMXEngine:
 
         # Removed legacy rhythm and bass style history
         
-        # New V2 Arrays
-        self.fixtures = {}
-        self.profiles = {}
-        self.stage_instances = []
-        self.presets = []
+        # New V2 Arrays (fixtures, profiles, stage_instances, presets are views of the published snapshot)
+        self._config = ConfigSnapshot() # Latest published config (see _publish)
+        self._active = None # Snapshot the render loop is currently running (see _adopt_config)
+        self._instance_overrides = {} # (instance id, role) -> PresetOverride
+        self._global_overrides = {} # role -> PresetOverride
+        self._override_index_src = [] # The active_presets the override index was built from
         
         self.gamepad = {}
         self.prev_gamepad = {}
@@ -207,18 +542,26 @@ class DMXEngine:
         self._profiles_dir = os.path.join('fixtures', 'profiles')
         self._stage_path = os.path.join('fixtures', 'stage_config.json')
         self._presets_path = os.path.join('fixtures', 'presets.json')
+        self._legacy_fixtures_path = os.path.join('fixtures', 'fixtures.json')
+        self._legacy_profiles_path = os.path.join('fixtures', 'profiles.json')
         
-        self._fixture_mtime = 0
-        self._fast_cache = {} 
         self.active_presets = [] 
         self.manual_active_presets = set() # Set of preset IDs manually forced ON
         self.active_visual_commands = []
+        self.engine_mode = 'scalar' # 'scalar' or 'numpy' (see set_engine_mode)
+        self._vector = None # VectorChannelBackend when engine_mode == 'numpy'
+        self._features = None # (FeatureEngine state copy, name -> position) from the vibe engine, see set_features
         
         self._load_profiles()
         self._load_descriptors()
         
-        self._reload_thread = threading.Thread(target=self._hot_reload_loop, daemon=True)
-        self._reload_thread.start()
+        self._watcher = ConfigWatcher(
+            dirs=[self._configs_dir, self._profiles_dir],
+            files=[self._stage_path, self._presets_path, self._descriptors_path,
+                   self._legacy_fixtures_path, self._legacy_profiles_path],
+            callback=self._on_config_changed
+        )
+        self._watcher.start()
 
     def _resolve_spectral_variant(self, audio):
         """Returns (variant_index 0-2, dominant_bin 0-5) based on most energetic bin pair."""
@@ -233,70 +576,208 @@ class DMXEngine:
             return 2, dominant   # variant 3: mid/high
 
     def _load_profiles(self):
+        """Full reload: builds a fresh snapshot from disk and publishes it."""
         print("🔄 DMX Engine Loading Modular Config...")
+        cfg = ConfigSnapshot()
         
         # 1. Load Hardware Configs
-        self.fixtures = {}
         if os.path.exists(self._configs_dir):
             for f in os.listdir(self._configs_dir):
                 if f.endswith('.json'):
-                    try:
-                        with open(os.path.join(self._configs_dir, f), 'r') as file:
-                            data = json.load(file)
-                            if 'id' in data: self.fixtures[data['id']] = data
-                    except: pass
+                    self._load_fixture_file(cfg, os.path.join(self._configs_dir, f))
         
         # Legacy Monolithic Load
-        legacy_fixtures = os.path.join('fixtures', 'fixtures.json')
+        legacy_fixtures = self._legacy_fixtures_path
         if os.path.exists(legacy_fixtures):
             try:
                 with open(legacy_fixtures, 'r') as f:
                     data = json.load(f)
                     for fix in data:
-                        if 'id' in fix: self.fixtures[fix['id']] = fix
+                        if 'id' in fix: cfg.fixtures[fix['id']] = fix
             except: pass
 
         # 2. Load Mated Profiles
-        self.profiles = {}
         if os.path.exists(self._profiles_dir):
             for f in os.listdir(self._profiles_dir):
                 if f.endswith('.json'):
-                    try:
-                        with open(os.path.join(self._profiles_dir, f), 'r') as file:
-                            data = json.load(file)
-                            if 'id' in data: self.profiles[data['id']] = data
-                    except: pass
+                    self._load_profile_file(cfg, os.path.join(self._profiles_dir, f))
 
         # Legacy Monolithic Load
-        legacy_profiles = os.path.join('fixtures', 'profiles.json')
+        legacy_profiles = self._legacy_profiles_path
         if os.path.exists(legacy_profiles):
             try:
                 with open(legacy_profiles, 'r') as f:
                     data = json.load(f)
                     for prof in data:
-                        if 'id' in prof: self.profiles[prof['id']] = prof
+                        if 'id' in prof: cfg.profiles[prof['id']] = prof
             except: pass
 
         # 3. Load Stage Layout
-        self.stage_instances = []
         if os.path.exists(self._stage_path):
             try:
                 with open(self._stage_path, 'r') as f:
-                    self.stage_instances = json.load(f)
+                    cfg.stage_instances = json.load(f)
             except: pass
 
         # 4. Load Presets
-        self.presets = []
         if os.path.exists(self._presets_path):
             try:
                 with open(self._presets_path, 'r') as f:
-                    self.presets = json.load(f)
+                    cfg.presets = json.load(f)
             except: pass
         
-        self.zone_map = [inst['id'] for inst in self.stage_instances]
-        print(f"✅ Loaded: {len(self.fixtures)} Fixtures, {len(self.profiles)} Profiles, {len(self.stage_instances)} Stage Instances")
+        self._compile_presets(cfg)
+        print(f"✅ Loaded: {len(cfg.fixtures)} Fixtures, {len(cfg.profiles)} Profiles, {len(cfg.stage_instances)} Stage Instances")
         
-        self._build_fast_cache()
+        for p_id in cfg.profiles:
+            self._build_profile_cache(cfg, p_id)
+        self._build_exec_plan(cfg)
+        self._publish(cfg)
+
+    def _publish(self, cfg):
+        """Makes cfg the live config. The render loop switches over at its next frame (_adopt_config)."""
+        self._config = cfg
+        self._update_max_address()
+
+    def _adopt_config(self, cfg):
+        """
+        Render-thread side of a reload, run at a frame boundary: moves LFO phases, holds and rule rotation
+        from the old plan to channels of the new plan that kept their rules, and resets everything else.
+        """
+        old = self._active
+        self._active = cfg
+        self._ensure_universes(len(cfg.patched_max)) # Only here: the render thread is the one iterating them
+        if old is None: return
+        if old.compiled_presets is not cfg.compiled_presets:
+            self._override_index_src = None # Force an override index rebuild
+        if old.exec_plan is cfg.exec_plan: return
+        if self._vector is not None:
+            self._vector.release_plan() # Flush array state into the st dicts first
+
+        logics = {'left': self.logic_l, 'right': self.logic_r, 'center': self.logic}
+        old_by_ident = {(e.inst_id, e.profile_id, e.ch_idx): e for e in old.exec_plan}
+        moved = []
+        for entry in cfg.exec_plan:
+            prev = old_by_ident.get((entry.inst_id, entry.profile_id, entry.ch_idx))
+            if prev is None or not entry.carries_state_from(prev): continue
+            st = logics[prev.side].states.get(prev.state_key)
+            rot = prev.cache.states.get(prev.state_key)
+            moved.append((entry, st, rot))
+
+        # Drop every old channel state, then re-insert the carried ones under their new keys
+        for e in old.exec_plan:
+            logics[e.side].states.pop(e.state_key, None)
+            e.cache.states.pop(e.state_key, None)
+        for entry, st, rot in moved:
+            if st is not None: logics[entry.side].states[entry.state_key] = st
+            if rot is not None: entry.cache.states[entry.state_key] = rot
+        print(f"🔁 Config swap: {len(moved)}/{len(cfg.exec_plan)} channels kept their state")
+
+    # Read-only views of the published config (replace through the setters / reloads, never mutate)
+    @property
+    def fixtures(self): return self._config.fixtures
+    @property
+    def profiles(self): return self._config.profiles
+    @property
+    def zone_map(self): return [inst['id'] for inst in self._config.stage_instances]
+    @property
+    def _fast_cache(self): return self._config.fast_cache
+    @property
+    def _exec_plan(self): return self._config.exec_plan
+    @property
+    def _compiled_presets(self): return self._config.compiled_presets
+
+    @property
+    def stage_instances(self): return self._config.stage_instances
+    @stage_instances.setter
+    def stage_instances(self, stage_instances):
+        cfg = self._config.copy()
+        cfg.stage_instances = stage_instances
+        self._build_exec_plan(cfg)
+        self._publish(cfg)
+
+    @property
+    def presets(self): return self._config.presets
+    @presets.setter
+    def presets(self, presets):
+        cfg = self._config.copy()
+        cfg.presets = presets
+        self._compile_presets(cfg)
+        self._publish(cfg)
+
+    def _read_json(self, path):
+        """Returns the parsed file, None if it is missing or unreadable."""
+        if not os.path.exists(path): return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not parse {path}: {e}")
+            return None
+
+    def _load_fixture_file(self, cfg, path):
+        """(Re)loads one fixtures/configs file into cfg, dropping the fixture it defined before if it changed id or was deleted."""
+        old_id = cfg.fixture_files.pop(path, None)
+        if old_id is not None: cfg.fixtures.pop(old_id, None)
+        data = self._read_json(path)
+        if isinstance(data, dict) and 'id' in data:
+            cfg.fixtures[data['id']] = data
+            cfg.fixture_files[path] = data['id']
+
+    def _load_profile_file(self, cfg, path):
+        """(Re)loads one fixtures/profiles file into cfg. Returns the profile ids whose fast cache needs a rebuild."""
+        old_id = cfg.profile_files.pop(path, None)
+        if old_id is not None: cfg.profiles.pop(old_id, None)
+        data = self._read_json(path)
+        new_id = None
+        if isinstance(data, dict) and 'id' in data:
+            new_id = data['id']
+            cfg.profiles[new_id] = data
+            cfg.profile_files[path] = new_id
+        return {i for i in (old_id, new_id) if i is not None}
+
+    def _on_config_changed(self, paths):
+        """ConfigWatcher callback: reloads only the changed files and rebuilds only what depends on them."""
+        paths = {os.path.normpath(p) for p in paths}
+        configs_dir = os.path.normpath(self._configs_dir)
+        profiles_dir = os.path.normpath(self._profiles_dir)
+        full = {configs_dir, profiles_dir, os.path.normpath(self._legacy_fixtures_path), os.path.normpath(self._legacy_profiles_path)}
+
+        if paths & full:
+            # Legacy monolithic files (or an unknown directory-wide change) feed everything: full reload
+            print(f"🔄 Configuration change detected ({len(paths)} files). Full reload...")
+            self._load_profiles()
+        elif paths - {os.path.normpath(self._descriptors_path)}:
+            # Build the next snapshot from a copy; the live one keeps serving frames until _publish
+            cfg = self._config.copy()
+            fixtures_changed = False
+            profile_ids = set()
+            stage_changed = False
+            for p in paths:
+                parent = os.path.dirname(p)
+                if parent == configs_dir:
+                    self._load_fixture_file(cfg, p)
+                    fixtures_changed = True
+                elif parent == profiles_dir:
+                    profile_ids |= self._load_profile_file(cfg, p)
+                elif p == os.path.normpath(self._stage_path):
+                    cfg.stage_instances = self._read_json(self._stage_path) or []
+                    stage_changed = True
+                elif p == os.path.normpath(self._presets_path):
+                    cfg.presets = self._read_json(self._presets_path) or []
+                    self._compile_presets(cfg)
+                    print(f"🔄 Reloaded presets ({len(cfg.presets)})")
+
+            for p_id in profile_ids:
+                self._build_profile_cache(cfg, p_id)
+            # Legacy fixtures only feed channel lists of profiles without their own, so they just need a replan
+            if fixtures_changed or profile_ids or stage_changed:
+                self._build_exec_plan(cfg)
+                print(f"🔄 Reloaded {len(profile_ids)} profiles, stage: {stage_changed}, fixtures: {fixtures_changed} -> {len(cfg.exec_plan)} channels")
+            self._publish(cfg)
+
+        if os.path.normpath(self._descriptors_path) in paths:
+            self._load_descriptors()
 
     def _load_descriptors(self):
         if os.path.exists(self._descriptors_path):
@@ -304,54 +785,218 @@ class DMXEngine:
                 with open(self._descriptors_path, 'r') as f:
                     data = json.load(f)
                     # Convert list of {id, behavior, ...} to dict {id: {behavior, ...}}
-                    self.behavior_defaults = { d['id']: d for d in data }
-                    self._descriptors_mtime = os.path.getmtime(self._descriptors_path)
-                print(f"📡 DMX Engine synced {len(self.behavior_defaults)} Global Behavior Defaults")
+                    new_defaults = { d['id']: d for d in data }
+                old_defaults = self.behavior_defaults
+                changed = {k for k in old_defaults.keys() | new_defaults.keys() if old_defaults.get(k) != new_defaults.get(k)}
+                self.behavior_defaults = new_defaults
+
+                # Re-resolve only the channels whose rules reference a changed descriptor, on the next
+                # snapshot's own ChannelConfig copies (the live one keeps serving frames until _publish)
+                cfg = self._config.copy()
+                self._build_exec_plan(cfg)
+                rebuilt = 0
+                for profile_cache in cfg.fast_cache.values():
+                    for cache in profile_cache.values():
+                        if cache.easy_ids & changed:
+                            cache.resolve_rules(new_defaults)
+                            rebuilt += 1
+                self._publish(cfg)
+                self._descriptor_version += 1
+                print(f"📡 DMX Engine synced {len(self.behavior_defaults)} Global Behavior Defaults ({rebuilt} channels re-resolved)")
             except Exception as e:
                 print(f"⚠️ Error loading descriptors: {e}")
 
-    def _build_fast_cache(self):
-        self._fast_cache = {}
-        for p_id, profile in self.profiles.items():
-            self._fast_cache[p_id] = {}
+    def _build_profile_cache(self, cfg, p_id):
+        """(Re)builds the ChannelConfigs of one profile in cfg (dropped if the profile no longer exists)."""
+        profile = cfg.profiles.get(p_id)
+        if profile is None:
+            cfg.fast_cache.pop(p_id, None)
+            return
+        profile_cache = cfg.fast_cache[p_id] = {}
+        channels = profile.get('channels', [])
+        if not channels: return
+        
+        mappings = profile.get('mappings', [])
+        for ch_idx, ch in enumerate(channels):
+            rules = mappings[ch_idx] if ch_idx < len(mappings) else []
+            default_val = ch.get('default', 127)
+            cache = ChannelConfig(
+                rules=rules,
+                states={}, 
+                default_val=default_val,
+                smoothing=0.0,
+                threshold=0.0,
+                ch_def=ch
+            )
+            cache.resolve_rules(self.behavior_defaults)
+            profile_cache[ch_idx] = cache
+
+    def _compile_presets(self, cfg):
+        """Compiles preset triggers once so update() only runs pre-parsed predicates."""
+        cfg.compiled_presets = [CompiledPreset(p) for p in cfg.presets]
+        cfg.feature_keys = tuple(sorted({t.match for cp in cfg.compiled_presets for t in (cp.triggers or ()) if t.kind == 'function'}))
+
+    def _build_override_index(self):
+        """Inverts active preset overrides into (instance id, role) and global role lookups."""
+        by_inst = {}
+        by_role = {}
+        seq = 0
+        for p_data in self.active_presets:
+            p_id = p_data.get('id', p_data.get('name', 'unknown'))
+            for ov in p_data.get('overrides', []):
+                seq += 1
+                ov_type = ov.get('type')
+                channels = ov.get('channels', [])
+                if ov_type == 'instance':
+                    inst_id = ov.get('id')
+                    # Later channels with the same name win
+                    for ov_ch in channels:
+                        role = ov_ch.get('name')
+                        by_inst[(inst_id, role)] = self._make_override(seq, p_id, ov, ov_ch, role)
+                elif ov_type == 'global':
+                    ov_name = ov.get('name', '')
+                    roles = [ov_name]
+                    if ov_name.startswith("Global: "): roles.append(ov_name[len("Global: "):])
+                    for role in roles:
+                        # First channel with the same name wins
+                        ov_ch = next((c for c in channels if c.get('name') == role), None)
+                        if ov_ch is not None:
+                            by_role[role] = self._make_override(seq, p_id, ov, ov_ch, role)
+                        elif 'value' in ov:
+                            # Fallback to direct 'value' for legacy global presets
+                            by_role[role] = PresetOverride(seq, 'legacy', None, ov.get('value', 0), f"dimmer_{p_id}_{ov_name}_")
+        self._instance_overrides = by_inst
+        self._global_overrides = by_role
+        self._override_index_src = list(self.active_presets)
+
+    def _make_override(self, seq, p_id, ov, ov_ch, role):
+        if ov_ch.get('mode') == 'behavior':
+            return PresetOverride(seq, 'behavior', ov_ch, None, f"preset_{p_id}_{ov.get('id','g')}_{role}_")
+        return PresetOverride(seq, 'value', ov_ch, ov_ch.get('value', 0), f"dmx_{p_id}_{role}_")
+
+    def _build_exec_plan(self, cfg):
+        """
+        Flattens cfg's stage instances into ChannelPlan records so update() is a single pass. The plan runs
+        on copies of cfg's ChannelConfigs: snapshots share them with the live one, which is never mutated.
+        """
+        cfg.fast_cache = {p_id: {i: cache.copy() for i, cache in profile_cache.items()}
+                          for p_id, profile_cache in cfg.fast_cache.items()}
+        plan = []
+        univ_count = 1
+        patched_max = [0] * MAX_UNIVERSES
+        for zone_idx, inst in enumerate(cfg.stage_instances):
+            profile = cfg.profiles.get(inst.get('profileId'))
+            if not profile: continue
+
+            try:
+                univ = int(inst.get('universe', 0))
+            except: univ = -1
+            if not (0 <= univ < MAX_UNIVERSES):
+                print(f"⚠️ Stage instance '{inst.get('id')}' has invalid universe {inst.get('universe')!r}, skipped")
+                continue
+
+            # Fallback to legacy fixtureId if channels key is missing (for transition support)
             channels = profile.get('channels', [])
+            if not channels:
+                fixture = cfg.fixtures.get(inst.get('fixtureId'))
+                if fixture:
+                    channels = fixture.get('channels', [])
             if not channels: continue
-            
-            mappings = profile.get('mappings', [])
-            for ch_idx, ch in enumerate(channels):
-                rules = mappings[ch_idx] if ch_idx < len(mappings) else []
-                default_val = ch.get('default', 127)
-                self._fast_cache[p_id][ch_idx] = ChannelConfig(
-                    rules=rules,
-                    states={}, 
-                    default_val=default_val,
-                    smoothing=0.0,
-                    threshold=0.0
-                )
-
-    def _hot_reload_loop(self):
-        while True:
-            time.sleep(2.0)
-            
-            # Watch for directory or file updates
+
             try:
-                # Check Stage Layout or Presets mtime as a trigger
-                stage_mtime = os.path.getmtime(self._stage_path) if os.path.exists(self._stage_path) else 0
-                presets_mtime = os.path.getmtime(self._presets_path) if os.path.exists(self._presets_path) else 0
-                max_mtime = max(stage_mtime, presets_mtime)
-
-                if self._fixture_mtime != max_mtime:
-                    self._fixture_mtime = max_mtime
-                    print(f"🔄 Configuration Change detected (Stage: {stage_mtime}, Presets: {presets_mtime}). Reloading...")
-                    self._load_profiles()
-                
-                # Hot reload descriptors independently
-                desc_mtime = os.path.getmtime(self._descriptors_path) if os.path.exists(self._descriptors_path) else 0
-                if desc_mtime != self._descriptors_mtime:
-                    self._load_descriptors()
-            except Exception as e:
-                # print(f"Hot reload error: {e}")
-                pass
+                base_addr = int(inst.get('address', 1)) + int(inst.get('offset', 0))
+            except: continue
+            patched_max[univ] = max(patched_max[univ], base_addr + len(channels) - 1)
+
+            # Simple global routing - Left/Right/Center usually inferred from zone name for now
+            zone_str = str(inst.get('zone', '')).lower()
+            if 'left' in zone_str: side = 'left'
+            elif 'right' in zone_str: side = 'right'
+            else: side = 'center'
+
+            profile_cache = cfg.fast_cache.get(profile['id'], {})
+            for ch_idx, ch_def in enumerate(channels):
+                # Use addrOffset if provided explicitly, otherwise fallback to index relative to base_addr
+                offset = ch_def.get('addrOffset')
+                if offset is None: offset = ch_idx
+                try:
+                    final_addr = base_addr + int(offset)
+                except: continue
+                if not (0 < final_addr < len(self.universe)): continue
+
+                cache = profile_cache.get(ch_idx)
+                if not cache: continue
+
+                state_key = f"{profile['id']}_{ch_idx}_{zone_idx}"
+                cache.init_state(state_key)
+                univ_count = max(univ_count, univ + 1)
+                if final_addr > patched_max[univ]: patched_max[univ] = final_addr
+                plan.append(ChannelPlan(
+                    univ=univ,
+                    addr=final_addr,
+                    cache=cache,
+                    side=side,
+                    ch_def=ch_def,
+                    state_key=state_key,
+                    ch_idx=ch_idx,
+                    zone_idx=zone_idx,
+                    inst_id=inst['id'],
+                    role=ch_def.get('role', ch_def.get('name')),
+                    profile_id=profile['id']
+                ))
+        cfg.patched_max = patched_max[:univ_count] # _adopt_config grows the universe buffers to match
+        cfg.exec_plan = plan
+        # Universe 0 also feeds the UI frames; any other patched universe needs a registered transport
+        unrouted = sorted({p.univ for p in plan} - set(self.outputs) - {0})
+        if unrouted:
+            print(f"⚠️ Stage instances patched on universe(s) {', '.join(map(str, unrouted))} have no output transport (see DMXEngine.set_output), their channels are not sent")
+
+    def _update_max_address(self):
+        """Highest address the output stage has to send on universe 0 (patched channels or manual overrides)."""
+        self.max_address = max(self._config.patched_max[0], max(self.overrides, default=0))
+
+    def _ensure_universes(self, count):
+        """Grows self.universes to at least count buffers (never shrinks, so held references stay valid)."""
+        while len(self.universes) < count:
+            self.universes.append(bytearray(513))
+            self._sent.append(bytes(513))
+
+    def set_features(self, values, index):
+        """Latest vibe-engine statistics for 'function' triggers (values is a per-block copy, swapped in as one reference)."""
+        self._features = (values, index)
+
+    def set_output(self, u, sender):
+        """
+        Registers the transport for universe u (None removes it). sender(u, buf) gets the live buffer,
+        must copy what it keeps, and returns False if it can't take a frame right now (e.g. busy).
+        """
+        if sender is None:
+            self.outputs.pop(u, None)
+            return
+        self._ensure_universes(u + 1)
+        self.outputs[u] = sender
+
+    def dirty_universes(self):
+        """Universe ids with a transport whose bytes changed since their last mark_sent()."""
+        return [u for u in self.outputs if self.universes[u] != self._sent[u]]
+
+    def mark_sent(self, u=0, now=None):
+        """Records universe u as handed to its transport (send_outputs() does this for registered senders)."""
+        self._sent[u] = bytes(self.universes[u])
+        self._sent_time[u] = time.time() if now is None else now
+
+    def send_outputs(self, now, keepalive):
+        """
+        Output stage: hands each universe that changed (or is due a keepalive refresh) to its sender.
+        Untouched universes are skipped. Returns the universe ids that were sent.
+        """
+        sent = []
+        for u, sender in list(self.outputs.items()):
+            if self.universes[u] == self._sent[u] and now - self._sent_time.get(u, 0.0) < keepalive: continue
+            if sender(u, self.universes[u]):
+                self.mark_sent(u, now)
+                sent.append(u)
+        return sent
 
     def update(self, dt: float, audio: Dict, visual_states: Dict = None, gamepad: Dict = None):
         self._dt = dt
@@ -364,107 +1009,30 @@ class DMXEngine:
         self.transient = audio.get('transient', 'steady')
         current_vibe = audio.get('vibe', 'mid')
         
+        # Switch to a newly published config only between frames (one consistent snapshot per frame)
+        cfg = self._config
+        if cfg is not self._active:
+            self._adopt_config(cfg)
+
         # Pre-calculate active presets (Global check once per frame)
         self.active_presets = []
-        
-        active_triggers = [f"vibe:{current_vibe}"]
-        if self.transient: active_triggers.append(f"state:{self.transient}") # Support state triggers correctly
-
-        for p_data in self.presets:
-            if not p_data.get('active', True): continue
-            triggers = p_data.get('triggers', [])
-            if p_data.get('trigger'): triggers = [p_data.get('trigger')] # Legacy support
-            
-            # NEW STANDARD: All triggers in the list must be met (AND logic)
-            is_active = len(triggers) > 0
-            
-            for trig in triggers:
-                trig_matched = False
-                t_cat = trig.get('category') or trig.get('type')
-                
-                if not t_cat or t_cat == "":
-                    # Warn the user about the broken preset they planned to fix manually
-                    if not hasattr(self, '_warned_presets'): self._warned_presets = set()
-                    p_name = p_data.get('name', 'Unknown')
-                    if p_name not in self._warned_presets:
-                        print(f"⚠️  Preset '{p_name}' contains an empty/invalid trigger and will not activate. Please fix in UI.")
-                        self._warned_presets.add(p_name)
-                    is_active = False
-                    break
-                
-                # Numeric range helper
-                def check_range(val, t):
-                    lt = t.get('less_than')
-                    gt = t.get('greater_than')
-                    if lt is not None and val > float(lt): return False
-                    if gt is not None and val < float(gt): return False
-                    return True
-
-                if t_cat == 'vibe' and trig.get('vibe', trig.get('value')) == current_vibe:
-                    trig_matched = True
-                elif t_cat == 'state' and (trig.get('state') == self.transient or trig.get('value') == self.transient):
-                    trig_matched = True
-                elif t_cat == 'volume':
-                    v_pct = audio.get('vol', 0.0) * 100.0
-                    if 'less_than' in trig or 'greater_than' in trig:
-                        if check_range(v_pct, trig): trig_matched = True
-                    else:
-                        # Legacy keyword support
-                        target_v = trig.get('value', 'mid')
-                        v = audio.get('vol', 0.0)
-                        r = float(trig.get('range', 5)) / 100.0 
-                        if target_v == 'silence' and v <= r: trig_matched = True
-                        elif target_v == 'loud' and v >= (1.0 - r): trig_matched = True
-                        elif target_v == 'mid' and abs(v - 0.5) <= (r / 2.0): trig_matched = True
-
-                elif t_cat == 'bin':
-                    bins = audio.get('bins', [0.0]*6)
-                    target = trig.get('target', 'BASS')
-                    bin_map = {
-                        'SUB': 0, 'BASS': 1, 'KICK': 2, 'LOW_MID': 3, 'MID': 4, 'HIGH_MID': 5, 
-                        'PRESENCE': 4, 'BRILLIANCE': 5,
-                        'BIN 0': 0, 'BIN 1': 1, 'BIN 2': 2, 'BIN 3': 3, 'BIN 4': 4, 'BIN 5': 5,
-                        'bin 0': 0, 'bin 1': 1, 'bin 2': 2, 'bin 3': 3, 'bin 4': 4, 'bin 5': 5
-                    }
-                    b_idx = bin_map.get(target, int(trig.get('bin', 1)))
-                    
-                    if b_idx < len(bins):
-                        val = bins[b_idx] * 100.0
-                        if check_range(val, trig): trig_matched = True
-
-                elif t_cat == 'channel':
-                    addr = int(trig.get('target', 0))
-                    if 0 < addr < len(self.universe):
-                        val = self.universe[addr]
-                        if check_range(val, trig): trig_matched = True
-
-                elif t_cat == 'function':
-                    # Search logic matrix state for matching keys
-                    target = trig.get('target', '').lower()
-                    val = None
-                    for k, v in self.logic.state.items():
-                        if k.lower() == target:
-                            val = v * 100.0 if isinstance(v, (int, float)) else None
-                            break
-                    
-                    if val is not None:
-                        if check_range(val, trig): trig_matched = True
-                
-                # If ANY trigger fails, the whole preset is inactive (AND logic)
-                if not trig_matched:
-                    is_active = False
-                    break
-                
-            if is_active:
-                self.active_presets.append(p_data)
+        logic_state = getattr(self.logic, 'state', {})
+        for cp in cfg.compiled_presets:
+            if not cp.enabled: continue
+            if cp.is_triggered(current_vibe, self.transient, audio, self.universe, logic_state):
+                self.active_presets.append(cp.data)
                 
         # --- MERGE MANUAL PRESETS ---
-        for p_data in self.presets:
-            if not p_data.get('active', True): continue
-            p_id = p_data.get('id', p_data.get('name'))
-            if p_id in self.manual_active_presets:
-                if p_data not in self.active_presets:
-                    self.active_presets.append(p_data)
+        if self.manual_active_presets:
+            for cp in cfg.compiled_presets:
+                if not cp.enabled: continue
+                if cp.p_id in self.manual_active_presets:
+                    if cp.data not in self.active_presets:
+                        self.active_presets.append(cp.data)
+
+        src = self._override_index_src
+        if src is None or len(src) != len(self.active_presets) or any(a is not b for a, b in zip(src, self.active_presets)):
+            self._build_override_index()
 
         self.active_visual_commands = []
         force_next_visual = False
@@ -499,12 +1067,16 @@ class DMXEngine:
                             self.intensity = 1.0 * multiplier
 
         if 'left' in audio and 'right' in audio:
+            # Sides were aliased to the mix while input was mono: split them off with its per-channel state
+            if self.logic_l is self.logic: self.logic_l = copy.deepcopy(self.logic)
+            if self.logic_r is self.logic: self.logic_r = copy.deepcopy(self.logic)
             self.logic_l.update(dt, audio['left'], self.transient, self.speed, self.intensity)
             self.logic_r.update(dt, audio['right'], self.transient, self.speed, self.intensity)
         else:
             self.logic_l = self.logic
             self.logic_r = self.logic
-            self.logic.update(dt, audio, self.transient, self.speed, self.intensity)
+        # Center zones always follow the mix (also on the first stereo frame)
+        self.logic.update(dt, audio, self.transient, self.speed, self.intensity, feature_keys=cfg.feature_keys, features=self._features)
         
         # Removed legacy rhythm triggers
         
@@ -585,9 +1157,8 @@ class DMXEngine:
         else:
             self.lab_dmx_val = 0
 
-        # Process All Instances
-        for i, inst in enumerate(self.stage_instances):
-            self._process_instance(inst, i, audio, self.sync_indices)
+        # Process All Instances (compiled by _build_exec_plan)
+        self._process_plan(cfg.exec_plan, audio, self.sync_indices)
 
         for addr, val in self.overrides.items():
             if 0 < addr < len(self.universe):
@@ -595,8 +1166,8 @@ class DMXEngine:
 
         # GLOBAL BLACKOUT OVERRIDE
         if self.blackout:
-            for i in range(1, len(self.universe)):
-                self.universe[i] = 0
+            for universe in self.universes:
+                universe[1:] = bytes(len(universe) - 1)
 
     def get_active_preset_names(self):
         """Returns a list of names for currently active presets."""
@@ -609,98 +1180,54 @@ class DMXEngine:
         self.blackout = bool(state)
         print(f"🔦 Global Blackout: {'ON' if self.blackout else 'OFF'}")
 
-    def _process_instance(self, inst, zone_idx, audio, sync_indices=None):
-        profile = self.profiles.get(inst.get('profileId'))
-        if not profile: return
-
-        # Unified Architecture: Channels are now part of the profile!
-        # Fallback to legacy fixtureId if channels key is missing (for transition support)
-        channels = profile.get('channels', [])
-        if not channels:
-            fixture = self.fixtures.get(inst.get('fixtureId'))
-            if fixture:
-                channels = fixture.get('channels', [])
-        
-        if not channels: return
-
-        try:
-            base_addr = int(inst.get('address', 1)) + int(inst.get('offset', 0))
-        except: return
-        
-        active_triggers = []
-        current_vibe = audio.get('vibe', 'mid')
-        active_triggers.append(f"vibe:{current_vibe}")
-        
-        # Simple global routing - Left/Right/Center usually inferred from zone name for now
-        zone_str = str(inst.get('zone', '')).lower()
-        if 'left' in zone_str: active_logic = self.logic_l; active_audio = audio.get('left', audio)
-        elif 'right' in zone_str: active_logic = self.logic_r; active_audio = audio.get('right', audio)
-        else: active_logic = self.logic; active_audio = audio
-        
-
-
-        for ch_idx, ch_def in enumerate(channels):
-
-            # Use addrOffset if provided explicitly, otherwise fallback to index relative to base_addr
-            offset = ch_def.get('addrOffset')
-            if offset is None: offset = ch_idx
-            
-            final_addr = base_addr + int(offset)
-            if not (0 < final_addr < len(self.universe)): continue
-            
-            
-            cache = self._fast_cache.get(profile['id'], {}).get(ch_idx)
-            if not cache: continue
-            
-            val = self._calculate_channel(ch_idx, active_audio, active_logic, zone_idx, cache, profile['id'], ch_def, sync_indices)
-
-            # Preset Overrides (Optimized)
-            preset_override_val = None
-            
-            for p_data in self.active_presets:
-                overrides = p_data.get('overrides', [])
-                p_id = p_data.get('id', p_data.get('name', 'unknown'))
-                for ov in overrides:
-                    ov_type = ov.get('type')
-                    ov_name = ov.get('name', '')
-                    target_role = ch_def.get('role', ch_def.get('name'))
-                    
-                    matched_ov_ch = None
-                    
-                    if ov_type == 'instance' and ov.get('id') == inst['id']:
-                        for ov_ch in ov.get('channels', []):
-                            if ov_ch.get('name') == target_role:
-                                matched_ov_ch = ov_ch
-                    elif ov_type == 'global':
-                        if ov_name == target_role or ov_name == f"Global: {target_role}":
-                            for ov_ch in ov.get('channels', []):
-                                if ov_ch.get('name') == target_role:
-                                    matched_ov_ch = ov_ch
-                                    break
-                            # Fallback to direct 'value' for legacy global presets
-                            if matched_ov_ch is None and 'value' in ov:
-                                ov_key = f"dimmer_{p_id}_{ov_name}_{inst['id']}"
-                                # Use warped dt for global value sweeps
-                                preset_override_val = self._resolve_preset_value(ov_key, ov.get('value', 0), self._eff_dt)
-                    
-                    if matched_ov_ch is not None:
-                        if matched_ov_ch.get('mode') == 'behavior':
-                            # Dynamic behavior override — evaluate like a profile rule
-                            bkey = f"preset_{p_id}_{ov.get('id','g')}_{target_role}_{zone_idx}"
-                            preset_override_val = self._evaluate_preset_behavior(
-                                matched_ov_ch, active_audio, active_logic, bkey
-                            )
-                        else:
-                            ov_key = f"dmx_{p_id}_{target_role}_{inst['id']}"
-                            # Use warped dt for instance value sweeps
-                            preset_override_val = self._resolve_preset_value(ov_key, matched_ov_ch.get('value', 0), self._eff_dt)
-            
-            if preset_override_val is not None:
-                val = preset_override_val
-                
-            self.universe[final_addr] = max(0, min(255, int(val)))
-
+    def _process_plan(self, plan, audio, sync_indices=None):
+        # Resolve per-side routing once per frame instead of once per channel
+        sides = {}
+        vibe, transient = audio.get('vibe', 'mid'), audio.get('transient', 'steady')
+        for side, logic, side_audio in (('left', self.logic_l, audio.get('left', audio)),
+                                        ('right', self.logic_r, audio.get('right', audio)),
+                                        ('center', self.logic, audio)):
+            # Stereo sub-states carry band data only; vibe / transient come from the mix
+            sides[side] = (logic, side_audio, side_audio.get('vibe', vibe), side_audio.get('transient', transient))
+
+        if self._vector is not None:
+            self._vector.process(plan, sides, sync_indices)
+            return
 
+        universes = self.universes
+        instance_overrides = self._instance_overrides
+        global_overrides = self._global_overrides
+        for entry in plan:
+            active_logic, active_audio, current_vibe, current_transient = sides[entry.side]
+            cache = entry.cache
+            idx = cache.get_active_index(current_vibe, current_transient, entry.state_key, sync_indices)
+            params = cache.resolved[idx] if idx is not None else None
+            if params is not None:
+                val = self._apply_params_math(params, active_logic.states[entry.state_key], active_audio, active_logic)
+            else:
+                val = cache.default_val
+
+            # Preset Overrides (one lookup per index, see _build_override_index)
+            winner = instance_overrides.get(entry.ov_key) if instance_overrides else None
+            if global_overrides:
+                g = global_overrides.get(entry.role)
+                if g is not None and (winner is None or g.seq > winner.seq):
+                    winner = g
+
+            if winner is not None:
+                val = self._evaluate_override(winner, entry, active_audio, active_logic)
+
+            universes[entry.univ][entry.addr] = max(0, min(255, int(val)))
+
+    def _evaluate_override(self, winner, entry, audio, logic_matrix):
+        """Value of the winning preset override for one planned channel."""
+        if winner.mode == 'behavior':
+            # Dynamic behavior override — evaluate like a profile rule
+            return self._evaluate_preset_behavior(
+                winner.ov_ch, audio, logic_matrix, f"{winner.key_prefix}{entry.zone_idx}"
+            )
+        # Use warped dt for instance/global value sweeps
+        return self._resolve_preset_value(f"{winner.key_prefix}{entry.inst_id}", winner.value, self._eff_dt)
 
     def _calculate_channel(self, ch_idx, audio, logic_matrix, zone_idx, cache, profile_id, ch_def=None, sync_indices=None):
         current_vibe = audio.get('vibe', 'mid')
@@ -714,36 +1241,19 @@ class DMXEngine:
         return self._apply_rule_math(rule, st, audio, logic_matrix, ch_def)
 
     def _apply_rule_math(self, rule, st, audio, logic_matrix, ch_def=None):
-        """Standardized math engine for all DMX channels."""
-        behavior = rule.get('behavior', 'static').lower()
-        source = rule.get('source', 'volume').lower()
-        mods = rule.get('modifiers', {'speed': 0.5, 'react': 0.5, 'hold_type': 'none'})
-        
-        easy_id = rule.get('easy_id')
-        if easy_id and easy_id in self.behavior_defaults:
-            default = self.behavior_defaults[easy_id]
-            behavior = default.get('behavior', behavior)
-            source = default.get('source', source)
-            mods['speed'] = default.get('speed', mods.get('speed', 0.5))
-            mods['react'] = default.get('react', mods.get('react', 0.5))
-            mods['hold_type'] = default.get('hold_type', mods.get('hold_type', 'none'))
-
-        speed = float(mods.get('speed', 0.5))
-        react = float(mods.get('react', 0.5))
-        hold_type = str(mods.get('hold_type', 'none')).lower()
-        
-        # Calibration
-        cal = rule.get('cal') or {}
-        fixture_cal = ch_def.get('calibration') or {} if ch_def else {}
-        c_min = int(cal.get('min', fixture_cal.get('min', 0)))
-        c_max = int(cal.get('max', fixture_cal.get('max', 255)))
-        c_center = int(cal.get('center', fixture_cal.get('center', (c_min + c_max) // 2)))
-
-        r_center = rule.get('rel_center')
-        if r_center is None and easy_id and easy_id in self.behavior_defaults:
-            r_center = self.behavior_defaults[easy_id].get('rel_center')
-        if r_center is not None:
-             c_center = c_min + (float(r_center) * (c_max - c_min))
+        """Standardized math engine for all DMX channels (resolves the raw rule dict first)."""
+        return self._apply_params_math(ResolvedRule(rule, ch_def, self.behavior_defaults), st, audio, logic_matrix)
+
+    def _apply_params_math(self, params, st, audio, logic_matrix):
+        """Standardized math engine for all DMX channels, reading pre-merged ResolvedRule fields."""
+        behavior = params.behavior
+        source = params.source
+        speed = params.speed
+        react = params.react
+        hold_type = params.hold_type
+        c_min = params.c_min
+        c_max = params.c_max
+        c_center = params.c_center
 
         # 1. Resolve Driver Magnitude (E)
         E = logic_matrix.state.get(source, 0.0)
@@ -773,7 +1283,7 @@ class DMXEngine:
         dt = self._dt
 
         if behavior == 'static':
-            return max(0, min(255, int(rule.get('value', c_max))))
+            return params.static_val
         
         elif behavior == 'direct':
             y = (E * 2.0) - 1.0 # Centered unipolar-to-bipolar for calibration mapping
@@ -831,75 +1341,15 @@ class DMXEngine:
         if not isinstance(val, str):
             return 0
 
-        # 1. Parse Offset (at the very end of the string)
-        offset = 0.0
-        main_val = val
-        if '+' in val:
-            parts = val.rsplit('+', 1)
-            main_val = parts[0].strip()
-            try:
-                offset = float(parts[1].strip())
-            except:
-                pass
-
-        # 2. Parse Sequence (split by comma)
-        seq_parts = [p.strip() for p in main_val.split(',')]
-        num_parts = len(seq_parts)
-        if num_parts == 0: return 0
+        expr = self._sweep_exprs.get(val)
+        if expr is None:
+            expr = self._sweep_exprs[val] = SweepExpr(val)
 
-        # 3. Maintain/Update Phase Accumulator
-        if ov_key not in self._preset_sweep_phases:
-            self._preset_sweep_phases[ov_key] = 0.0
-        
+        # Maintain/Update Phase Accumulator
         # Rate: 60 bits per second (Legacy speed standard)
-        rate = 60.0 
-        self._preset_sweep_phases[ov_key] += dt * rate
-        
-        # Each part occupies a consistent "64 bit" phase window
-        part_duration = 64.0
-        total_cycle = num_parts * part_duration
-        
-        # Apply offset and wrap
-        eff_phase = (self._preset_sweep_phases[ov_key] + offset) % total_cycle
-        
-        # Determine which part of the sequence we are in
-        part_idx = min(int(eff_phase // part_duration), num_parts - 1)
-        local_phase = eff_phase % part_duration # 0.0 to 64.0
-        
-        part_str = seq_parts[part_idx]
-
-        # 4. Resolve the specific part (Value or Sweep)
-        if '-' in part_str:
-            try:
-                # Handle multi-dash chains like "32-96-32"
-                points = [float(p.strip()) for p in part_str.split('-') if p.strip()]
-                num_points = len(points)
-                if num_points < 2: return int(points[0]) if points else 0
-                
-                # Divide the part's duration into sub-segments for the chain
-                num_segments = max(1, len(points) - 1)
-                sub_duration = part_duration / num_segments
-                
-                sub_idx = int(local_phase // sub_duration)
-                sub_idx = min(sub_idx, num_segments - 1)
-                sub_local_phase = local_phase % sub_duration
-                
-                v_start = points[sub_idx]
-                v_end = points[sub_idx + 1]
-                
-                # Interpolate within the sub-segment
-                # Removed the "-1.0" to ensure continuous motion across segments
-                t = sub_local_phase / sub_duration if sub_duration > 0 else 0.0
-                t = max(0.0, min(1.0, t))
-                
-                return v_start + t * (v_end - v_start)
-            except:
-                return 0.0
-        
-        try:
-            return float(part_str)
-        except:
-            return 0.0
+        phase = self._preset_sweep_phases.get(ov_key, 0.0) + dt * 60.0
+        self._preset_sweep_phases[ov_key] = phase
+        return expr.evaluate(phase)
 
     def _evaluate_preset_behavior(self, ov_ch, audio, logic_matrix, instance_key):
         """Standardized math for preset behavior overrides."""
@@ -913,7 +1363,20 @@ class DMXEngine:
         st = logic_matrix.states[instance_key]
         return self._apply_rule_math(rule, st, audio, logic_matrix)
 
-    def get_universe(self): return self.universe[:]
+    def set_engine_mode(self, mode):
+        """Switches channel evaluation between the scalar path and the vectorized NumPy backend."""
+        mode = 'numpy' if mode == 'numpy' else 'scalar'
+        if mode == self.engine_mode: return
+        if mode == 'numpy':
+            from dmx_vector import VectorChannelBackend
+            self._vector = VectorChannelBackend(self)
+        else:
+            self._vector.store_states()
+            self._vector = None
+        self.engine_mode = mode
+        print(f"🧮 DMX Engine mode: {mode}")
+
+    def get_universe(self, u=0): return self.universes[u][:]
     def set_intensity(self, val): self.intensity = float(val)
     def set_speed(self, val): self.speed = float(val)
     def set_audio_sensitivity(self, val): self.audio_sensitivity = float(val)
@@ -923,11 +1386,13 @@ class DMXEngine:
         for o in ol:
             if 'address' in o:
                 self.overrides[int(o['address'])] = int(o.get('value', 0))
+        self._update_max_address()
 
     def clear_device_overrides(self, dev_id):
         # We now match by instance id or profile name
         if dev_id == "all":
             self.overrides = {}
+            self._update_max_address()
             return
 
         inst = next((i for i in self.stage_instances if i['id'] == dev_id or i.get('profileName') == dev_id), None)
@@ -946,10 +1411,12 @@ class DMXEngine:
         for idx, ch in enumerate(channels):
             addr = base + idx
             if addr in self.overrides: del self.overrides[addr]
+        self._update_max_address()
 
     def clear_address_overrides(self, addresses):
         for addr in addresses:
             if int(addr) in self.overrides: del self.overrides[int(addr)]
+        self._update_max_address()
     def toggle_manual_preset(self, preset_id: str, state: bool = None):
         """Force a preset to be active or inactive regardless of audio triggers."""
         if state is None:
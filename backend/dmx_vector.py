@@ -0,0 +1,285 @@
+import math
+import numpy as np
+
+SIDES = ('left', 'right', 'center')
+
+# Hold types -> beat divisor (0 = no musical re-trigger). 'none' releases the hold every frame,
+# unknown hold strings keep whatever hold is active but never re-trigger (same as the scalar path).
+HOLD_NONE, HOLD_BEAT, HOLD_BAR, HOLD_2BAR, HOLD_4BAR, HOLD_OTHER = range(6)
+HOLD_CODES = {'none': HOLD_NONE, 'beat': HOLD_BEAT, 'bar': HOLD_BAR, '2 bar': HOLD_2BAR, '4 bar': HOLD_4BAR}
+HOLD_DIVISORS = np.array([0, 1, 4, 8, 16, 0])
+
+# Behavior groups evaluated in one pass each
+OSC_BEHAVIORS = {'sine': 0, 'saw': 1, 'square': 2}
+PHASE_BEHAVIORS = ('beat phase', 'bar phase')
+
+class VectorChannelBackend:
+    """
+    Vectorized replacement for the per-channel _apply_rule_math loop.
+
+    Rule selection still goes through ChannelConfig.get_active_index, but only when a side's
+    vibe/transient or the sync variants change (the call is a no-op otherwise). The selected
+    rules are then flattened into parameter arrays grouped by behavior, and each frame is a
+    handful of NumPy expressions per group written straight into views of engine.universes.
+    Output is byte-identical to the scalar path for the same inputs.
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self.plan = None
+        self.signature = None
+        self.override_src = None
+        self.override_pos = ()
+
+    # --- Plan / state management ---
+
+    def _build_plan(self, plan):
+        engine = self.engine
+        n = len(plan)
+        self.plan = plan
+        self.signature = None
+        self.override_src = None
+
+        self.addr = np.array([e.addr for e in plan], dtype=np.intp)
+        self.side = np.array([SIDES.index(e.side) for e in plan], dtype=np.intp)
+
+        # Last writer per (universe, address) wins, exactly like sequential writes
+        last = {}
+        for i, e in enumerate(plan): last[(e.univ, e.addr)] = i
+        self.last_writer = np.zeros(n, dtype=bool)
+        self.last_writer[list(last.values())] = True
+        self.write_pos = np.flatnonzero(self.last_writer)
+
+        # One (universe view, plan positions, addresses) scatter per patched universe
+        univ = np.array([e.univ for e in plan], dtype=np.intp)[self.write_pos]
+        self.write_groups = []
+        for u in sorted(set(univ.tolist())):
+            pos = self.write_pos[univ == u]
+            self.write_groups.append((np.frombuffer(engine.universes[u], dtype=np.uint8), pos, self.addr[pos]))
+
+        # Per-channel persistent state (mirrors the scalar st dicts)
+        self.phase = np.zeros(n)
+        self.t = np.zeros(n)
+        self.held = np.zeros(n)
+        self.hold_active = np.zeros(n, dtype=bool)
+        self.held_valid = np.zeros(n, dtype=bool)
+        self.initialized = np.zeros(n, dtype=bool)
+        self.load_states()
+
+    def _side_logic(self, side):
+        engine = self.engine
+        return (engine.logic_l, engine.logic_r, engine.logic)[SIDES.index(side)]
+
+    def load_states(self):
+        """Seeds the arrays from the scalar st dicts so switching modes keeps LFO phases and holds."""
+        for i, e in enumerate(self.plan):
+            st = self._side_logic(e.side).states.get(e.state_key)
+            if not st or 'phase' not in st: continue
+            self.initialized[i] = True
+            self.phase[i] = st['phase']
+            self.t[i] = st['t']
+            self.hold_active[i] = st['hold_active']
+            self.held_valid[i] = 'held_dmx' in st
+            self.held[i] = st.get('held_dmx', 0.0)
+
+    def store_states(self):
+        """Writes the arrays back into the scalar st dicts (used when leaving numpy mode or replanning)."""
+        if self.plan is None: return
+        for i, e in enumerate(self.plan):
+            if not self.initialized[i]: continue
+            st = self._side_logic(e.side).states[e.state_key]
+            st['phase'] = float(self.phase[i])
+            st['t'] = float(self.t[i])
+            st['hold_active'] = bool(self.hold_active[i])
+            if self.held_valid[i]: st['held_dmx'] = float(self.held[i])
+            else: st.pop('held_dmx', None)
+
+    def release_plan(self):
+        """Flushes state and forgets the plan (the engine is about to swap configs and move st dicts around)."""
+        self.store_states()
+        self.plan = None
+
+    def _select_rules(self, sides, sync_indices):
+        """Re-runs rule selection and regroups channels by behavior."""
+        plan = self.plan
+        n = len(plan)
+
+        behavior_code = np.full(n, -1, dtype=np.int64) # -1 = constant output
+        const_out = np.zeros(n, dtype=np.int64)
+        hold = np.zeros(n, dtype=np.int64)
+        has_rule = np.zeros(n, dtype=bool)
+        speed = np.zeros(n)
+        react = np.zeros(n)
+        c_min = np.zeros(n)
+        c_center = np.zeros(n)
+        c_max = np.zeros(n)
+        sources = {}
+        source_idx = np.zeros(n, dtype=np.intp)
+        groups = {'direct': [], 'osc': [], 'noise': [], 'beat phase': [], 'bar phase': [], 'flat': []}
+        osc_kind = np.zeros(n, dtype=np.int64)
+
+        for i, e in enumerate(plan):
+            _, _, vibe, transient = sides[e.side]
+            idx = e.cache.get_active_index(vibe, transient, e.state_key, sync_indices)
+            params = e.cache.resolved[idx] if idx is not None else None
+            if params is None:
+                const_out[i] = max(0, min(255, int(e.cache.default_val)))
+                continue
+            has_rule[i] = True
+            behavior = params.behavior
+            center = params.c_center
+            hold[i] = HOLD_CODES.get(params.hold_type, HOLD_OTHER)
+            if not self.initialized[i]:
+                # Same lazy init as the scalar path: held_dmx starts at the rule's center
+                self.initialized[i] = True
+                self.phase[i] = 0.0
+                self.t[i] = 0.0
+                self.hold_active[i] = False
+                self.held[i] = center
+                self.held_valid[i] = True
+            if behavior == 'static':
+                const_out[i] = params.static_val
+                continue
+
+            behavior_code[i] = 0
+            speed[i], react[i] = params.speed, params.react
+            c_min[i], c_center[i], c_max[i] = params.c_min, center, params.c_max
+            source_idx[i] = sources.setdefault(params.source, len(sources))
+            if behavior == 'direct': groups['direct'].append(i)
+            elif behavior in OSC_BEHAVIORS:
+                groups['osc'].append(i)
+                osc_kind[i] = OSC_BEHAVIORS[behavior]
+            elif behavior == 'noise': groups['noise'].append(i)
+            elif behavior in PHASE_BEHAVIORS: groups[behavior].append(i)
+            else: groups['flat'].append(i) # Unknown behavior: y = 0 (center)
+
+        self.const_out = const_out
+        self.dynamic = np.flatnonzero(behavior_code == 0)
+        self.has_rule = has_rule
+        self.hold = hold
+        self.hold_div = HOLD_DIVISORS[hold]
+        self.speed, self.react = speed, react
+        self.c_min, self.c_center, self.c_max = c_min, c_center, c_max
+        self.source_names = list(sources)
+        self.source_idx = source_idx
+        self.groups = {k: np.array(v, dtype=np.intp) for k, v in groups.items()}
+        osc = self.groups['osc']
+        self.osc_sine = osc[osc_kind[osc] == 0]
+        self.osc_saw = osc[osc_kind[osc] == 1]
+        self.osc_square = osc[osc_kind[osc] == 2]
+
+    # --- Per-frame evaluation ---
+
+    def process(self, plan, sides, sync_indices):
+        engine = self.engine
+        if self.plan is not plan:
+            if self.plan is not None: self.store_states()
+            self._build_plan(plan)
+
+        signature = (
+            tuple((sides[s][2], sides[s][3]) for s in SIDES),
+            tuple(sorted(sync_indices.items())) if sync_indices else None,
+            engine._descriptor_version,
+        )
+        if signature != self.signature:
+            self._select_rules(sides, sync_indices)
+            self.signature = signature
+
+        if len(self.plan) == 0: return
+        logics = [sides[s][0] for s in SIDES]
+        audios = [sides[s][1] for s in SIDES]
+        dt = engine._dt
+
+        # 1. Driver magnitudes: one (side, source) table per frame, gathered per channel
+        side = self.side
+        if self.source_names:
+            src_table = np.array([[lm.state.get(name, 0.0) for name in self.source_names] for lm in logics], dtype=np.float64)
+            E = src_table[side, self.source_idx]
+        else:
+            E = np.zeros(len(side))
+
+        # 2. Hold logic (musical durations)
+        is_beat = np.array([bool(a.get('beat', False)) for a in audios])
+        beat_count = np.array([lm.beat_count for lm in logics])
+        div = self.hold_div
+        safe_div = np.where(div > 0, div, 1)
+        trigger = self.has_rule & (div > 0) & is_beat[side] & (beat_count[side] % safe_div == 0)
+        self.hold_active = np.where(trigger, True, np.where(self.has_rule & (self.hold == HOLD_NONE), False, self.hold_active))
+        self.held_valid &= ~trigger
+
+        # 3. Behavior groups -> normalized y
+        y = np.zeros(len(side))
+        g = self.groups['direct']
+        if g.size: y[g] = (E[g] * 2.0) - 1.0
+
+        g = self.groups['osc']
+        if g.size:
+            freq = (self.speed[g] * 0.1) + (E[g] * 5.0 * self.react[g]) # Variable frequency based on energy
+            self.phase[g] = np.mod(self.phase[g] + dt * freq, 1.0)
+            for idx, shape in ((self.osc_sine, 'sine'), (self.osc_saw, 'saw'), (self.osc_square, 'square')):
+                if not idx.size: continue
+                p = self.phase[idx]
+                amp = self.react[idx]
+                if shape == 'sine': y[idx] = amp * np.sin(p * 2.0 * math.pi)
+                elif shape == 'saw': y[idx] = amp * ((p * 2.0) - 1.0)
+                else: y[idx] = np.where(p < 0.5, amp, -amp)
+
+        g = self.groups['noise']
+        if g.size:
+            self.t[g] += dt * (self.speed[g] * 0.5 + E[g] * self.react[g] * 2.0)
+            t = self.t[g]
+            i = np.floor(t)
+            f = t - i
+            u = f * f * f * (f * (f * 6 - 15) + 10)
+            v0 = np.mod(np.sin(i) * 43758.5453123, 1.0)
+            v1 = np.mod(np.sin(i + 1) * 43758.5453123, 1.0)
+            y[g] = ((v0 + (v1 - v0) * u) * 2.0) - 1.0
+
+        for name in ('beat phase', 'bar phase'):
+            g = self.groups[name]
+            if g.size:
+                p = np.array([lm.state.get(name, 0.0) for lm in logics])[side[g]]
+                y[g] = (p * 2.0 * E[g]) - 1.0 # Ramp scaled by amplitude (E)
+
+        # 4. Calibration mapping + hold persistence (dynamic channels only; static returns early)
+        d = self.dynamic
+        out = self.const_out.copy()
+        if d.size:
+            yd = np.clip(y[d], -1.0, 1.0)
+            lo, center, hi = self.c_min[d], self.c_center[d], self.c_max[d]
+            final = np.where(yd >= 0, center + (yd * (hi - center)), center + (yd * (center - lo)))
+
+            holding = self.hold[d] != HOLD_NONE
+            active = holding & self.hold_active[d]
+            capture = active & ~self.held_valid[d]
+            self.held[d[capture]] = final[capture]
+            self.held_valid[d[capture]] = True
+            final = np.where(active, self.held[d], final)
+            self.held_valid[d[holding & ~active]] = False
+
+            out[d] = np.clip(np.rint(final), 0, 255).astype(np.int64)
+
+        # 5. Preset overrides (scalar, only channels that have a winner this frame)
+        src = self.override_src
+        if src is None or src[0] is not engine._instance_overrides or src[1] is not engine._global_overrides:
+            self._index_overrides()
+        for i, winner in self.override_pos:
+            e = self.plan[i]
+            logic_matrix, audio = logics[side[i]], audios[side[i]]
+            out[i] = max(0, min(255, int(engine._evaluate_override(winner, e, audio, logic_matrix))))
+
+        for view, pos, addr in self.write_groups:
+            view[addr] = out[pos]
+
+    def _index_overrides(self):
+        engine = self.engine
+        instance_overrides = engine._instance_overrides
+        global_overrides = engine._global_overrides
+        pos = []
+        for i, e in enumerate(self.plan):
+            winner = instance_overrides.get(e.ov_key)
+            g = global_overrides.get(e.role)
+            if g is not None and (winner is None or g.seq > winner.seq):
+                winner = g
+            if winner is not None: pos.append((i, winner))
+        self.override_pos = pos
+        self.override_src = (instance_overrides, global_overrides)
@@ -0,0 +1,115 @@
+# feature_engine.py
+from statistics import NormalDist
+import numpy as np
+
+# Signals named like the LogicMatrix sources they extend (so 'function' triggers can target e.g. "volume 8s p90")
+FEATURE_SIGNALS = (("volume", "spectral flux", "spectral complexity") + tuple(f"bin {i}" for i in range(6)) +
+                   ("bass", "mids", "highs", "beat rate"))
+BEAT_RATE = FEATURE_SIGNALS.index("beat rate") # Beats as 1/dt impulses, so its mean reads in beats per second
+FEATURE_HORIZONS = (1.0, 8.0, 32.0)  # EMA time constants (seconds)
+FEATURE_QUANTILES = (0.1, 0.5, 0.9)
+QUANTILE_FLOOR = 1e-3 # Minimum step scale so quantiles still move on a flat signal
+
+class FeatureEngine:
+    """
+    Multi-timescale running statistics of the per-block audio features. For every signal and horizon:
+    an EMA, an exponentially weighted variance, and exponentially weighted quantile estimates
+    (stochastic approximation, so old data fades at the same horizon instead of accumulating the way
+    P² would). Constant memory and one vectorized O(1) step per block; weights follow the real dt, so
+    the horizons hold whatever the block rate.
+
+    Quantiles are tracked in standardized units: quant = mean + std * zq, where zq starts at the normal
+    quantile z and the stochastic approximation only learns the shape. Level and spread changes (music
+    after silence) then arrive with the mean / std at the horizon's time constant instead of crawling.
+    An SA estimate relaxes at rate step * density, so zq's step is alpha / pdf(z): the shape also
+    settles in about one time constant. Until a horizon has seen tau seconds the weights are a plain
+    running average, so neither the seed frame nor the zero starting variance biases it.
+    """
+    __slots__ = ['horizons', 'taus', 'levels', 'gain', 'state', 'x', 'mean', 'std', 'quant', 'var', 'zq',
+                 'age', 'last_time', 'names', 'index']
+    def __init__(self, horizons=FEATURE_HORIZONS, quantiles=FEATURE_QUANTILES):
+        self.horizons = tuple(horizons)
+        self.taus = np.array(self.horizons, dtype=np.float64)[:, np.newaxis]           # H x 1
+        self.levels = np.array(quantiles, dtype=np.float64)[np.newaxis, :, np.newaxis] # 1 x Q x 1
+        normal = NormalDist()
+        z = np.array([normal.inv_cdf(q) for q in quantiles])
+        self.gain = (1.0 / np.array([normal.pdf(v) for v in z]))[np.newaxis, :, np.newaxis] # 1 x Q x 1
+        H, Q, S = len(self.horizons), len(quantiles), len(FEATURE_SIGNALS)
+        # One contiguous vector (current values, means, stds, quantiles) so a model reads it with a single mat-vec
+        self.state = np.zeros(S + H * S * (2 + Q))
+        self.x, self.mean, self.std, self.quant = self._views(self.state, H, Q, S)
+        self.var = np.zeros((H, S))
+        self.zq = np.broadcast_to(z[np.newaxis, :, np.newaxis], (H, Q, S)).copy() # Standardized quantiles
+        self.age = 0.0 # Seconds since the last seed (running-average warm-up)
+        self.last_time = None
+
+        # Flat feature names, in features() order: means, stds, then quantiles
+        labels = [f"{h:g}s" for h in self.horizons]
+        self.names = ([f"{s} {l}" for l in labels for s in FEATURE_SIGNALS] +
+                      [f"{s} {l} std" for l in labels for s in FEATURE_SIGNALS] +
+                      [f"{s} {l} p{round(q * 100)}" for l in labels for q in quantiles for s in FEATURE_SIGNALS])
+        self.index = {name: S + i for i, name in enumerate(self.names)} # Name -> position in state
+
+    @staticmethod
+    def _views(state, H, Q, S):
+        n = H * S
+        return (state[:S], state[S:S + n].reshape(H, S), state[S + n:S + 2 * n].reshape(H, S),
+                state[S + 2 * n:].reshape(H, Q, S))
+
+    def columns(self, signals):
+        """Positions in state of the given signals' values: current, then per horizon means, stds and quantiles."""
+        idx = [FEATURE_SIGNALS.index(s) for s in signals]
+        x, mean, std, quant = self._views(np.arange(self.state.size), *self.quant.shape)
+        return np.concatenate((x[idx], mean[:, idx].ravel(), std[:, idx].ravel(), quant[:, :, idx].ravel()))
+
+    def update(self, audio_state, now):
+        x = self.x
+        x[0] = audio_state.get('vol', 0.0)
+        x[1] = audio_state.get('flux', 0.0)
+        x[2] = audio_state.get('spectral_complexity', 0.5)
+        x[3:9] = audio_state.get('bins', (0.0,) * 6)[:6]
+        x[9] = audio_state.get('bass', 0.0)
+        x[10] = audio_state.get('mid', 0.0)
+        x[11] = audio_state.get('high', 0.0)
+
+        if self.last_time is None or now < self.last_time:
+            # First frame (or a virtual-time reset): seed every horizon with the current value
+            x[BEAT_RATE] = 0.0
+            self.mean[:] = x
+            self.var[:] = 0.0
+            self.std[:] = 0.0
+            self.quant[:] = x
+            self.age = 0.0
+            self.last_time = now
+            return
+        dt = now - self.last_time
+        self.last_time = now
+        if dt <= 0.0: return
+        x[BEAT_RATE] = 1.0 / dt if audio_state.get('beat', False) else 0.0
+
+        # Plain running average until a horizon has seen tau seconds, so the seed frame doesn't linger
+        self.age += dt
+        alpha = np.maximum(-np.expm1(-dt / self.taus), dt / self.age) # H x 1
+        diff = x - self.mean
+        incr = alpha * diff
+        self.mean += incr
+        self.var = (1.0 - alpha) * (self.var + diff * incr)
+        np.sqrt(self.var, out=self.std)
+
+        # Standardized quantiles walk toward the target level: up by step*q when above, down by step*(1-q) when below
+        u = ((x - self.mean) / (self.std + QUANTILE_FLOOR))[:, np.newaxis, :]
+        live = (self.std > QUANTILE_FLOOR)[:, np.newaxis, :] # Silence has no shape to learn: keep the last one
+        self.zq += (alpha[:, :, np.newaxis] * self.gain) * (self.levels - (u < self.zq)) * live
+        np.multiply(self.std[:, np.newaxis, :], self.zq, out=self.quant)
+        self.quant += self.mean[:, np.newaxis, :]
+
+    def value(self, signal, horizon, stat="mean"):
+        """One statistic: stat is 'mean', 'std' or a quantile level such as 0.9."""
+        h, s = self.horizons.index(horizon), FEATURE_SIGNALS.index(signal)
+        if stat == "mean": return float(self.mean[h, s])
+        if stat == "std": return float(self.std[h, s])
+        return float(self.quant[h, int(np.argmin(np.abs(self.levels[0, :, 0] - stat))), s])
+
+    def features(self):
+        """Every statistic as a flat {name: value} dict (see names; index maps a name into state without the dict)."""
+        return dict(zip(self.names, self.state[len(FEATURE_SIGNALS):].tolist()))
@@ -0,0 +1,100 @@
+# frame_codec.py
+# Versioned binary broadcast frames. Clients that opt in (WS {"type": "binary_protocol", "version": 1})
+# get keyframes (the whole pack_binary_state() image) and then deltas that only carry the byte spans
+# that changed since the frame they already hold. Everyone else keeps getting the plain image.
+#
+# Frame header (10 bytes, little-endian): version u8, kind u8 (0 key, 1 delta), seq u32, base_seq u32
+#   keyframe: header + image (base_seq = seq)
+#   delta:    header + span count u16 + per span: offset u16, length u16, bytes
+import collections
+import struct
+import numpy as np
+
+FRAME_VERSION = 1
+FRAME_KEY = 0
+FRAME_DELTA = 1
+FRAME_HEADER = struct.Struct('<BBII')
+SPAN_COUNT = struct.Struct('<H')
+SPAN_HEADER = struct.Struct('<HH')
+SPAN_MERGE_GAP = 4  # Unchanged bytes a span absorbs rather than paying another span header (also 4 bytes)
+HISTORY_FRAMES = 64 # ~2s of broadcasts; a client further behind than that gets a keyframe
+
+def encode_keyframe(seq, frame):
+    return FRAME_HEADER.pack(FRAME_VERSION, FRAME_KEY, seq, seq) + frame
+
+def encode_delta(seq, base_seq, base, frame):
+    """Changed byte spans of frame against base (same length), runs closer than SPAN_MERGE_GAP merged."""
+    changed = np.flatnonzero(np.frombuffer(base, dtype=np.uint8) != np.frombuffer(frame, dtype=np.uint8))
+    parts = [FRAME_HEADER.pack(FRAME_VERSION, FRAME_DELTA, seq, base_seq)]
+    if changed.size:
+        breaks = np.flatnonzero(np.diff(changed) > SPAN_MERGE_GAP) + 1
+        starts = changed[np.concatenate(([0], breaks))].tolist()
+        ends = (changed[np.concatenate((breaks - 1, [-1]))] + 1).tolist()
+        parts.append(SPAN_COUNT.pack(len(starts)))
+        for start, end in zip(starts, ends):
+            parts.append(SPAN_HEADER.pack(start, end - start))
+            parts.append(frame[start:end])
+    else:
+        parts.append(SPAN_COUNT.pack(0))
+    return b"".join(parts)
+
+def decode(payload, held=None):
+    """
+    Client side (tools / tests; the browser has the same logic in shared_setup.js): returns
+    (seq, image) for a keyframe, or for a delta against held = (seq, image). Raises ValueError when
+    the delta's base isn't the held frame (the client should then ask for a keyframe).
+    """
+    version, kind, seq, base_seq = FRAME_HEADER.unpack_from(payload)
+    if version != FRAME_VERSION: raise ValueError(f"Unsupported frame version {version}")
+    body = memoryview(payload)[FRAME_HEADER.size:]
+    if kind == FRAME_KEY: return seq, bytes(body)
+    if held is None or held[0] != base_seq: raise ValueError(f"Delta {seq} needs frame {base_seq}")
+    image = bytearray(held[1])
+    pos = SPAN_COUNT.size
+    for _ in range(SPAN_COUNT.unpack_from(body)[0]):
+        start, length = SPAN_HEADER.unpack_from(body, pos)
+        pos += SPAN_HEADER.size
+        image[start:start + length] = body[pos:pos + length]
+        pos += length
+    return seq, bytes(image)
+
+class FrameHistory:
+    """
+    The last HISTORY_FRAMES broadcast images by sequence number. Encodings of the newest frame are
+    cached per base, so clients at the same point share one encode per broadcast.
+    """
+    __slots__ = ['frames', 'seq', '_key', '_deltas', 'bytes_sent', 'bytes_full']
+    def __init__(self):
+        self.frames = collections.OrderedDict()
+        self.seq = 0
+        self._key = None
+        self._deltas = {}
+        self.bytes_sent = 0 # Versioned payload bytes handed out vs the plain images they stand for
+        self.bytes_full = 0
+
+    def push(self, frame):
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        self.frames[self.seq] = bytes(frame)
+        if len(self.frames) > HISTORY_FRAMES: self.frames.popitem(last=False)
+        self._key = None
+        self._deltas.clear()
+        return self.seq
+
+    def payload(self, base_seq=None):
+        """(seq, bytes) bringing a client that holds base_seq (None: nothing usable) to the newest frame."""
+        frame = self.frames[self.seq]
+        base = self.frames.get(base_seq) if base_seq is not None else None
+        data = None
+        if base is not None and len(base) == len(frame):
+            data = self._deltas.get(base_seq)
+            if data is None: data = self._deltas[base_seq] = encode_delta(self.seq, base_seq, base, frame)
+        if data is None or len(data) >= FRAME_HEADER.size + len(frame):
+            if self._key is None: self._key = encode_keyframe(self.seq, frame)
+            data = self._key
+        self.bytes_sent += len(data)
+        self.bytes_full += len(frame)
+        return self.seq, data
+
+    def ratio(self):
+        """Share of the plain-image bandwidth actually sent (1.0 before any versioned client)."""
+        return self.bytes_sent / self.bytes_full if self.bytes_full else 1.0
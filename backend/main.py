@@ -12,8 +12,10 @@ import ssl
 import random
 import base64
 from dmx_engine import DMXEngine
-from vibe_engine import VibeEngine
-from audio_analyzer import AudioAnalyzer
+from vibe_engine import VibeEngine, SNIPPET_DTYPE, snippet_frames
+from vibe_model import VibeModel, MODEL_FILE
+from frame_codec import FrameHistory, FRAME_VERSION
+from audio_analyzer import AudioAnalyzer, AudioState, frame_state, VECTOR_COLUMNS
 from recorder_service import Recorder
 from datetime import datetime
 import wave
@@ -229,15 +231,24 @@ import collections
 import concurrent.futures
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth, CacheFileHandler
-import queue
 import struct
 import threading
 
 # --- CONFIGURATION ---
 WS_PORT = 8765
 DMX_BAUD = 250000
+DMX_KEEPALIVE = 0.5  # Max seconds between sends of an unchanged universe (receivers time out without refresh)
 SAMPLE_RATE = 44100
 BLOCK_SIZE = 2048  # Increased to 2048 to prevent dropouts under load
+STEREO_ANALYSIS = False  # Capture 2 channels and emit 'left'/'right' sub-states for Left/Right zones
+STFT_FFT_SIZE = None  # e.g. 2048: Hann-windowed overlapped STFT (onsets every STFT_HOP samples); None = one FFT per block
+STFT_HOP = 512
+AUDIO_RING_FRAMES = 16 * BLOCK_SIZE  # Callback -> worker ring (~0.75s); only needs headroom over the backlog cap
+AUDIO_MAX_BACKLOG = 2 * BLOCK_SIZE   # Newest frames the worker analyzes per wake; anything older is skipped
+ANALYSIS_PROCESS = False  # Capture + analyze in a separate process (no GIL contention with the DMX / WS loops)
+VIBE_DECISION_MODE = "rules"  # "model": vibe / transient from the classifier fitted by vibe_model.py (rules if none is trained)
+AUDIT_SAMPLES = 40 # Audit data-exposure check: audio_state polls, AUDIT_SAMPLE_INTERVAL apart (~2s)
+AUDIT_SAMPLE_INTERVAL = 0.05
 
 # --- GLOBAL STATE ---
 CONFIG_FILE = "vj_remote_settings.json"
@@ -271,7 +282,7 @@ DMX_ENABLED = True
 active_clients = set()
 last_callback_time = time.time()
 dmx_port = None
-audio_state = { "bass": 0.0, "mid": 0.0, "high": 0.0, "vol": 0.0, "flux": 0.0, "beat": False, "device_name": "None", "bpm": 120.0 }
+audio_state = AudioState(device_name="None") # Updated in place by the audio worker; readers take snapshots
 gamepad_state = {
     "ls_x": 0.5, "ls_y": 0.5, "rs_x": 0.5, "rs_y": 0.5,
     "lt": 0.0, "rt": 0.0,
@@ -281,7 +292,10 @@ gamepad_state = {
     "btn_select": 0, "btn_start": 0
 }
 visual_states = { "bg": -1, "fg": -1, "ov": -1, "fx": -1 }
-audio_queue = queue.Queue(maxsize=100) 
+audio_ring = None # SampleRing, rebuilt per stream (channel count can change)
+audio_ready = threading.Event()
+analysis_proc = None # AnalysisProcess when ANALYSIS_PROCESS is on
+analyzer_wanted = None # (stereo, sample_rate) for the current stream; the audio worker applies it between blocks
 last_injection_time = 0.0  
 current_audio_mode = "auto" # 'auto', 'system', 'spotify'
 dmx_engine = None  
@@ -292,6 +306,7 @@ dmx_ready = True
 audio_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
 is_usb_dmx = False
 last_binary_payload = b""
+broadcast_frames = FrameHistory() # Recent binary images for delta-encoded (frame_codec) clients
 last_state_payload = "{}"
 last_broadcast_time = 0.0 # Signal all handlers to send when updated
 broadcast_version = 0 # Monotonic version for WS sync
@@ -322,20 +337,16 @@ def save_training_snippet(snippet):
         if not os.path.exists(folder_path):
             os.makedirs(folder_path)
         
-        # 1. Save the frames as dmx.json (player.html expectation)
-        # We need to make sure 't' (time) starts at 0 for the player's timeline
-        frames = snippet.get('frames', [])
-        if frames:
-            start_t = frames[0]['t']
-            for f in frames:
-                f['t'] = round(f['t'] - start_t, 3)
-                # Ensure the player sees an empty 'v' (DMX) object to avoid key errors
-                f['v'] = {}
+        # 1. Full-precision columnar copy of the collector records (vibe_engine.SNIPPET_DTYPE)
+        records = snippet.get('frames', np.zeros(0, dtype=SNIPPET_DTYPE))
+        np.save(os.path.join(folder_path, "features.npy"), records)
         
+        # 2. Save the frames as dmx.json (player.html expectation): 't' from 0, empty 'v' (DMX) object
+        frames = snippet_frames(records)
         with open(os.path.join(folder_path, "dmx.json"), 'w') as f:
             json.dump(frames, f)
             
-        # 2. Save meta.json for the browser list
+        # 3. Save meta.json for the browser list
         meta = {
             "name": f"Snippet: {label.upper()} ({ts_str})",
             "timestamp": datetime.now().isoformat(),
@@ -363,7 +374,8 @@ def save_live_defaults():
                 "vibe_bias": vibe_engine.mid_vibe_bias if vibe_engine else 0.5,
                 "speed": dmx_engine.speed if dmx_engine else 1.0,
                 "intensity": dmx_engine.intensity if dmx_engine else 1.0,
-                "sceneFreq": dmx_engine.scene_freq if dmx_engine else 1
+                "sceneFreq": dmx_engine.scene_freq if dmx_engine else 1,
+                "engine_mode": dmx_engine.engine_mode if dmx_engine else "scalar"
             },
             "laser": {
                 "speed": dmx_engine.speed if dmx_engine else 1.0,
@@ -397,6 +409,7 @@ def load_live_defaults():
             if "speed" in m_data and dmx_engine: dmx_engine.set_speed(m_data["speed"])
             if "intensity" in m_data and dmx_engine: dmx_engine.set_intensity(m_data["intensity"])
             if "sceneFreq" in m_data and dmx_engine: dmx_engine.scene_freq = m_data["sceneFreq"]
+            if "engine_mode" in m_data and dmx_engine: dmx_engine.set_engine_mode(m_data["engine_mode"])
 
             # 2. Laser Section
             l_data = data.get("laser", {})
@@ -423,9 +436,11 @@ def load_live_defaults():
 
 # --- AUDIO ENGINE (Spectral Flux) ---
 # --- LEAN AUDIO ENGINE (NO LIBROSA) ---
-from audio_analyzer import AudioAnalyzer
+from audio_analyzer import AudioAnalyzer, SampleRing
+from analysis_process import AnalysisProcess, record_items
 
 analyzer = AudioAnalyzer()
+if STFT_FFT_SIZE: analyzer.set_stft(STFT_FFT_SIZE, STFT_HOP)
 
 def audio_callback(indata, frames, time_info, status):
     global audio_state, last_callback_time
@@ -438,12 +453,18 @@ def audio_callback(indata, frames, time_info, status):
     if time.time() - last_injection_time < 2.0:
         return
 
-    # Push raw audio to queue for processing in main thread
-    # Must copy because indata buffer is reused by sounddevice
-    try:
-        audio_queue.put_nowait(indata.copy())
-    except queue.Full:
-        pass
+    # Copy into the preallocated ring (indata is reused by sounddevice) and wake the worker
+    ring = audio_ring
+    if ring is not None:
+        ring.write(indata)
+        audio_ready.set()
+
+def audio_stats():
+    """Callback -> worker ring counters (pending frames, overruns, underruns, dropped frames)."""
+    if analysis_proc: return analysis_proc.stats()
+    ring = audio_ring
+    if ring is None: return {"pending": 0, "overruns": 0, "underruns": 0, "dropped": 0}
+    return ring.stats()
 
 def get_monitor_source(mode="auto"):
     """Finds the 'Monitor' source based on mode ('auto', 'system', 'spotify')"""
@@ -580,6 +601,20 @@ def sync_send_dmx(port, universe):
     except Exception as e:
         print(f"❌ Threaded DMX Error: {e}")
 
+def send_serial_universe(u, universe):
+    """DMXEngine output hook for universe 0: hands a copy to the serial executor; False while a send is in flight."""
+    global dmx_ready
+    if not (dmx_port and dmx_ready): return False
+    dmx_ready = False
+    # Maintained by the engine on config reload and override changes
+    send_len = max(32, min(513, dmx_engine.max_address + 1))
+    fut = asyncio.get_running_loop().run_in_executor(dmx_executor, sync_send_dmx, dmx_port, bytearray(universe[:send_len]))
+    def dmx_done_cb(f):
+        global dmx_ready
+        dmx_ready = True
+    fut.add_done_callback(dmx_done_cb)
+    return True
+
 def setup_dmx():
     global dmx_port
     ports = list(serial.tools.list_ports.comports())
@@ -647,36 +682,81 @@ async def audio_watchdog():
             # Reset timer to give the restart time to work
             last_callback_time = time.time() + 5.0
 
+def analyze_audio_ring():
+    """In-process analysis of the freshest window in the callback ring (None when there is nothing new)."""
+    # Wait for the callback; a stalled stream shows up as underruns
+    audio_ready.wait(timeout=2.0 * BLOCK_SIZE / SAMPLE_RATE)
+    audio_ready.clear()
+    ring = audio_ring
+    if ring is None: return None
+    indata = ring.read(AUDIO_MAX_BACKLOG)
+    if indata is None: return None
+    # Heavy Analysis
+    state = analyzer.process(indata)
+    return state if ring.intact() else None # Lapped mid-analysis: the view was overwritten, drop this result
+
+def read_analysis_process():
+    """ANALYSIS_PROCESS mode: newest record published by the analysis process (read-only view, None when there is nothing new)."""
+    global last_callback_time
+    proc = analysis_proc
+    if proc is None:
+        time.sleep(0.05)
+        return None
+    proc.sync_settings(analyzer) # UI changes land on the local analyzer
+    last_callback_time = max(last_callback_time, proc.callback_time()) # Keeps the watchdog fed
+    state = proc.read()
+    if state is None: time.sleep(0.005) # States arrive once per block (~46ms)
+    return state
+
+def apply_analyzer_settings():
+    """Worker side of restart_audio_stream: stream settings land between blocks, and only when they changed
+    (set_stereo / set_sample_rate rebuild the STFT stage and TempoTracker, losing tempo lock)."""
+    wanted = analyzer_wanted
+    if wanted is None: return
+    stereo, rate = wanted
+    if stereo != analyzer.stereo: analyzer.set_stereo(stereo)
+    if float(rate) != analyzer.sample_rate: analyzer.set_sample_rate(rate)
+
 def audio_worker_thread():
-    """Consume audio frames from queue and run heavy analysis in a pure native thread."""
+    """Consume the freshest audio state and run the vibe engine in a pure native thread."""
     global audio_state
     print("🧠 Audio Worker Thread Started")
     
     while True:
         try:
-            # Block until we get a frame
-            indata = audio_queue.get(block=True)
-            # Heavy Analysis
-            new_audio_state = analyzer.process(indata)
+            apply_analyzer_settings()
+            if ANALYSIS_PROCESS:
+                record = read_analysis_process()
+                if record is None: continue
+                stereo = bool(record['stereo'])
+                new_audio_state = record_items(record) # Copied straight from the shared record, no per-read dict
+            else:
+                new_audio_state = analyze_audio_ring()
+                if new_audio_state is None: continue
+                stereo = 'left' in new_audio_state
             
-            # Preserve Spotify metadata injected by the async poller
-            if 'spotify' in audio_state:
-                new_audio_state['spotify'] = audio_state['spotify']
+            # Drop stale stereo sub-states after switching back to a mono stream
+            if not stereo:
+                audio_state.pop('left', None)
+                audio_state.pop('right', None)
                 
             audio_state.update(new_audio_state)
             
             # Vibe Engine Determination
             if vibe_engine:
                 vibe_results = vibe_engine.update(audio_state)
-                audio_state.update(vibe_results) # 'vibe', 'mods', etc.
+                # Only the decisions go into the live audio state (snapshotted every DMX frame);
+                # statistics go straight to the DMX engine and snippets to the saver
+                snippet = vibe_results.pop('snippet', None)
+                features = vibe_results.pop('features', None)
+                feature_index = vibe_results.pop('feature_index', None)
+                if dmx_engine and features is not None: dmx_engine.set_features(features, feature_index)
+                audio_state.update(vibe_results) # 'vibe', 'transient', 'mods'
                 
                 # Check for completed snippet
-                snippet = vibe_results.get('snippet')
                 if snippet:
                     thread = threading.Thread(target=save_training_snippet, args=(snippet,), daemon=True)
                     thread.start()
-                
-            audio_queue.task_done()
 
         except Exception as e:
             print(f"⚠️ Audio Worker Error: {e}")
@@ -712,20 +792,10 @@ def pack_binary_state(current_time):
     speed_factor = dmx_engine.eff_speed if dmx_engine else 0.6
     GLOBAL_CLOCK += dt_val * speed_factor
     m_time = GLOBAL_CLOCK
-    flux = audio_state.get('flux', 0.0)
-    bass = audio_state.get('bass', 0.0)
-    mid = audio_state.get('mid', 0.0)
-    high = audio_state.get('high', 0.0)
-    vol = audio_state.get('vol', 0.0)
-    bpm = audio_state.get('bpm', 120.0)
-    beat_phase = audio_state.get('beat_phase', 0.0)
-    
-    bins = audio_state.get('bins', [0]*6)
-    while len(bins) < 6: bins.append(0)
-    
-    beat = 1 if audio_state.get('beat', False) else 0
-    b_onset = 1 if audio_state.get('bass_onset', False) else 0
-    h_onset = 1 if audio_state.get('high_onset', False) else 0
+    # Consistent copy of the audio record; its float32 / flag arrays are the header's audio fields
+    if not hasattr(pack_binary_state, 'audio'):
+        pack_binary_state.audio = AudioState()
+    audio = audio_state.snapshot(pack_binary_state.audio)
     
     ax_a = ax_b = ax_c = ax_d = ax_e = 0.0
     if dmx_engine and dmx_engine.logic:
@@ -742,12 +812,9 @@ def pack_binary_state(current_time):
     
     univ = dmx_engine.get_universe() if dmx_engine else bytearray(513)
     
-    # Pack header (86 bytes)
-    header = struct.pack('<f fffffff ffffff BBBB fffff HHH',
-        m_time,
-        flux, bass, mid, high, vol, bpm, beat_phase,
-        float(bins[0]), float(bins[1]), float(bins[2]), float(bins[3]), float(bins[4]), float(bins[5]),
-        beat, b_onset, h_onset, max(0, min(255, int((dmx_engine.eff_intensity if dmx_engine else 1.0) * 255))),
+    # Pack header (86 bytes): time, audio record (flux..bins f32 + beat/onset u8), then the engine fields
+    header = struct.pack('<f', m_time) + audio.pack() + struct.pack('<B fffff HHH',
+        max(0, min(255, int((dmx_engine.eff_intensity if dmx_engine else 1.0) * 255))),
         ax_a, ax_b, ax_c, ax_d, ax_e,
         int(base_l), int(fx_l), int(fg_l)
     )
@@ -764,7 +831,9 @@ async def fast_broadcast_loop():
     
     critical_error_sent = False
     last_dmx_update = 0.0
+    out_time, out_frames = 0.0, 0 # Output stage (send prep) frame-time counter, reported with DMX_OUT
     dmx_update_interval = 1.0 / 60.0
+    dmx_audio = AudioState() # Per-frame snapshot, so the engine never sees a half-written block
     last_log = 0.0
     last_sent_state = "{}"
     
@@ -778,17 +847,19 @@ async def fast_broadcast_loop():
             if dmx_engine and (current_time - last_dmx_update) >= dmx_update_interval:
                 try:
                     dt = current_time - last_dmx_update if last_dmx_update > 0 else 0.016
-                    dmx_engine.update(dt, audio_state, visual_states, gamepad_state)
+                    dmx_engine.update(dt, audio_state.snapshot(dmx_audio), visual_states, gamepad_state)
                     last_dmx_update = current_time
                     
                     if current_time - last_log > 0.5:
                         if dmx_port or dmx_engine:
                             universe = dmx_engine.get_universe()
                             monitored = {addr: universe[addr] for addr in [1, 7, 8, 175, 182] if addr < len(universe)}
-                            health = analyzer.get_signal_health()
+                            health = analysis_proc.health if analysis_proc else analyzer.get_signal_health()
                             vibe_name = audio_state.get('vibe', 'mid')
-                            q_size = audio_queue.qsize()
-                            print(f"DMX_OUT: {monitored} | Vol: {audio_state['vol']:.2f} | Vibe: {vibe_name} | Signal: {health['status']} ({health['peak']:.1f})")
+                            ring = audio_stats()
+                            out_us = (out_time / out_frames) * 1e6 if out_frames else 0.0
+                            print(f"DMX_OUT: {monitored} | Vol: {audio_state['vol']:.2f} | Vibe: {vibe_name} | Signal: {health['status']} ({health['peak']:.1f}) | Ring: {ring['pending']} pending, {ring['overruns']} over/{ring['underruns']} under | Out: {out_us:.0f}us/frame | WS: {broadcast_frames.ratio() * 100:.0f}% of full frames")
+                            out_time, out_frames = 0.0, 0
                             last_log = current_time
 
                     if dmx_port:
@@ -800,37 +871,11 @@ async def fast_broadcast_loop():
                             active_preset_names = dmx_engine.get_active_preset_names() if dmx_engine else []
                             recorder.log_dmx(full_u, audio_state=audio_state, active_presets=active_preset_names)
 
-                        max_addr = 0
-                        for inst in dmx_engine.stage_instances:
-                            profile = dmx_engine.profiles.get(inst.get('profileId'))
-                            ch_count = 0
-                            if profile:
-                                ch_count = len(profile.get('channels', []))
-                                if ch_count == 0:
-                                    # Fallback legacy
-                                    fixture = dmx_engine.fixtures.get(inst.get('fixtureId'))
-                                    if fixture: ch_count = len(fixture.get('channels', []))
-                            
-                            if ch_count > 0:
-                                dev_max = int(inst.get('address', 1)) + int(inst.get('offset', 0)) + (ch_count - 1)
-                                if dev_max > max_addr: max_addr = dev_max
-                        
-                        global dmx_ready
-                        if dmx_port and dmx_ready:
-                            dmx_ready = False
-                            if dmx_engine and dmx_engine.overrides:
-                                max_o = max(dmx_engine.overrides.keys())
-                                if max_o > max_addr: max_addr = max_o
-                                
-                            send_len = max(32, min(513, max_addr + 1))
-                            universe = bytearray(full_u[:send_len])
-                            
-                            loop = asyncio.get_running_loop()
-                            fut = loop.run_in_executor(dmx_executor, sync_send_dmx, dmx_port, universe)
-                            def dmx_done_cb(f):
-                                global dmx_ready
-                                dmx_ready = True
-                            fut.add_done_callback(dmx_done_cb)
+                    out_start = time.perf_counter()
+                    # Every universe with a registered transport; untouched ones are skipped, with a keepalive refresh
+                    dmx_engine.send_outputs(current_time, DMX_KEEPALIVE)
+                    out_time += time.perf_counter() - out_start
+                    out_frames += 1
 
                 except ValueError as ve:
                     if not critical_error_sent:
@@ -859,6 +904,7 @@ async def fast_broadcast_loop():
                 try:
                     # Update the binary image for listeners
                     last_binary_payload = pack_binary_state(current_time)
+                    broadcast_frames.push(last_binary_payload)
                     last_broadcast_time = current_time
                     broadcast_version += 1
                     
@@ -993,12 +1039,25 @@ async def spotify_poller():
         await asyncio.sleep(poll_interval) 
 
 # --- 4. SERVER LOOP ---
+def injected_audio(inject):
+    """audio_inject / synth payload -> the audio_state fields it may set (one update(), so the version moves)."""
+    clean = {}
+    for k, v in inject.items():
+        if k not in audio_state: continue
+        if k in VECTOR_COLUMNS and (not isinstance(v, (list, tuple)) or len(v) != 6):
+            print(f"⚠️ Ignoring injected '{k}': expected 6 values")
+            continue
+        clean[k] = v
+    return clean
+
 async def ws_handler(websocket):
     global connected_clients, visual_params_cache, synth
     print("Client Connected")
     connected_clients.add(websocket)
     last_sent_version = 0 # Track which version of broadcast this client last received
     client_state_version = 0 
+    binary_protocol = False # Opted into frame_codec keyframe / delta frames (else the plain 599-byte image)
+    frame_seq = None # frame_codec seq this client holds; None = next frame is a keyframe
     
     try:
         while True:
@@ -1035,9 +1094,7 @@ async def ws_handler(websocket):
                             # Remote audio injection fallback
                             inject = data.get("data", {})
                             if inject:
-                                for k, v in inject.items():
-                                    if k in audio_state:
-                                        audio_state[k] = v
+                                audio_state.update(injected_audio(inject))
                                 last_injection_time = time.time()
                                 
                         elif msg_type == "synth":
@@ -1050,9 +1107,7 @@ async def ws_handler(websocket):
                                 # Remote audio injection fallback
                                 inject = data.get("data", {})
                                 if inject:
-                                    for k, v in inject.items():
-                                        if k in audio_state:
-                                            audio_state[k] = v
+                                    audio_state.update(injected_audio(inject))
                                     last_injection_time = time.time()
                         
                         elif msg_type == "gamepad_axis":
@@ -1194,6 +1249,8 @@ async def ws_handler(websocket):
                                 dmx_engine.set_speed(float(data["speed"]))
                             if "sceneFreq" in data and dmx_engine:
                                 dmx_engine.scene_freq = int(data["sceneFreq"])
+                            if "engine_mode" in data and dmx_engine:
+                                dmx_engine.set_engine_mode(str(data["engine_mode"]))
                             if "audio_source" in data:
                                 new_mode = str(data["audio_source"])
                                 if new_mode != current_audio_mode:
@@ -1236,6 +1293,15 @@ async def ws_handler(websocket):
                                     "end_time": time.time() + 10.0
                                 }
 
+                        elif msg_type == "binary_protocol":
+                            # Versioned binary frames; the ack precedes the first keyframe on this socket
+                            binary_protocol = data.get("version") == FRAME_VERSION
+                            frame_seq = None
+                            await websocket.send(json.dumps({"type": "binary_protocol", "version": FRAME_VERSION if binary_protocol else 0}))
+
+                        elif msg_type == "keyframe":
+                            frame_seq = None
+
                         elif msg_type == "get_params":
                             # Send current system state to new clients
                             params = {
@@ -1247,7 +1313,8 @@ async def ws_handler(websocket):
                                     "audio_source": current_audio_mode,
                                     "vibe_bias": vibe_engine.mid_vibe_bias if vibe_engine else 0.5,
                                     "intensity": dmx_engine.intensity if dmx_engine else 1.0,
-                                    "sceneFreq": dmx_engine.scene_freq if dmx_engine else 1
+                                    "sceneFreq": dmx_engine.scene_freq if dmx_engine else 1,
+                                    "engine_mode": dmx_engine.engine_mode if dmx_engine else "scalar"
                                 },
                                 "laser": {
                                     "speed": dmx_engine.speed if dmx_engine else 1.0,
@@ -1324,7 +1391,12 @@ async def ws_handler(websocket):
             # 2. Check for high-frequency binary updates
             if broadcast_version > last_sent_version:
                 try:
-                    await websocket.send(last_binary_payload)
+                    if binary_protocol:
+                        seq, payload = broadcast_frames.payload(frame_seq)
+                        await websocket.send(payload)
+                        frame_seq = seq
+                    else:
+                        await websocket.send(last_binary_payload)
                     last_sent_version = broadcast_version
                 except: pass
             
@@ -1365,14 +1437,19 @@ async def run_audit_task(websocket):
         })
         
         # 3. Check Data Exposure
-        # We check the most recent audio_state
-        has_ratios = "ratios" in audio_state
-        has_attacks = "attacks" in audio_state
+        # The fields always exist (fixed AudioState layout), so watch the analyzer fill them for ~2s:
+        # ratios are band energy shares (sum to 1 on any audio), attacks fire on onsets
+        has_ratios = has_attacks = False
+        for _ in range(AUDIT_SAMPLES):
+            has_ratios = has_ratios or abs(sum(audio_state.get('ratios', ())) - 1.0) < 0.01
+            has_attacks = has_attacks or max(audio_state.get('attacks', (0.0,))) > 0.0
+            if has_ratios and has_attacks: break
+            await asyncio.sleep(AUDIT_SAMPLE_INTERVAL)
         checks.append({
             "name": "Extended Timbre/Impact Data",
             "pass": has_ratios and has_attacks,
             "actual": f"Ratios: {'✅' if has_ratios else '❌'}, Attacks: {'✅' if has_attacks else '❌'}",
-            "expected": "Both Present"
+            "expected": "Both live (play audio during the audit)"
         })
 
         await websocket.send(json.dumps({
@@ -1402,52 +1479,43 @@ async def run_calibration_task(websocket):
         with open(truth_path, 'r') as f:
             truth = json.load(f)
 
-        wf = wave.open(wav_path, 'rb')
-        num_frames = wf.getnframes()
+        with wave.open(wav_path, 'rb') as wf:
+            cal_rate = wf.getframerate()
         
         # Sync with LIVE settings to test the current environment
-        cal_analyzer = AudioAnalyzer()
+        cal_analyzer = AudioAnalyzer(sample_rate=cal_rate)
         cal_analyzer.set_gain(analyzer.gain)
         cal_analyzer.set_flux_sensitivity(analyzer.flux_sensitivity_percentage)
+        if analyzer.stft: cal_analyzer.set_stft(analyzer.stft.fft_size, analyzer.stft.hop)
         
         cal_vibe = VibeEngine()
         cal_vibe.mid_vibe_bias = vibe_engine.mid_vibe_bias
         
         results = {"beats": [], "vibe_states": [], "transients": [], "bpm": []}
-        processed_frames = 0
+        
+        # Whole file analyzed in one batch (off the event loop), then the vibe engine steps through it
+        audio = await asyncio.get_running_loop().run_in_executor(None, cal_analyzer.analyze_file, wav_path, BLOCK_SIZE)
+        times = audio["t"].tolist()
         
         # To avoid blocking the WS loop for too long, we process in chunks and yield
-        chunk_count = 0
-        while processed_frames < num_frames:
-            data = wf.readframes(BLOCK_SIZE)
-            if not data: break
-            
-            samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32767.0
-            samples = samples.reshape(-1, 1)
-            
-            t = processed_frames / SAMPLE_RATE
-            audio_state = cal_analyzer.process(samples, now=t)
+        for i, t in enumerate(times):
+            audio_state = frame_state(audio, i)
             vibe_state = cal_vibe.update(audio_state, now=t)
             
-            if audio_state['beat']: results["beats"].append(t)
+            if audio_state['beat']: results["beats"].append(float(audio["beat_time"][i]))
             results["vibe_states"].append((t, vibe_state['vibe']))
             results["transients"].append((t, vibe_state['transient']))
             results["bpm"].append((t, audio_state['bpm']))
             
-            processed_frames += len(samples)
-            chunk_count += 1
-            
             # Update UI every 0.5s of virtual audio
-            if chunk_count % 10 == 0:
+            if (i + 1) % 10 == 0:
                 await websocket.send(json.dumps({
                     "type": "calibration_progress", 
-                    "progress": processed_frames / num_frames,
+                    "progress": (i + 1) / len(times),
                     "bpm": audio_state['bpm']
                 }))
                 await asyncio.sleep(0.01) # Yield to event loop
 
-        wf.close()
-
         # Evaluate (Same logic as run_calibration.py)
         # 1. Beats (Recall & Precision)
         all_truth_beats = []
@@ -1524,12 +1592,22 @@ async def main():
     # Initialize Vibe Engine
     global vibe_engine
     vibe_engine = VibeEngine()
+    if VIBE_DECISION_MODE == "model":
+        try:
+            vibe_engine.model = VibeModel.load(MODEL_FILE)
+            vibe_engine.decision_mode = "model"
+            print(f"🧠 Vibe Model loaded ({', '.join(vibe_engine.model.signals)})")
+            if not vibe_engine.model.labeled.get("vibe"):
+                print("⚠️ Vibe Model has no human-labeled vibe frames: its vibe head only imitates the rule engine")
+        except Exception as e:
+            print(f"⚠️ Vibe Model unavailable, using rules: {e}")
     print("✅ Vibe Engine initialized")
     
     # Initialize DMX Engine
     global dmx_engine
     try:
         dmx_engine = DMXEngine()
+        dmx_engine.set_output(0, send_serial_universe) # Serial DMX (the only transport so far)
         print("✅ DMX Engine initialized with Laser Profile")
         
         # Now that engines are ready, load persisted defaults
@@ -1581,7 +1659,7 @@ async def main():
 audio_stream = None
 
 def restart_audio_stream(device_input):
-    global audio_stream
+    global audio_stream, audio_ring, analysis_proc, analyzer_wanted
     
     if audio_stream:
         print("Stopping existing audio stream...")
@@ -1611,8 +1689,23 @@ def restart_audio_stream(device_input):
     print(f"🎤 Starting Audio Stream ({current_audio_mode}): {name} (Index: {idx})")
     
     try:
-        audio_stream = sd.InputStream(device=idx, channels=1, callback=audio_callback, blocksize=BLOCK_SIZE, samplerate=SAMPLE_RATE)
-        audio_stream.start()
+        channels = 1
+        if STEREO_ANALYSIS:
+            try:
+                channels = max(1, min(2, int(sd.query_devices(idx, 'input')['max_input_channels'])))
+            except: pass
+        if ANALYSIS_PROCESS:
+            if analysis_proc and not analysis_proc.alive():
+                analysis_proc.stop()
+                analysis_proc = None
+            if analysis_proc is None: analysis_proc = AnalysisProcess()
+            rate = analysis_proc.open_stream(idx, channels, SAMPLE_RATE, BLOCK_SIZE)
+        else:
+            audio_ring = SampleRing(AUDIO_RING_FRAMES, channels)
+            audio_stream = sd.InputStream(device=idx, channels=channels, callback=audio_callback, blocksize=BLOCK_SIZE, samplerate=SAMPLE_RATE)
+            audio_stream.start()
+            rate = audio_stream.samplerate
+        analyzer_wanted = (channels == 2, rate) # Device may not honour the requested rate; see apply_analyzer_settings
         audio_state["device_name"] = name
         print(f"✅ Audio Stream Started: {name}")
 
@@ -1630,6 +1723,8 @@ if __name__ == "__main__":
         if dmx_executor:
             print("⏳ Shutting down DMX executor...")
             dmx_executor.shutdown(wait=False)
+        if analysis_proc:
+            analysis_proc.stop()
         # Raising SystemExit will trigger finally blocks if any, 
         # but here we are at top level.
         os._exit(0) # Force exit to ensure background threads don't hang
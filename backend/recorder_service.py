@@ -36,6 +36,7 @@ class Recorder:
         self.dmx_log = []
         self.monitored_addresses = []
         self.last_dmx_log_time = 0 # Throttling for 1Hz logging
+        self.beat_latched = False # A beat seen since the last log entry (entries are throttled, beats are not)
         
     def start(self, name=None, addresses=None, roles=None, samplerate=44100, video_enabled=True):
         if self.is_recording:
@@ -49,6 +50,7 @@ class Recorder:
         self.monitored_addresses = addresses or []
         self.address_roles = roles or {}
         self.dmx_log = []
+        self.beat_latched = False
         self.start_time = time.time()
         self.is_recording = True
         
@@ -130,6 +132,7 @@ class Recorder:
             return
             
         now = time.time()
+        if audio_state and audio_state.get("beat", False): self.beat_latched = True
         # Throttling: Bumped to 20Hz (0.05s) for smooth timeline syncing
         if now - self.last_dmx_log_time < 0.05:
             return
@@ -150,8 +153,9 @@ class Recorder:
                 "vl": round(audio_state.get("vol", 0.0), 3),
                 "vb": audio_state.get("vibe", "mid"),
                 "tr": audio_state.get("transient", "steady"),
-                "bt": bool(audio_state.get("beat", False))
+                "bt": self.beat_latched # Latched, so every beat lands in some entry (beat rate for vibe_model.py)
             }
+            self.beat_latched = False
         
         # Capture active presets for timeline visualization
         if active_presets:
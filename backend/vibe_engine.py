@@ -1,6 +1,83 @@
 # vibe_engine.py
+import math
 import time
 import collections
+import numpy as np
+from feature_engine import FeatureEngine
+
+# Training-snippet collector record (one per update); vibe / transient stored as indexes into these
+VIBE_CODES = ("chill", "mid", "high")
+TRANSIENT_CODES = ("steady", "building", "tension", "dropping")
+# Minimum hold durations per state (seconds) - Re-aligned with Cinematic rules
+HOLD_TIMES = {"building": 0.5, "tension": 1.5, "dropping": 6.0}
+STEADY_LOCKOUT = 5.0 # No new build this soon after returning to steady
+HISTORY_WARMUP = 180 # Frames (~3s) before transients are decided at all
+SNIPPET_DTYPE = np.dtype([("t", np.float64), ("bass", np.float32), ("high", np.float32), ("flux", np.float32),
+                          ("vol", np.float32), ("spectral", np.float32), ("vibe", np.uint8), ("transient", np.uint8),
+                          ("beat", np.bool_)])
+
+def snippet_frames(records):
+    """Expands snippet records into the dmx.json frame dicts player.html reads ('t' from 0, empty 'v')."""
+    if len(records) == 0: return []
+    t = np.round(records["t"] - records["t"][0], 3).tolist()
+    cols = [np.round(records[k].astype(np.float64), 3).tolist() for k in ("bass", "high", "flux", "vol", "spectral")]
+    return [{"t": ti, "a": {"b": b, "h": h, "f": f, "vl": vl, "sc": sc, "bt": bt}, "s": VIBE_CODES[s], "tr": TRANSIENT_CODES[tr], "v": {}}
+            for ti, b, h, f, vl, sc, s, tr, bt in zip(t, *cols, records["vibe"].tolist(), records["transient"].tolist(), records["beat"].tolist())]
+
+class SnippetRing:
+    """Fixed-size ring of SNIPPET_DTYPE records, written in place; snapshot() returns them oldest-first as one contiguous copy."""
+    __slots__ = ['capacity', 'buf', 'count']
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buf = np.zeros(capacity, dtype=SNIPPET_DTYPE)
+        self.count = 0
+
+    def append(self, record):
+        self.buf[self.count % self.capacity] = record
+        self.count += 1
+
+    def snapshot(self):
+        if self.count <= self.capacity: return self.buf[:self.count].copy()
+        i = self.count % self.capacity
+        return np.concatenate((self.buf[i:], self.buf[:i]))
+
+    def __len__(self): return min(self.count, self.capacity)
+
+class WindowHistory:
+    """
+    The last maxlen values in a preallocated ring, with a ring of prefix sums beside it so the mean of
+    any slice [-start:-stop] is O(1). Prefix sums are rebuilt from the raw values once per lap so
+    float drift can't accumulate.
+    """
+    __slots__ = ['maxlen', 'values', 'prefix', 'count', '_total']
+    def __init__(self, maxlen):
+        self.maxlen = maxlen
+        self.values = np.zeros(maxlen)
+        self.prefix = np.zeros(maxlen + 1) # prefix[k % (maxlen + 1)]: sum of values appended before the k-th
+        self.count = 0
+        self._total = 0.0
+
+    def append(self, val):
+        self.values[self.count % self.maxlen] = val
+        self.count += 1
+        cap = self.maxlen + 1
+        if self.count % self.maxlen == 0:
+            # Lap complete: the ring is oldest-first, re-derive its prefix sums from scratch
+            sums = np.cumsum(self.values)
+            start = self.count - self.maxlen
+            self.prefix[start % cap] = 0.0
+            self.prefix[(start + 1 + np.arange(self.maxlen)) % cap] = sums
+            self._total = float(sums[-1])
+        else:
+            self._total += val
+            self.prefix[self.count % cap] = self._total
+
+    def mean(self, start, stop=0):
+        """Mean of the slice [-start:-stop] (stop=0: up to the newest value). Needs len(self) >= start."""
+        cap = self.maxlen + 1
+        return float(self.prefix[(self.count - stop) % cap] - self.prefix[(self.count - start) % cap]) / (start - stop)
+
+    def __len__(self): return min(self.count, self.maxlen)
 
 class VibeEngine:
     def __init__(self):
@@ -18,8 +95,8 @@ class VibeEngine:
 
         # Energy Trend Tracking (Build/Drop Detection)
         # History window (30s @ 60Hz = 1800 frames)
-        self.energy_history = collections.deque(maxlen=1800)
-        self.impact_history = collections.deque(maxlen=1800)
+        self.energy_history = WindowHistory(1800)
+        self.impact_history = WindowHistory(1800)
         self.transient = "steady"  # "building", "dropping", "tension", "steady"
         self._transient_hold_until = 0  # Hold timer to prevent single-frame flickers
         self._steady_since = 0 # Prevent re-triggering building too fast
@@ -27,9 +104,18 @@ class VibeEngine:
         self._history_frame = 0  # Frame counter; transient logic is suppressed until history is warm
 
         # Feature Collector: 40s Ring Buffer for Training Clips
-        self.metadata_history = collections.deque(maxlen=2400) # 40s @ 60Hz
+        self.metadata_history = SnippetRing(2400) # 40s @ 60Hz
         self.pending_snippet = None  # { "label": "drop", "end_time": float }
 
+        # Multi-timescale running statistics (1s / 8s / 32s EMAs, variances, quantiles)
+        self.features = FeatureEngine()
+
+        # Optional learned decisions (vibe_model.VibeModel); decision_mode "model" replaces the thresholds when one is loaded
+        self.model = None
+        self.decision_mode = "rules"
+        self.model_smoothing = 1.0 # EMA time constant (s) on the model's class scores, against flicker
+        self._model_logits = None
+        self._model_time = None
 
     def update(self, audio_state, now=None):
         """
@@ -53,47 +139,54 @@ class VibeEngine:
         flux = float(audio_state.get('flux', 0.0))
         spectral = float(audio_state.get('spectral_complexity', 0.5))
 
-        if audio_state.get('beat', False):
+        self.features.update(audio_state, now)
+
+        beat = bool(audio_state.get('beat', False))
+        if beat:
             self.beat_history.append(now)
         # Clean old beats (>3s)
         while len(self.beat_history) > 0 and now - self.beat_history[0] > 3.0:
             self.beat_history.popleft()
         density = len(self.beat_history)
 
-        # 2. SELECT VIBE (The "Bucket")
-        # Hysteresis: We allow instant upgrades to HIGH, but downgrades are blocked
-        # for vibe_hysteresis (5s) to prevent lighting "indecision" in complex tracks.
-        target = self.current_vibe
+        use_model = self.model is not None and self.decision_mode == "model"
+        if use_model:
+            self._model_decide(now)
+        else:
+            # 2. SELECT VIBE (The "Bucket")
+            # Hysteresis: We allow instant upgrades to HIGH, but downgrades are blocked
+            # for vibe_hysteresis (5s) to prevent lighting "indecision" in complex tracks.
+            target = self.current_vibe
         
-        # HIGH Thresholds: Enhanced to distinguish "Groove" from "Peak"
-        # 1. Extreme Beat Density (BPM > 160 or very active rhythm)
-        # 2. Combination of Volume AND Spectral Complexity (The Shimmer)
-        high_vol = 0.55 + (0.35 * self.mid_vibe_bias)
-        high_density = 5.6 + (6.0 * self.mid_vibe_bias)
-        # Spectral threshold is biased to protect the Mid core
-        high_spectral = 0.38 + (0.15 * (1.0 - self.mid_vibe_bias)) 
+            # HIGH Thresholds: Enhanced to distinguish "Groove" from "Peak"
+            # 1. Extreme Beat Density (BPM > 160 or very active rhythm)
+            # 2. Combination of Volume AND Spectral Complexity (The Shimmer)
+            high_vol = 0.55 + (0.35 * self.mid_vibe_bias)
+            high_density = 5.6 + (6.0 * self.mid_vibe_bias)
+            # Spectral threshold is biased to protect the Mid core
+            high_spectral = 0.38 + (0.15 * (1.0 - self.mid_vibe_bias)) 
         
-        chill_vol = 0.20 * (1.0 - self.mid_vibe_bias)
-        chill_density = 2.0 * (1.0 - self.mid_vibe_bias)
+            chill_vol = 0.20 * (1.0 - self.mid_vibe_bias)
+            chill_density = 2.0 * (1.0 - self.mid_vibe_bias)
         
-        # Vibe Logic
-        is_high = (density >= high_density) or (vol > high_vol and spectral > high_spectral)
-        is_chill = (vol < chill_vol and density < chill_density)
+            # Vibe Logic
+            is_high = (density >= high_density) or (vol > high_vol and spectral > high_spectral)
+            is_chill = (vol < chill_vol and density < chill_density)
         
-        if is_high:
-            target = "high"
-        elif is_chill:
-            # Downgrade protection check
-            if self.current_vibe != "high" or (now - self.last_vibe_change > self.vibe_hysteresis):
-                target = "chill"
-        else:
-            # Mid Drive (The Default Groove)
-            if self.current_vibe != "high" or (now - self.last_vibe_change > self.vibe_hysteresis):
-                target = "mid"
+            if is_high:
+                target = "high"
+            elif is_chill:
+                # Downgrade protection check
+                if self.current_vibe != "high" or (now - self.last_vibe_change > self.vibe_hysteresis):
+                    target = "chill"
+            else:
+                # Mid Drive (The Default Groove)
+                if self.current_vibe != "high" or (now - self.last_vibe_change > self.vibe_hysteresis):
+                    target = "mid"
             
-        if target != self.current_vibe:
-            self.current_vibe = target
-            self.last_vibe_change = now
+            if target != self.current_vibe:
+                self.current_vibe = target
+                self.last_vibe_change = now
 
         # Restored "Snappier" Smoothing (Reverted from Liquid Smoothing)
         # Explicitly cast to float to prevent numpy type leakage
@@ -115,23 +208,21 @@ class VibeEngine:
         self.energy_history.append(energy)
         
         # Suppress transient detection until history is warm (~3s).
-        if self._history_frame >= 180 and len(self.energy_history) >= 180 and len(self.impact_history) >= 180:
+        if not use_model and self._history_frame >= HISTORY_WARMUP and len(self.energy_history) >= HISTORY_WARMUP and len(self.impact_history) >= HISTORY_WARMUP:
             # Windowed Trend: Compare recent 30-frame average to a 30-frame block from ~2s ago
             # This is MUCH more stable than single-frame comparisons.
-            recent_energy = float(sum(list(self.energy_history)[-30:]) / 30.0)
-            past_energy = float(sum(list(self.energy_history)[-180:-150]) / 30.0)
+            recent_energy = self.energy_history.mean(30)
+            past_energy = self.energy_history.mean(180, 150)
             trend_long = recent_energy - past_energy
-            
-            # Minimum hold durations per state (seconds) - Re-aligned with Cinematic rules
-            HOLD_TIMES = {"building": 0.5, "tension": 1.5, "dropping": 6.0}
+
             
             # Use a wide window (30 frames / ~0.5s) for rhythmic stability
-            recent_avg = float(sum(list(self.impact_history)[-30:]) / 30.0)
-            old_avg = float(sum(list(self.impact_history)[-90:-60]) / 30.0)
+            recent_avg = self.impact_history.mean(30)
+            old_avg = self.impact_history.mean(90, 60)
             
             # Deep History Check (Compare to 25s ago if available)
             if len(self.energy_history) >= 1500:
-                very_old_energy = float(sum(list(self.energy_history)[-1500:-1470]) / 30.0)
+                very_old_energy = self.energy_history.mean(1500, 1470)
                 deep_trend = recent_energy - very_old_energy
                 # If we see a massive 25s rise, we lower the threshold for "Building"
                 if deep_trend > 0.4: trend_long += 0.1 
@@ -147,7 +238,7 @@ class VibeEngine:
                 
                 if self.transient == "steady":
                     # BUILDING: Sustained rise over ~2s
-                    if trend_long > 0.25 and recent_avg > 0.35 and now - self._steady_since > 5.0 and self.current_vibe != "high":
+                    if trend_long > 0.25 and recent_avg > 0.35 and now - self._steady_since > STEADY_LOCKOUT and self.current_vibe != "high":
                         self.transient = "building"
                         self._transient_hold_until = now + HOLD_TIMES["building"]
                 
@@ -184,25 +275,15 @@ class VibeEngine:
 
         # --- FEATURE COLLECTOR LOGIC ---
         # Record current state into ring buffer
-        self.metadata_history.append({
-            "t": now,
-            "a": {
-                "b": round(bass, 3),
-                "h": round(high, 3),
-                "f": round(flux, 3),
-                "vl": round(vol, 3),
-                "sc": round(spectral, 3)
-            },
-            "s": self.current_vibe,
-            "tr": self.transient
-        })
+        self.metadata_history.append((now, bass, high, flux, vol, spectral,
+                                      VIBE_CODES.index(self.current_vibe), TRANSIENT_CODES.index(self.transient), beat))
 
         snippet_result = None
         if (self.pending_snippet and now >= self.pending_snippet['end_time']):
-            # The 10s "After" window is complete. Harvest the full 40s history.
+            # The 10s "After" window is complete. Harvest the full 40s history (SNIPPET_DTYPE records).
             snippet_result = {
                 "label": self.pending_snippet['label'],
-                "frames": list(self.metadata_history)
+                "frames": self.metadata_history.snapshot()
             }
             self.pending_snippet = None # Reset
 
@@ -219,5 +300,34 @@ class VibeEngine:
                 "vol":  self.smooth_vol,
                 "beat_phase": audio_state.get('beat_phase', 0.0)  # 0-1 position in beat
             },
-            "snippet": snippet_result
-        }
\ No newline at end of file
+            "snippet": snippet_result,
+            "features": self.features.state.copy(), # One memcpy per block; the DMX thread reads it while we update (DMXEngine.set_features)
+            "feature_index": self.features.index    # Name ("volume 8s", "spectral flux 32s p90", ...) -> position
+        }
+
+    def _model_decide(self, now):
+        """
+        Model decision mode: class scores smoothed over model_smoothing seconds, then argmax per head.
+        The argmax only proposes; the rule path's gates still apply (high downgrade hysteresis, transient
+        warm-up, HOLD_TIMES and the post-steady build lockout).
+        """
+        logits = self.model.logits(self.features)
+        if self._model_time is None or now < self._model_time:
+            self._model_logits = logits
+        else:
+            self._model_logits += (1.0 - math.exp(-(now - self._model_time) / self.model_smoothing)) * (logits - self._model_logits)
+        self._model_time = now
+
+        split = self.model.split
+        vibe = VIBE_CODES[int(self._model_logits[:split].argmax())]
+        if vibe != self.current_vibe and (self.current_vibe != "high" or now - self.last_vibe_change > self.vibe_hysteresis):
+            self.current_vibe = vibe
+            self.last_vibe_change = now
+
+        if self._history_frame < HISTORY_WARMUP or now < self._transient_hold_until: return
+        transient = TRANSIENT_CODES[int(self._model_logits[split:].argmax())]
+        if transient == self.transient: return
+        if transient == "building" and self.transient == "steady" and now - self._steady_since <= STEADY_LOCKOUT: return
+        self.transient = transient
+        if transient == "steady": self._steady_since = now
+        else: self._transient_hold_until = now + HOLD_TIMES[transient]
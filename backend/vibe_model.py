@@ -0,0 +1,211 @@
+# vibe_model.py
+# Learned alternative to VibeEngine's threshold state machine: two softmax (multinomial logistic
+# regression) heads, vibe and transient, over the FeatureEngine running statistics. Fitted offline
+# with NumPy only from the labeled data the app already collects:
+#   python backend/vibe_model.py [training_data] [recordings] [out.npz]
+import glob
+import json
+import os
+import sys
+import numpy as np
+from feature_engine import FeatureEngine, FEATURE_SIGNALS, FEATURE_HORIZONS, FEATURE_QUANTILES
+from vibe_engine import VIBE_CODES, TRANSIENT_CODES
+
+# Signals every training source records (snippets carry no mids, recordings no spectral complexity / bins)
+MODEL_SIGNALS = ("volume", "spectral flux", "bass", "highs", "beat rate")
+MODEL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "training_data", "vibe_model.npz")
+ENGINE_LABEL_WEIGHT = 0.2 # Frames labeled only by the rule engine itself (no human correction covers them)
+SNIPPET_AFTER = 10.0      # Snippets are harvested this long after the label was tapped (see main.py save_snippet)
+HEADS = (("vibe", VIBE_CODES), ("transient", TRANSIENT_CODES))
+
+class VibeModel:
+    """
+    Inference side: the standardization is folded into the weights, and the weights are scattered into
+    the full FeatureEngine.state layout (zeros for unused signals), so a decision is one mat-vec over
+    the engine's contiguous state.
+    """
+    __slots__ = ['signals', 'weights', 'biases', 'labeled', 'matrix', 'offset', 'split']
+    def __init__(self, signals, weights, biases, labeled=None):
+        self.signals = tuple(signals)
+        self.labeled = labeled or {} # {"vibe": n, "transient": n} human-labeled training frames ({} for older files)
+        self.weights = weights # {"vibe": C x D, "transient": C x D} over FeatureEngine.columns(signals)
+        self.biases = biases
+        layout = FeatureEngine()
+        self.matrix = np.zeros((sum(len(codes) for _, codes in HEADS), layout.state.size))
+        self.matrix[:, layout.columns(self.signals)] = np.vstack([weights[head] for head, _ in HEADS])
+        self.offset = np.concatenate([biases[head] for head, _ in HEADS])
+        self.split = len(VIBE_CODES)
+
+    def logits(self, engine):
+        """Both heads' class scores in one vector: VIBE_CODES order, then TRANSIENT_CODES from split."""
+        return self.matrix @ engine.state + self.offset
+
+    def probabilities(self, engine):
+        """(vibe, transient) class probabilities, indexed like VIBE_CODES / TRANSIENT_CODES."""
+        z = self.logits(engine)
+        return _softmax(z[:self.split]), _softmax(z[self.split:])
+
+    def save(self, path):
+        np.savez(path, signals=np.array(self.signals), horizons=np.array(FEATURE_HORIZONS),
+                 quantiles=np.array(FEATURE_QUANTILES), **{f"{head}_labeled": n for head, n in self.labeled.items()},
+                 **{f"{head}_{k}": v[head] for head, _ in HEADS for k, v in (("weights", self.weights), ("biases", self.biases))})
+
+    @classmethod
+    def load(cls, path):
+        """Raises ValueError if the file was fitted against a different FeatureEngine layout."""
+        with np.load(path, allow_pickle=False) as data:
+            if (tuple(data["horizons"].tolist()) != FEATURE_HORIZONS or tuple(data["quantiles"].tolist()) != FEATURE_QUANTILES or
+                    any(s not in FEATURE_SIGNALS for s in data["signals"].tolist())):
+                raise ValueError(f"{path} was trained for a different feature layout")
+            return cls(data["signals"].tolist(), {head: data[f"{head}_weights"] for head, _ in HEADS},
+                       {head: data[f"{head}_biases"] for head, _ in HEADS},
+                       {head: int(data[f"{head}_labeled"]) for head, _ in HEADS if f"{head}_labeled" in data.files})
+
+def _softmax(z):
+    z = np.exp(z - z.max(axis=-1, keepdims=True))
+    return z / z.sum(axis=-1, keepdims=True)
+
+# --- DATASET ---
+
+def _code(codes, label):
+    return codes.index(label) if label in codes else -1
+
+def _session(name, t, states, vibe, transient):
+    t = np.asarray(t, dtype=np.float64)
+    session = {"name": name, "t": t, "states": states}
+    for (head, _), labels in zip(HEADS, (vibe, transient)):
+        session[head] = np.asarray(labels, dtype=np.int64)
+        session[head + "_w"] = np.where(session[head] >= 0, ENGINE_LABEL_WEIGHT, 0.0)
+    return session
+
+def _label(session, label, start, end):
+    """Human label over [start, end]: goes to whichever head knows it, at full weight."""
+    span = (session["t"] >= start) & (session["t"] <= end)
+    for head, codes in HEADS:
+        if label in codes:
+            session[head][span] = codes.index(label)
+            session[head + "_w"][span] = 1.0
+
+def _frames_session(name, frames):
+    """Recorder / player frames: {t, a: {b, m, h, f, vl, vb, tr, bt}}, vb / tr being the engine's own decisions."""
+    audio = [f.get("a", {}) for f in frames]
+    states = [{"vol": a.get("vl", 0.0), "flux": a.get("f", 0.0), "bass": a.get("b", 0.0), "mid": a.get("m", 0.0),
+               "high": a.get("h", 0.0), "beat": bool(a.get("bt", False))} for a in audio]
+    return _session(name, [f["t"] for f in frames], states,
+                    [_code(VIBE_CODES, a.get("vb")) for a in audio], [_code(TRANSIENT_CODES, a.get("tr")) for a in audio])
+
+def load_sessions(training_root="training_data", recordings_root="recordings"):
+    """
+    Every labeled session the app has saved:
+    - training_*.json (player.html saveTraining): frames + correction spans
+    - TRAIN_*/ (Recorder.save_training_sample): a recorded session + label.json span
+    - SNIPPET_*/features.npy (VibeEngine collector): the label holds from the tap to the end
+    """
+    sessions = []
+    for path in sorted(glob.glob(os.path.join(training_root, "training_*.json"))):
+        try:
+            with open(path, 'r') as f: data = json.load(f)
+            session = _frames_session(os.path.basename(path), data.get("data", []))
+            for c in data.get("corrections", []):
+                _label(session, c.get("label"), c.get("s", 0.0), c.get("e", 0.0))
+            sessions.append(session)
+        except Exception as e:
+            print(f"⚠️ Skipping {path}: {e}")
+
+    for folder in sorted(glob.glob(os.path.join(training_root, "TRAIN_*"))):
+        try:
+            with open(os.path.join(folder, "dmx.json"), 'r') as f: frames = json.load(f)
+            with open(os.path.join(folder, "label.json"), 'r') as f: label = json.load(f)
+            session = _frames_session(os.path.basename(folder), frames)
+            _label(session, label.get("correct_label"), label.get("start_t", 0.0), label.get("end_t", 0.0))
+            sessions.append(session)
+        except Exception as e:
+            print(f"⚠️ Skipping {folder}: {e}")
+
+    for folder in sorted(glob.glob(os.path.join(recordings_root, "SNIPPET_*"))):
+        path = os.path.join(folder, "features.npy")
+        if not os.path.exists(path): continue # Pre-NumPy snippet (dmx.json only, no beats)
+        try:
+            records = np.load(path, allow_pickle=False)
+            if len(records) == 0 or "beat" not in records.dtype.names: continue
+            with open(os.path.join(folder, "meta.json"), 'r') as f: meta = json.load(f)
+            states = [{"vol": vl, "flux": fx, "bass": b, "high": h, "spectral_complexity": sc, "beat": bt}
+                      for vl, fx, b, h, sc, bt in zip(*(records[k].tolist() for k in ("vol", "flux", "bass", "high", "spectral", "beat")))]
+            t = records["t"] - records["t"][0]
+            session = _session(os.path.basename(folder), t, states, records["vibe"], records["transient"])
+            _label(session, meta.get("label"), t[-1] - SNIPPET_AFTER, t[-1])
+            sessions.append(session)
+        except Exception as e:
+            print(f"⚠️ Skipping {folder}: {e}")
+    return sessions
+
+def build_matrix(sessions, signals=MODEL_SIGNALS):
+    """Replays each session through a fresh FeatureEngine (the live code path) -> X plus per-head labels / weights."""
+    rows = []
+    for session in sessions:
+        engine = FeatureEngine()
+        columns = engine.columns(signals)
+        for t, state in zip(session["t"].tolist(), session["states"]):
+            engine.update(state, t)
+            rows.append(engine.state[columns])
+    X = np.array(rows)
+    targets = {head: (np.concatenate([s[head] for s in sessions]), np.concatenate([s[head + "_w"] for s in sessions]))
+               for head, _ in HEADS}
+    return X, targets
+
+# --- TRAINING ---
+
+def fit_softmax(X, y, w, classes, l2=1e-3, iters=2000, lr=0.5):
+    """
+    Weighted multinomial logistic regression by full-batch gradient descent on standardized inputs.
+    Classes are rebalanced to equal total weight so rare transients (tension, dropping) still count.
+    Returns (W, b) for the raw inputs (standardization folded in).
+    """
+    keep = w > 0
+    X, y, w = X[keep], y[keep], w[keep].astype(np.float64)
+    mu = X.mean(axis=0)
+    sd = np.maximum(X.std(axis=0), 1e-6)
+    Z = (X - mu) / sd
+    for c in np.unique(y): w[y == c] /= w[y == c].sum()
+    w /= w.sum()
+
+    Y = np.eye(classes)[y]
+    W = np.zeros((classes, X.shape[1]))
+    b = np.zeros(classes)
+    for _ in range(iters):
+        g = (_softmax(Z @ W.T + b) - Y) * w[:, np.newaxis]
+        W -= lr * (g.T @ Z + l2 * W)
+        b -= lr * g.sum(axis=0)
+    W = W / sd
+    return W, b - W @ mu
+
+def train(sessions, signals=MODEL_SIGNALS, **fit_args):
+    X, targets = build_matrix(sessions, signals)
+    weights, biases, labeled = {}, {}, {}
+    for head, codes in HEADS:
+        y, w = targets[head]
+        counts = {codes[c]: int(((y == c) & (w >= 1.0)).sum()) for c in range(len(codes))}
+        labeled[head] = sum(counts.values())
+        print(f" - {head}: {int((w > 0).sum())} frames, human-labeled {counts}")
+        weights[head], biases[head] = fit_softmax(X, y, w, len(codes), **fit_args)
+        p = _softmax(X @ weights[head].T + biases[head]).argmax(axis=1)
+        strong = w >= 1.0
+        if strong.any(): print(f"   training accuracy on human labels: {float((p[strong] == y[strong]).mean()):.1%}")
+    return VibeModel(signals, weights, biases, labeled)
+
+def main(argv):
+    training_root = argv[1] if len(argv) > 1 else "training_data"
+    recordings_root = argv[2] if len(argv) > 2 else "recordings"
+    out = argv[3] if len(argv) > 3 else MODEL_FILE
+    sessions = load_sessions(training_root, recordings_root)
+    if not sessions:
+        print(f"❌ No training data in {training_root} / {recordings_root}")
+        return 1
+    print(f"🧠 Training vibe model on {len(sessions)} sessions...")
+    model = train(sessions)
+    model.save(out)
+    print(f"✅ Saved vibe model to {out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,91 @@
+import sys
+import os
+import time
+import math
+import random
+import io
+import contextlib
+
+# Add backend to path
+sys.path.append(os.path.join(os.getcwd(), 'backend'))
+
+from dmx_engine import DMXEngine
+
+UNIVERSES = 8
+FRAMES = 1500
+TARGET_HZ = 44.0
+
+def make_audio(n):
+    rng = random.Random(7)
+    frames = []
+    beat_count = 0
+    for i in range(n):
+        beat = (i % 23 == 0)
+        if beat: beat_count += 1
+        frames.append({
+            'vibe': ['chill', 'mid', 'high'][(i // 200) % 3],
+            'transient': 'steady',
+            'vol': 0.5 + 0.5 * math.sin(i * 0.01),
+            'bass': rng.random(), 'mid': rng.random(), 'high': rng.random(),
+            'flux': rng.random(), 'impact': rng.random(),
+            'beat': beat, 'bar': beat and beat_count % 4 == 0,
+            'beat_phase': (i % 23) / 23.0, 'beat_count': beat_count,
+            'bins': [rng.random() for _ in range(6)],
+        })
+    return frames
+
+def patch_universes(engine):
+    """Fills every universe with copies of the widest profile, back to back."""
+    profile = max(engine.profiles.values(), key=lambda p: len(p.get('channels', [])))
+    width = len(profile['channels'])
+    stage = []
+    for u in range(UNIVERSES):
+        addr = 1
+        while addr + width - 1 <= 512:
+            stage.append({'id': f"bench_{u}_{addr}", 'profileId': profile['id'], 'address': addr,
+                          'offset': 0, 'zone': ['Left', 'Right', 'Center'][len(stage) % 3], 'universe': u})
+            addr += width
+    engine.stage_instances = stage # Publishes a new config snapshot with the rebuilt plan
+    return profile, len(stage)
+
+def run(engine, frames, blackout=False):
+    engine.blackout = blackout
+    times = []
+    dirty_total = 0
+    with contextlib.redirect_stdout(io.StringIO()): # Mute scene/sync logging
+        for a in frames:
+            t0 = time.perf_counter()
+            engine.update(0.016, a)
+            dirty = engine.send_outputs(time.time(), keepalive=1e9) # Through the registered (copying) senders
+            times.append(time.perf_counter() - t0)
+            dirty_total += len(dirty)
+    times.sort()
+    mean = sum(times) / len(times)
+    p99 = times[int(len(times) * 0.99)]
+    return mean, p99, dirty_total / len(frames)
+
+def copy_sender(u, buf):
+    """Output hook stand-in: takes the copy a real transport would hand to its socket / serial thread."""
+    bytes(buf)
+    return True
+
+def bench():
+    engine = DMXEngine()
+    for u in range(UNIVERSES): engine.set_output(u, copy_sender)
+    profile, count = patch_universes(engine)
+    frames = make_audio(FRAMES)
+    budget = 1.0 / TARGET_HZ
+
+    print(f"\n📊 {UNIVERSES} universes, {count} x '{profile.get('name')}' ({len(engine._exec_plan)} channels), {FRAMES} frames")
+    for mode in ('scalar', 'numpy'):
+        engine.set_engine_mode(mode)
+        mean, p99, dirty = run(engine, frames)
+        print(f"  {mode:6s} live:     mean {mean*1000:6.2f} ms  p99 {p99*1000:6.2f} ms  ({1.0/mean:6.0f} Hz max)  dirty/frame {dirty:.2f}/{UNIVERSES}")
+        mean_b, _, dirty_b = run(engine, frames[:200], blackout=True)
+        print(f"  {mode:6s} blackout: mean {mean_b*1000:6.2f} ms  dirty/frame {dirty_b:.2f}/{UNIVERSES} (untouched universes skipped)")
+        if p99 <= budget: print(f"  ✅ {mode}: p99 within the {TARGET_HZ:.0f} Hz budget ({budget*1000:.1f} ms)")
+        else: print(f"  ❌ {mode}: p99 exceeds the {TARGET_HZ:.0f} Hz budget ({budget*1000:.1f} ms)")
+    engine.set_engine_mode('scalar')
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,62 @@
+import sys
+import os
+import math
+import random
+from statistics import NormalDist
+
+# Add backend to path
+sys.path.append(os.path.join(os.getcwd(), 'backend'))
+
+from feature_engine import FeatureEngine, FEATURE_HORIZONS, FEATURE_QUANTILES
+
+# Stationary N(MEAN, SIGMA) volume at RATE Hz: every horizon's quantiles should settle within ~2 tau,
+# both when the music starts with the engine and when it starts after a stretch of silence. After
+# silence the level steps by MEAN, and a tau EMA still carries its own lag on that step over the window
+# (MEAN * (e^-2 - e^-3) on average), so that much is allowed on top.
+RATE = 60.0
+MEAN, SIGMA = 0.5, 0.1
+TOLERANCE = 0.15 # In sigmas, on the average over [2 tau, 3 tau]
+SILENCE = 10.0
+
+def run(silence):
+    rng = random.Random(1)
+    engine = FeatureEngine()
+    truth = {q: NormalDist(MEAN, SIGMA).inv_cdf(q) for q in FEATURE_QUANTILES}
+    sums = {(h, q): [0.0, 0] for h in FEATURE_HORIZONS for q in FEATURE_QUANTILES}
+    end = silence + 3 * max(FEATURE_HORIZONS)
+    n = 0
+    while n / RATE < end:
+        now = n / RATE
+        vol = 0.0 if now < silence else rng.gauss(MEAN, SIGMA)
+        engine.update({'vol': vol}, now)
+        for h in FEATURE_HORIZONS:
+            if silence + 2 * h <= now < silence + 3 * h:
+                for q in FEATURE_QUANTILES:
+                    acc = sums[(h, q)]
+                    acc[0] += engine.value("volume", h, q)
+                    acc[1] += 1
+        n += 1
+
+    tolerance = TOLERANCE + (MEAN / SIGMA * (math.exp(-2) - math.exp(-3)) if silence else 0.0)
+    ok = True
+    for h in FEATURE_HORIZONS:
+        line = f"  {h:4g}s:"
+        for q in FEATURE_QUANTILES:
+            total, count = sums[(h, q)]
+            est = total / count
+            err = (est - truth[q]) / SIGMA
+            ok &= abs(err) <= tolerance
+            line += f"  p{round(q * 100)} {est:.3f} (true {truth[q]:.3f}, {err:+.2f} sigma)"
+        print(line)
+    print(f"   tolerance {tolerance:.2f} sigma")
+    return ok
+
+def main():
+    results = []
+    for silence in (0.0, SILENCE):
+        print(f"\n📊 Quantiles over [2 tau, 3 tau] after {silence:g}s of silence")
+        results.append(run(silence))
+    print("✅ All horizons settled within 2 tau" if all(results) else "❌ Some quantiles are still off after 2 tau")
+
+if __name__ == "__main__":
+    main()
@@ -315,6 +315,64 @@ window.latestOverrides = new Set();
 window.ws = null;
 window.dmx_connected = false;
 
+// --- BINARY FRAME DECODER (backend/frame_codec.py) ---
+// Create one per socket, call hello() from onopen and accept(msg) for the 'binary_protocol' ack.
+// decode() turns every binary message into the plain 599-byte state image (null = nothing to apply yet).
+// Before the ack (or against an older engine) messages already are plain images and pass straight through.
+window.FRAME_VERSION = 1;
+window.createFrameDecoder = function(socket) {
+    let enabled = false;
+    let seq = null;     // Sequence of the image we hold
+    let image = null;   // Uint8Array, patched in place by deltas
+    let waiting = false; // Keyframe requested, deltas are useless until it arrives
+
+    const requestKeyframe = () => {
+        if (waiting || socket.readyState !== WebSocket.OPEN) return;
+        waiting = true;
+        socket.send(JSON.stringify({ type: 'keyframe' }));
+    };
+
+    return {
+        hello() {
+            socket.send(JSON.stringify({ type: 'binary_protocol', version: window.FRAME_VERSION }));
+        },
+        accept(msg) {
+            enabled = msg.version === window.FRAME_VERSION;
+            seq = null;
+            waiting = false;
+        },
+        decode(buffer) {
+            if (!enabled) return buffer;
+            const dv = new DataView(buffer);
+            if (buffer.byteLength < 10 || dv.getUint8(0) !== window.FRAME_VERSION) return null;
+            const kind = dv.getUint8(1);
+            const frameSeq = dv.getUint32(2, true);
+            const baseSeq = dv.getUint32(6, true);
+
+            if (kind === 0) { // Keyframe
+                image = new Uint8Array(buffer, 10).slice();
+                seq = frameSeq;
+                waiting = false;
+                return image.buffer;
+            }
+            if (image === null || seq !== baseSeq) {
+                requestKeyframe();
+                return null;
+            }
+            const bytes = new Uint8Array(buffer);
+            let pos = 12;
+            for (let n = dv.getUint16(10, true); n > 0; n--) {
+                const offset = dv.getUint16(pos, true);
+                const length = dv.getUint16(pos + 2, true);
+                image.set(bytes.subarray(pos + 4, pos + 4 + length), offset);
+                pos += 4 + length;
+            }
+            seq = frameSeq;
+            return image.buffer;
+        }
+    };
+};
+
 // --- UI UTILITIES ---
 window.cycleTheme = function() {
     const themes = ['', 'theme-glass', 'theme-cyber', 'theme-industrial'];
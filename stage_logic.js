@@ -794,18 +794,22 @@ var switchTab = window.switchTab || function() { };
             
             console.log("🔌 Attempting WebSocket connection to:", wsUrl);
             const newWs = new WebSocket(wsUrl);
+            const frames = createFrameDecoder(newWs); // Fresh socket: the handshake below also gets us a keyframe
 
             newWs.onopen = () => {
                 ws = newWs;
                 dmx_connected = true;
                 ws_reconnect_delay = 2000; // Reset on success
                 console.log("✅ WebSocket Connected!");
+                frames.hello();
             };
 
             newWs.binaryType = 'arraybuffer';
             newWs.onmessage = (event) => {
                 if (event.data instanceof ArrayBuffer) {
-                    const view = new DataView(event.data);
+                    const buffer = frames.decode(event.data);
+                    if (!buffer) return;
+                    const view = new DataView(buffer);
                     window.lastDmxUpdate = Date.now();
 
                     // 1. UPDATE AUDIO STATE
@@ -850,7 +854,9 @@ var switchTab = window.switchTab || function() { };
 
                 try {
                     const msg = JSON.parse(event.data);
-                    if (msg.type === 'state') {
+                    if (msg.type === 'binary_protocol') {
+                        frames.accept(msg);
+                    } else if (msg.type === 'state') {
                         const prevVibe = latestAudioState.vibe;
                         const prevVariant = latestAudioState.vibe_variant;
                         const prevTransient = latestAudioState.transient;
@@ -0,0 +1,77 @@
+import sys
+import os
+import json
+import time
+import numpy as np
+
+# Add backend to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../backend"))
+
+from audio_analyzer import AudioAnalyzer, frame_state
+from vibe_engine import VibeEngine
+from vibe_model import VibeModel, MODEL_FILE
+
+# --- CONFIGURATION ---
+WAV_FILE = "calibration_audio.wav"
+TRUTH_FILE = "calibration_truth.json"
+BLOCK_SIZE = 2048
+
+# Scores the trained vibe model (backend/vibe_model.py) against the calibration truth, next to the
+# rule engine on the same analyzed audio:  python evaluate_vibe_model.py [model.npz]
+def run(audio, vibe):
+    vibes, transients = [], []
+    elapsed = 0.0
+    for i, current_time in enumerate(audio["t"].tolist()):
+        audio_state = frame_state(audio, i)
+        start = time.perf_counter()
+        vibe_state = vibe.update(audio_state, now=current_time)
+        elapsed += time.perf_counter() - start
+        vibes.append(vibe_state['vibe'])
+        transients.append(vibe_state['transient'])
+    return {"vibe": vibes, "transient": transients, "us_per_update": elapsed / max(1, len(vibes)) * 1e6}
+
+def main():
+    model_file = sys.argv[1] if len(sys.argv) > 1 else MODEL_FILE
+    for path in (WAV_FILE, TRUTH_FILE, model_file):
+        if not os.path.exists(path):
+            print(f"❌ Missing file: {path}")
+            if path == model_file: print("   Train one first: python backend/vibe_model.py")
+            return
+
+    with open(TRUTH_FILE, 'r') as f:
+        truth = json.load(f)
+
+    print("🧪 Evaluating Vibe Model...")
+    analyzer = AudioAnalyzer()
+    analyzer.set_gain(1.0) # Full sensitivity for test
+    audio = analyzer.analyze_file(WAV_FILE, block_size=BLOCK_SIZE)
+    times = audio["t"]
+
+    model_vibe = VibeEngine()
+    model_vibe.model = VibeModel.load(model_file)
+    model_vibe.decision_mode = "model"
+    results = {"rules": run(audio, VibeEngine()), "model": run(audio, model_vibe)}
+
+    print("\n--- Vibe Model Report ---")
+    print(f"⏱️  VibeEngine.update: rules {results['rules']['us_per_update']:.1f}us | model {results['model']['us_per_update']:.1f}us")
+    totals = {mode: [0, 0] for mode in results}
+    for key, title in (("vibe", "🌈 Vibe"), ("transient", "⚡ Transient")):
+        print(f"{title} (share of section frames correct, mid-section sample):")
+        for section in truth["sections"]:
+            expected = section.get(f"expected_{key}")
+            if expected is None: continue
+            span = np.flatnonzero((times >= section["start"]) & (times < section["end"]))
+            mid = int(np.argmin(np.abs(times - (section["start"] + section["end"]) / 2.0)))
+            line = f"   [{section['name']:12}] Expected: {expected:8}"
+            for mode, result in results.items():
+                share = float(np.mean([result[key][i] == expected for i in span])) if len(span) else 0.0
+                status = "✅" if result[key][mid] == expected else "❌"
+                totals[mode][0] += status == "✅"
+                totals[mode][1] += 1
+                line += f" | {mode}: {share * 100:5.1f}% {result[key][mid]:8} {status}"
+            print(line)
+    print("🏁 Sections correct: " + " | ".join(f"{mode} {hit}/{count}" for mode, (hit, count) in totals.items()))
+    print("--------------------------\n")
+
+if __name__ == "__main__":
+    main()
@@ -8,14 +8,14 @@ import time
 # Add backend to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), "../../backend"))
 
-from audio_analyzer import AudioAnalyzer
+from audio_analyzer import AudioAnalyzer, frame_state, TEMPO_MAX_BPM
 from vibe_engine import VibeEngine
 
 # --- CONFIGURATION ---
 WAV_FILE = "calibration_audio.wav"
 TRUTH_FILE = "calibration_truth.json"
 BLOCK_SIZE = 2048
-SAMPLE_RATE = 44100
+# python run_calibration.py [--stft]: --stft analyzes with the overlapped STFT (set_stft defaults) instead of per-block FFTs
 
 def main():
     if not os.path.exists(WAV_FILE) or not os.path.exists(TRUTH_FILE):
@@ -28,13 +28,15 @@ def main():
     with open(TRUTH_FILE, 'r') as f:
         truth = json.load(f)
         
-    # Open WAV
-    wf = wave.open(WAV_FILE, 'rb')
-    num_frames = wf.getnframes()
+    # Open WAV (header only, the analyzer reads the samples)
+    with wave.open(WAV_FILE, 'rb') as wf:
+        num_frames = wf.getnframes()
+        sample_rate = wf.getframerate()
     
     # Initialize Engines
-    analyzer = AudioAnalyzer()
+    analyzer = AudioAnalyzer(sample_rate=sample_rate)
     analyzer.set_gain(1.0) # Full sensitivity for test
+    if "--stft" in sys.argv: analyzer.set_stft()
     vibe = VibeEngine()
     
     results = {
@@ -44,43 +46,30 @@ def main():
         "bpm": []
     }
     
-    # Process Loop
-    processed_frames = 0
     start_cpu_time = time.time()
     
-    print(f" - Processing {num_frames} frames ({num_frames/SAMPLE_RATE:.2f}s)...")
+    print(f" - Processing {num_frames} frames ({num_frames/sample_rate:.2f}s)...")
     
-    while processed_frames < num_frames:
-        data = wf.readframes(BLOCK_SIZE)
-        if not data:
-            break
-            
-        # Convert to float32 numpy array
-        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32767.0
-        # If mono, reshape to (N, 1) to match analyzer expectation (axis=1 mean)
-        samples = samples.reshape(-1, 1)
-        
-        current_time = processed_frames / SAMPLE_RATE
-        
-        # Audio Analysis
-        audio_state = analyzer.process(samples, now=current_time)
+    # Audio Analysis (whole file in one batch, BLOCK_SIZE blocks)
+    audio = analyzer.analyze_file(WAV_FILE, block_size=BLOCK_SIZE)
+    audio_duration = time.time() - start_cpu_time
+    
+    for i, current_time in enumerate(audio["t"].tolist()):
+        audio_state = frame_state(audio, i)
         
         # Vibe Analysis
         vibe_state = vibe.update(audio_state, now=current_time)
         
-        # Collect results
+        # Collect results (beat_time is exact to the STFT hop with --stft, current_time is the block boundary)
         if audio_state['beat']:
-            results["beats"].append(current_time)
+            results["beats"].append(float(audio["beat_time"][i]))
             
         results["vibe_states"].append((current_time, vibe_state['vibe']))
         results["transients"].append((current_time, vibe_state['transient']))
         results["bpm"].append((current_time, audio_state['bpm']))
-        
-        processed_frames += len(samples)
 
-    wf.close()
     duration = time.time() - start_cpu_time
-    print(f"✅ Processing complete in {duration:.2f}s (Real-time speed: {(num_frames/SAMPLE_RATE)/duration:.1f}x)")
+    print(f"✅ Processing complete in {duration:.2f}s (Real-time speed: {(num_frames/sample_rate)/duration:.1f}x, analyzer alone: {(num_frames/sample_rate)/audio_duration:.1f}x)")
     
     # --- EVALUATION ---
     print("\n--- Calibration Report ---")
@@ -110,7 +99,7 @@ def main():
     print(f"   Precision: {precision*100:.1f}%")
     print(f"   Recall: {recall*100:.1f}%")
     if lags:
-        print(f"   Avg Lag: {np.mean(lags)*1000:.1f}ms")
+        print(f"   Avg Lag: {np.mean(lags)*1000:.1f}ms (jitter {np.std(lags)*1000:.1f}ms, worst {np.max(np.abs(lags))*1000:.1f}ms)")
 
     # 2. Vibe State Transitions
     print(f"🌈 Vibe State Tracking:")
@@ -149,7 +138,7 @@ def main():
         elif section["name"] == "building":
             # For the build, report the PEAK BPM reached
             peak_bpm = max([b for t, b in results["bpm"] if section["start"] < t < section["end"]])
-            print(f"   [{section['name']:11}] Target Peak: 180.0 | Actual Peak: {peak_bpm:6.1f} (Cap: 171.4 due to debounce)")
+            print(f"   [{section['name']:11}] Target Peak: 180.0 | Actual Peak: {peak_bpm:6.1f} (Tempo range up to {TEMPO_MAX_BPM:.0f}, beat lockout no longer caps it)")
 
     print("--------------------------\n")
 
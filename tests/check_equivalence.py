@@ -0,0 +1,173 @@
+import sys
+import os
+import io
+import math
+import random
+import contextlib
+import numpy as np
+
+# Add backend to path for imports; the DMX engine loads fixtures/ relative to the repo root
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "backend"))
+
+import dmx_engine
+from dmx_engine import DMXEngine, SweepExpr
+from audio_analyzer import RollingWindow
+from vibe_engine import WindowHistory
+from frame_codec import FrameHistory, encode_keyframe, encode_delta, decode, HISTORY_FRAMES
+
+# Deterministic checks for the optimizations that claim identical output to the code they replaced:
+#   python tests/check_equivalence.py   (the test_* functions also run under pytest)
+FRAMES = 1500
+FRAME_BYTES = 599 # pack_binary_state() image
+
+def audio_sequence(n=FRAMES, stereo=False):
+    """Synthetic audio states cycling through every vibe / transient, with beats, bars and a silent stretch."""
+    rng = random.Random(7)
+    vibes = ('chill', 'mid', 'high')
+    transients = ('steady', 'building', 'tension', 'dropping')
+    beat_count = 0
+    for i in range(n):
+        beat = i % 23 == 0
+        if beat: beat_count += 1
+        vol = 0.02 if (i // 500) % 5 == 4 else 0.5 + 0.5 * math.sin(i * 0.01)
+        audio = {'vibe': vibes[(i // 200) % 3], 'transient': transients[(i // 330) % 4], 'vol': vol,
+                 'bass': rng.random(), 'mid': rng.random(), 'high': rng.random(), 'flux': rng.random(),
+                 'impact': rng.random(), 'beat': beat, 'bar': beat and beat_count % 4 == 0,
+                 'beat_phase': (i % 23) / 23.0, 'beat_count': beat_count, 'bins': [rng.random() for _ in range(6)]}
+        if stereo and i:
+            audio['left'] = dict(audio, vol=vol * 0.5)
+            audio['right'] = dict(audio, bass=0.1)
+        yield audio
+
+def render(mode, stereo=False):
+    """Universe 0 bytes per frame for one engine mode, with manual presets toggled along the way."""
+    random.seed(1234) # Rule rotation picks randomly among matching rules
+    watcher_start = dmx_engine.ConfigWatcher.start
+    dmx_engine.ConfigWatcher.start = lambda self: None # No hot reloads during the check
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine = DMXEngine()
+            engine.set_engine_mode(mode)
+    finally:
+        dmx_engine.ConfigWatcher.start = watcher_start
+    ids = [p.get('id', p.get('name')) for p in engine.presets]
+    frames = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i, audio in enumerate(audio_sequence(stereo=stereo)):
+            if ids and i and i % 400 == 0: engine.toggle_manual_preset(ids[(i // 400) % len(ids)])
+            engine.update(0.016, audio)
+            frames.append(bytes(engine.universe))
+    return frames
+
+def test_vector_backend_matches_scalar():
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        for stereo in (False, True):
+            scalar, vector = render('scalar', stereo), render('numpy', stereo)
+            bad = [i for i, (a, b) in enumerate(zip(scalar, vector)) if a != b]
+            assert not bad, f"{'stereo' if stereo else 'mono'}: {len(bad)} frames differ, first {bad[0]}"
+    finally:
+        os.chdir(cwd)
+
+def test_frame_codec_round_trip():
+    rng = random.Random(3)
+    history = FrameHistory()
+    frame = bytearray(rng.randrange(256) for _ in range(FRAME_BYTES))
+    held = {} # Poll interval -> (seq, image) that client holds
+    for n in range(3 * HISTORY_FRAMES):
+        # Sparse changes, a run of bytes, and now and then nothing at all
+        for _ in range(rng.randrange(0, 12)): frame[rng.randrange(FRAME_BYTES)] = rng.randrange(256)
+        if n % 7 == 0:
+            start = rng.randrange(FRAME_BYTES - 40)
+            frame[start:start + 40] = bytes(rng.randrange(256) for _ in range(40))
+        seq = history.push(frame)
+        for every in (1, 5, HISTORY_FRAMES + 3): # Every frame, a few behind, base fallen out of history
+            if n % every: continue
+            base = held.get(every)
+            _, payload = history.payload(base[0] if base else None)
+            held[every] = decode(payload, base)
+            assert held[every] == (seq, bytes(frame)), f"every {every}: frame {seq} decoded wrong"
+
+    # Direct encode / decode, including a delta against the wrong base
+    a = bytes(rng.randrange(256) for _ in range(FRAME_BYTES))
+    b = bytearray(a); b[10] ^= 0xFF; b[500:520] = bytes(20); b = bytes(b)
+    assert decode(encode_keyframe(1, a)) == (1, a)
+    assert decode(encode_delta(2, 1, a, b), (1, a)) == (2, b)
+    assert decode(encode_delta(3, 1, a, a), (1, a)) == (3, a)
+    try:
+        decode(encode_delta(2, 1, a, b), (7, a))
+        raise AssertionError("delta against the wrong base was accepted")
+    except ValueError:
+        pass
+
+def test_rolling_windows_match_naive():
+    rng = random.Random(5)
+    values = [rng.uniform(-1.0, 1.0) * 10 ** rng.randrange(-2, 3) for _ in range(5000)]
+    window = RollingWindow(300)
+    history = WindowHistory(300)
+    for i, v in enumerate(values):
+        window.append(v)
+        history.append(v)
+        recent = values[max(0, i + 1 - 300):i + 1]
+        assert window.min() == min(recent) and window.max() == max(recent), f"min/max off at {i}"
+        assert math.isclose(window.sum(), sum(recent), rel_tol=1e-9, abs_tol=1e-9), f"sum off at {i}"
+        for start, stop in ((30, 0), (90, 60), (180, 150), (300, 270)):
+            if len(history) < start: continue
+            naive = float(np.mean(values[i + 1 - start:i + 1 - stop]))
+            assert math.isclose(history.mean(start, stop), naive, rel_tol=1e-9, abs_tol=1e-9), f"mean[-{start}:-{stop}] off at {i}"
+
+def _reference_sweep(val, phase):
+    """The preset value parser as it was before SweepExpr (re-parsed every call)."""
+    offset = 0.0
+    main_val = val
+    if '+' in val:
+        parts = val.rsplit('+', 1)
+        main_val = parts[0].strip()
+        try: offset = float(parts[1].strip())
+        except: pass
+    seq_parts = [p.strip() for p in main_val.split(',')]
+    num_parts = len(seq_parts)
+    eff_phase = (phase + offset) % (num_parts * 64.0)
+    part_idx = min(int(eff_phase // 64.0), num_parts - 1)
+    local_phase = eff_phase % 64.0
+    part_str = seq_parts[part_idx]
+    if '-' in part_str:
+        try:
+            points = [float(p.strip()) for p in part_str.split('-') if p.strip()]
+            if len(points) < 2: return int(points[0]) if points else 0
+            num_segments = max(1, len(points) - 1)
+            sub_duration = 64.0 / num_segments
+            sub_idx = min(int(local_phase // sub_duration), num_segments - 1)
+            t = max(0.0, min(1.0, (local_phase % sub_duration) / sub_duration))
+            return points[sub_idx] + t * (points[sub_idx + 1] - points[sub_idx])
+        except:
+            return 0.0
+    try: return float(part_str)
+    except: return 0.0
+
+def test_sweep_cache_matches_parser():
+    values = ["255", "0-255", "255-0", "30, 50-100, 255", "32-96+32", "30, 50-100, 30 + 16", "32-96-32",
+              "10-", "abc", "1, x, 3-", "0-128-255-0 + 8"]
+    for val in values:
+        expr = SweepExpr(val)
+        for step in range(400):
+            phase = step * 0.96 # 60 phase units/s at 16ms frames
+            assert expr.evaluate(phase) == _reference_sweep(val, phase), f"{val!r} differs at phase {phase}"
+
+def main():
+    checks = [test_vector_backend_matches_scalar, test_frame_codec_round_trip, test_rolling_windows_match_naive,
+              test_sweep_cache_matches_parser]
+    failed = 0
+    for check in checks:
+        try:
+            check()
+            print(f"✅ {check.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {check.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())